@@ -0,0 +1,31 @@
+"""Add retention settings
+
+Revision ID: 3f7b2d9c6e15
+Revises: c5a81f2e9d04
+Create Date: 2026-10-18 18:12:44.907315
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '3f7b2d9c6e15'
+down_revision = 'c5a81f2e9d04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('clients', sa.Column('sensor_event_retention_days', sa.Integer(), nullable=True))
+    op.add_column('clients', sa.Column('usage_session_retention_days', sa.Integer(), nullable=True))
+    op.create_index('ix_sensor_events_client_id_event_time_utc', 'sensor_events', ['client_id', 'event_time_utc'], unique=False)
+    op.create_index('ix_usage_sessions_client_id_end_time', 'usage_sessions', ['client_id', 'end_time'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_usage_sessions_client_id_end_time', table_name='usage_sessions')
+    op.drop_index('ix_sensor_events_client_id_event_time_utc', table_name='sensor_events')
+    op.drop_column('clients', 'usage_session_retention_days')
+    op.drop_column('clients', 'sensor_event_retention_days')
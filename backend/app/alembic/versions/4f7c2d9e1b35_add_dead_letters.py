@@ -0,0 +1,33 @@
+"""Add dead letters
+
+Revision ID: 4f7c2d9e1b35
+Revises: 1a31ce608336
+Create Date: 2026-10-18 09:12:41.208113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '4f7c2d9e1b35'
+down_revision = '1a31ce608336'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('dead_letters',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('topic', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False),
+    sa.Column('error_class', sqlmodel.sql.sqltypes.AutoString(length=100), nullable=False),
+    sa.Column('error_message', sqlmodel.sql.sqltypes.AutoString(length=500), nullable=False),
+    sa.Column('received_at', sa.DateTime(), nullable=False),
+    sa.Column('payload', sa.LargeBinary(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('dead_letters')
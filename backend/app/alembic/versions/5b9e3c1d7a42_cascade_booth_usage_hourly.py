@@ -0,0 +1,37 @@
+"""Delete booth usage rollups with their booth, org unit or client
+
+Revision ID: 5b9e3c1d7a42
+Revises: a2d6f0c84e57
+Create Date: 2026-10-18 21:12:40.318562
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '5b9e3c1d7a42'
+down_revision = 'a2d6f0c84e57'
+branch_labels = None
+depends_on = None
+
+_FOREIGN_KEYS = (
+    ('phone_booth_id', 'phone_booths'),
+    ('org_unit_id', 'org_units'),
+    ('client_id', 'clients'),
+)
+
+
+def upgrade():
+    for column, table in _FOREIGN_KEYS:
+        name = f'booth_usage_hourly_{column}_fkey'
+        op.drop_constraint(name, 'booth_usage_hourly', type_='foreignkey')
+        op.create_foreign_key(name, 'booth_usage_hourly', table, [column], ['id'], ondelete='CASCADE')
+
+
+def downgrade():
+    for column, table in _FOREIGN_KEYS:
+        name = f'booth_usage_hourly_{column}_fkey'
+        op.drop_constraint(name, 'booth_usage_hourly', type_='foreignkey')
+        op.create_foreign_key(name, 'booth_usage_hourly', table, [column], ['id'])
@@ -0,0 +1,41 @@
+"""Add sensor command jobs
+
+Revision ID: 6d1e9a3f52c8
+Revises: b83e5a0c4d17
+Create Date: 2026-10-18 14:03:27.561942
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '6d1e9a3f52c8'
+down_revision = 'b83e5a0c4d17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('sensor_command_jobs',
+    sa.Column('topic_suffix', sqlmodel.sql.sqltypes.AutoString(length=100), nullable=False),
+    sa.Column('client_id', sa.Uuid(), nullable=True),
+    sa.Column('sensor_type', sqlmodel.sql.sqltypes.AutoString(length=100), nullable=True),
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('status', sqlmodel.sql.sqltypes.AutoString(length=20), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('published', sa.Integer(), nullable=False),
+    sa.Column('failed', sa.Integer(), nullable=False),
+    sa.Column('error', sqlmodel.sql.sqltypes.AutoString(length=500), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('sensor_command_jobs')
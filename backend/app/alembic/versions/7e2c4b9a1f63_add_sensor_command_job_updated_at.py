@@ -0,0 +1,25 @@
+"""Add sensor command job updated_at
+
+Revision ID: 7e2c4b9a1f63
+Revises: 5b9e3c1d7a42
+Create Date: 2026-10-18 23:04:17.529816
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '7e2c4b9a1f63'
+down_revision = '5b9e3c1d7a42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('sensor_command_jobs', sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('sensor_command_jobs', 'updated_at')
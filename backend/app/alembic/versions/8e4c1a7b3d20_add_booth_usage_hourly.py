@@ -0,0 +1,42 @@
+"""Add booth usage hourly rollup
+
+Revision ID: 8e4c1a7b3d20
+Revises: 3f7b2d9c6e15
+Create Date: 2026-10-18 19:26:51.204718
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '8e4c1a7b3d20'
+down_revision = '3f7b2d9c6e15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filled from existing sessions with `python -m app.backfill_usage`
+    op.create_table('booth_usage_hourly',
+    sa.Column('busy_seconds', sa.Float(), nullable=False),
+    sa.Column('session_count', sa.Integer(), nullable=False),
+    sa.Column('max_session_seconds', sa.Float(), nullable=False),
+    sa.Column('phone_booth_id', sa.Uuid(), nullable=False),
+    sa.Column('org_unit_id', sa.Uuid(), nullable=False),
+    sa.Column('client_id', sa.Uuid(), nullable=False),
+    sa.Column('hour', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ),
+    sa.ForeignKeyConstraint(['org_unit_id'], ['org_units.id'], ),
+    sa.ForeignKeyConstraint(['phone_booth_id'], ['phone_booths.id'], ),
+    sa.PrimaryKeyConstraint('phone_booth_id', 'org_unit_id', 'client_id', 'hour')
+    )
+    op.create_index('ix_booth_usage_hourly_client_id_hour', 'booth_usage_hourly', ['client_id', 'hour'], unique=False)
+    op.create_index('ix_booth_usage_hourly_org_unit_id_hour', 'booth_usage_hourly', ['org_unit_id', 'hour'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_booth_usage_hourly_org_unit_id_hour', table_name='booth_usage_hourly')
+    op.drop_index('ix_booth_usage_hourly_client_id_hour', table_name='booth_usage_hourly')
+    op.drop_table('booth_usage_hourly')
@@ -0,0 +1,47 @@
+"""Add org unit closure table
+
+Revision ID: a2d6f0c84e57
+Revises: 8e4c1a7b3d20
+Create Date: 2026-10-18 20:08:37.615092
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'a2d6f0c84e57'
+down_revision = '8e4c1a7b3d20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('org_unit_closure',
+    sa.Column('ancestor_id', sa.Uuid(), nullable=False),
+    sa.Column('descendant_id', sa.Uuid(), nullable=False),
+    sa.Column('depth', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['ancestor_id'], ['org_units.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['descendant_id'], ['org_units.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id')
+    )
+    op.create_index('ix_org_unit_closure_descendant_id', 'org_unit_closure', ['descendant_id'], unique=False)
+    # Every existing (ancestor, descendant) pair, each unit with itself at depth 0
+    op.execute(
+        """
+        WITH RECURSIVE paths (ancestor_id, descendant_id, depth) AS (
+            SELECT id, id, 0 FROM org_units
+            UNION ALL
+            SELECT paths.ancestor_id, org_units.id, paths.depth + 1
+            FROM paths JOIN org_units ON org_units.parent_id = paths.descendant_id
+        )
+        INSERT INTO org_unit_closure (ancestor_id, descendant_id, depth)
+        SELECT ancestor_id, descendant_id, depth FROM paths
+        """
+    )
+
+
+def downgrade():
+    op.drop_index('ix_org_unit_closure_descendant_id', table_name='org_unit_closure')
+    op.drop_table('org_unit_closure')
@@ -0,0 +1,40 @@
+"""Deduplicate sensor events
+
+Revision ID: b83e5a0c4d17
+Revises: 4f7c2d9e1b35
+Create Date: 2026-10-18 11:02:17.530921
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'b83e5a0c4d17'
+down_revision = '4f7c2d9e1b35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep the first received copy of every duplicated event
+    op.execute(
+        """
+        DELETE FROM sensor_events a
+        USING sensor_events b
+        WHERE a.sensor_id = b.sensor_id
+          AND a.event_time_utc = b.event_time_utc
+          AND a.state_id = b.state_id
+          AND (a.received_at, a.ctid) > (b.received_at, b.ctid)
+        """
+    )
+    op.create_unique_constraint(
+        'uq_sensor_events_dedup',
+        'sensor_events',
+        ['sensor_id', 'event_time_utc', 'state_id'],
+    )
+
+
+def downgrade():
+    op.drop_constraint('uq_sensor_events_dedup', 'sensor_events', type_='unique')
@@ -0,0 +1,138 @@
+"""Partition sensor events by event time
+
+Revision ID: c5a81f2e9d04
+Revises: 6d1e9a3f52c8
+Create Date: 2026-10-18 16:41:09.318274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5a81f2e9d04'
+down_revision = '6d1e9a3f52c8'
+branch_labels = None
+depends_on = None
+
+COPY_BATCH_SIZE = 50_000
+COLUMNS = (
+    'state_id, event_time_utc, id, sensor_id, phone_booth_id, client_id, '
+    'org_unit_id, received_at, raw_payload'
+)
+
+
+def _copy_in_batches(source, target):
+    """Copy every row of source into target, committing each batch.
+
+    The schema changes before the copy commit first, so the ACCESS EXCLUSIVE
+    locks they take are released, and rows are then copied in id order with
+    one short transaction per batch instead of one for the whole table.
+    """
+    last_id = None
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+        while True:
+            after = 'WHERE id > :last_id' if last_id is not None else ''
+            last_id = connection.execute(
+                sa.text(
+                    f"""
+                    WITH batch AS (
+                        SELECT {COLUMNS} FROM {source} {after}
+                        ORDER BY id
+                        LIMIT :limit
+                    ), copied AS (
+                        INSERT INTO {target} ({COLUMNS}) SELECT {COLUMNS} FROM batch
+                    )
+                    SELECT id FROM batch ORDER BY id DESC LIMIT 1
+                    """
+                ),
+                {'last_id': last_id, 'limit': COPY_BATCH_SIZE},
+            ).scalar()
+            if last_id is None:
+                return
+
+
+def _create_sensor_events(**kwargs):
+    op.create_table('sensor_events',
+    sa.Column('state_id', sa.Integer(), nullable=False),
+    sa.Column('event_time_utc', sa.DateTime(), nullable=False),
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('sensor_id', sa.Uuid(), nullable=False),
+    sa.Column('phone_booth_id', sa.Uuid(), nullable=False),
+    sa.Column('client_id', sa.Uuid(), nullable=False),
+    sa.Column('org_unit_id', sa.Uuid(), nullable=False),
+    sa.Column('received_at', sa.DateTime(), nullable=False),
+    sa.Column('raw_payload', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ),
+    sa.ForeignKeyConstraint(['org_unit_id'], ['org_units.id'], ),
+    sa.ForeignKeyConstraint(['phone_booth_id'], ['phone_booths.id'], ),
+    sa.ForeignKeyConstraint(['sensor_id'], ['sensors.id'], ),
+    **kwargs
+    )
+
+
+def upgrade():
+    op.rename_table('sensor_events', 'sensor_events_unpartitioned')
+    op.execute('ALTER TABLE sensor_events_unpartitioned RENAME CONSTRAINT sensor_events_pkey TO sensor_events_unpartitioned_pkey')
+    op.drop_constraint('uq_sensor_events_dedup', 'sensor_events_unpartitioned', type_='unique')
+
+    # Keys of a partitioned table must include the partition key
+    _create_sensor_events(postgresql_partition_by='RANGE (event_time_utc)')
+    op.create_primary_key('sensor_events_pkey', 'sensor_events', ['id', 'event_time_utc'])
+    op.create_unique_constraint(
+        'uq_sensor_events_dedup',
+        'sensor_events',
+        ['sensor_id', 'event_time_utc', 'state_id'],
+    )
+    op.execute('CREATE TABLE sensor_events_default PARTITION OF sensor_events DEFAULT')
+
+    # Monthly partitions for the stored events and the next two months; the
+    # partition maintenance job takes over from there
+    op.execute(
+        """
+        DO $$
+        DECLARE
+            month timestamp;
+        BEGIN
+            FOR month IN
+                SELECT generate_series(
+                    date_trunc('month', coalesce(
+                        (SELECT min(event_time_utc) FROM sensor_events_unpartitioned),
+                        now() AT TIME ZONE 'utc'
+                    )),
+                    date_trunc('month', now() AT TIME ZONE 'utc') + interval '2 months',
+                    interval '1 month'
+                )
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF sensor_events FOR VALUES FROM (%L) TO (%L)',
+                    'sensor_events_p' || to_char(month, 'YYYY_MM'),
+                    month,
+                    month + interval '1 month'
+                );
+            END LOOP;
+        END $$
+        """
+    )
+    _copy_in_batches('sensor_events_unpartitioned', 'sensor_events')
+    op.drop_table('sensor_events_unpartitioned')
+
+
+def downgrade():
+    op.rename_table('sensor_events', 'sensor_events_partitioned')
+    op.execute('ALTER TABLE sensor_events_partitioned RENAME CONSTRAINT sensor_events_pkey TO sensor_events_partitioned_pkey')
+    op.drop_constraint('uq_sensor_events_dedup', 'sensor_events_partitioned', type_='unique')
+
+    _create_sensor_events()
+    op.create_primary_key('sensor_events_pkey', 'sensor_events', ['id'])
+    op.create_unique_constraint(
+        'uq_sensor_events_dedup',
+        'sensor_events',
+        ['sensor_id', 'event_time_utc', 'state_id'],
+    )
+    _copy_in_batches('sensor_events_partitioned', 'sensor_events')
+    # Drops every partition with it
+    op.drop_table('sensor_events_partitioned')
@@ -15,6 +15,9 @@ from app.api.routes import (
     sensors,
     sensor_events,
     usage_sessions,
+    dead_letters,
+    sensor_commands,
+    analytics,
 )
 from app.core.config import settings
 
@@ -32,6 +35,9 @@ api_router.include_router(phone_booths.router)
 api_router.include_router(sensors.router)
 api_router.include_router(sensor_events.router)
 api_router.include_router(usage_sessions.router)
+api_router.include_router(dead_letters.router)
+api_router.include_router(sensor_commands.router)
+api_router.include_router(analytics.router)
 
 
 if settings.ENVIRONMENT == "local":
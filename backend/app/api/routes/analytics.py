@@ -0,0 +1,136 @@
+import uuid
+from datetime import datetime
+from typing import Any, Literal
+
+import sqlalchemy as sa
+from fastapi import APIRouter
+from sqlalchemy.sql.elements import ColumnElement
+from sqlmodel import col, func, select
+
+from app import crud
+from app.api.deps import CurrentUser, SessionDep
+from app.models.booth_usage import (
+    BoothUsageHourly,
+    BoothUsageHourlyRead,
+    BoothUsageSummary,
+)
+from app.models.user_model import User
+from app.utils import to_naive_utc
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+GROUP_BY_COLUMNS = {
+    "booth": BoothUsageHourly.phone_booth_id,
+    "org_unit": BoothUsageHourly.org_unit_id,
+    "client": BoothUsageHourly.client_id,
+}
+
+
+def _usage_filters(
+    current_user: User,
+    *,
+    start: datetime,
+    end: datetime,
+    client_id: uuid.UUID | None,
+    org_unit_id: uuid.UUID | None,
+    phone_booth_id: uuid.UUID | None,
+) -> list[ColumnElement[bool]] | None:
+    """WHERE clauses on booth_usage_hourly, or None if the user sees nothing."""
+    filters = [
+        col(BoothUsageHourly.hour) >= to_naive_utc(start),
+        col(BoothUsageHourly.hour) < to_naive_utc(end),
+    ]
+    if not current_user.is_superuser:
+        if not current_user.client_id:
+            return None
+        filters.append(col(BoothUsageHourly.client_id) == current_user.client_id)
+    if client_id:
+        filters.append(col(BoothUsageHourly.client_id) == client_id)
+    if org_unit_id:
+        # The org unit and every unit below it
+        filters.append(
+            col(BoothUsageHourly.org_unit_id).in_(crud.org_unit_subtree(org_unit_id))
+        )
+    if phone_booth_id:
+        filters.append(col(BoothUsageHourly.phone_booth_id) == phone_booth_id)
+    return filters
+
+
+@router.get("/booth-usage/hourly", response_model=list[BoothUsageHourlyRead])
+def read_booth_usage_hourly(
+    session: SessionDep,
+    current_user: CurrentUser,
+    start: datetime,
+    end: datetime,
+    client_id: uuid.UUID | None = None,
+    org_unit_id: uuid.UUID | None = None,
+    phone_booth_id: uuid.UUID | None = None,
+    skip: int = 0,
+    limit: int = 1000,
+) -> Any:
+    """
+    Hourly usage rows of the hours starting in [start, end), from closed sessions.
+    """
+    filters = _usage_filters(
+        current_user,
+        start=start,
+        end=end,
+        client_id=client_id,
+        org_unit_id=org_unit_id,
+        phone_booth_id=phone_booth_id,
+    )
+    if filters is None:
+        return []
+    statement = (
+        select(BoothUsageHourly)
+        .where(*filters)
+        .order_by(col(BoothUsageHourly.hour), col(BoothUsageHourly.phone_booth_id))
+        .offset(skip)
+        .limit(limit)
+    )
+    return session.exec(statement).all()
+
+
+@router.get("/booth-usage/summary", response_model=list[BoothUsageSummary])
+def read_booth_usage_summary(
+    session: SessionDep,
+    current_user: CurrentUser,
+    start: datetime,
+    end: datetime,
+    group_by: Literal["booth", "org_unit", "client"] = "booth",
+    client_id: uuid.UUID | None = None,
+    org_unit_id: uuid.UUID | None = None,
+    phone_booth_id: uuid.UUID | None = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> Any:
+    """
+    Usage of the hours starting in [start, end), summed per booth, org unit or client.
+    """
+    filters = _usage_filters(
+        current_user,
+        start=start,
+        end=end,
+        client_id=client_id,
+        org_unit_id=org_unit_id,
+        phone_booth_id=phone_booth_id,
+    )
+    if filters is None:
+        return []
+    key = col(GROUP_BY_COLUMNS[group_by])
+    # More columns than sqlmodel's select() is typed for
+    statement: sa.Select[Any] = (
+        sa.select(
+            key.label("id"),
+            func.sum(BoothUsageHourly.busy_seconds).label("busy_seconds"),
+            func.sum(BoothUsageHourly.session_count).label("session_count"),
+            func.max(BoothUsageHourly.max_session_seconds).label("max_session_seconds"),
+            func.count(func.distinct(BoothUsageHourly.phone_booth_id)).label("booths"),
+        )
+        .where(*filters)
+        .group_by(key)
+        .order_by(key)
+        .offset(skip)
+        .limit(limit)
+    )
+    return [BoothUsageSummary(**row._mapping) for row in session.execute(statement)]
@@ -0,0 +1,41 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends
+from sqlmodel import col, func, select
+
+from app.api.deps import SessionDep, get_current_active_superuser
+from app.core.ingest import replay_dead_letters
+from app.models.dead_letters import (
+    DeadLetter,
+    DeadLetterReplayResult,
+    DeadLettersRead,
+)
+
+router = APIRouter(
+    prefix="/dead-letters",
+    tags=["dead_letters"],
+    dependencies=[Depends(get_current_active_superuser)],
+)
+
+
+@router.get("/", response_model=DeadLettersRead)
+def read_dead_letters(session: SessionDep, skip: int = 0, limit: int = 100) -> Any:
+    """
+    Retrieve MQTT messages that failed to decode, oldest first.
+    """
+    count = session.exec(select(func.count()).select_from(DeadLetter)).one()
+    statement = select(DeadLetter).order_by(col(DeadLetter.id)).offset(skip).limit(limit)
+    dead_letters = session.exec(statement).all()
+    return DeadLettersRead(data=dead_letters, count=count)
+
+
+@router.post("/replay", response_model=DeadLetterReplayResult)
+def replay(
+    session: SessionDep, start_id: int, end_id: int, limit: int = 10_000
+) -> Any:
+    """
+    Decode and ingest the dead letters with ids in [start_id, end_id] again.
+    """
+    return replay_dead_letters(
+        session=session, start_id=start_id, end_id=end_id, limit=limit
+    )
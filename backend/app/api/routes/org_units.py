@@ -4,6 +4,7 @@ from typing import Any, List
 from fastapi import APIRouter, HTTPException, status
 from sqlmodel import select
 
+from app import crud
 from app.api.deps import CurrentUser, SessionDep
 from app.models.org_units import OrgUnit, OrgUnitCreate, OrgUnitRead
 from app.models.general_models import Message
@@ -41,6 +42,8 @@ def create_org_unit(*, session: SessionDep, current_user: CurrentUser, unit_in:
         raise HTTPException(status_code=403, detail="Not enough privileges")
     unit = OrgUnit.model_validate(unit_in)
     session.add(unit)
+    session.flush()
+    crud.add_org_unit_closure(session=session, unit=unit)
     session.commit()
     session.refresh(unit)
     return unit
@@ -54,8 +57,16 @@ def update_org_unit(*, session: SessionDep, current_user: CurrentUser, id: uuid.
     if not current_user.is_superuser and unit.client_id != current_user.client_id:
         raise HTTPException(status_code=403, detail="Not enough privileges")
     update_data = unit_in.model_dump(exclude_unset=True)
+    moved = "parent_id" in update_data and update_data["parent_id"] != unit.parent_id
+    if moved and update_data["parent_id"] is not None and crud.is_org_unit_descendant(
+        session=session, ancestor_id=unit.id, descendant_id=update_data["parent_id"]
+    ):
+        raise HTTPException(status_code=400, detail="Org unit cannot be moved under itself")
     unit.sqlmodel_update(update_data)
     session.add(unit)
+    if moved:
+        session.flush()
+        crud.move_org_unit_closure(session=session, unit_id=unit.id, parent_id=unit.parent_id)
     session.commit()
     session.refresh(unit)
     return unit
@@ -68,6 +79,9 @@ def delete_org_unit(session: SessionDep, current_user: CurrentUser, id: uuid.UUI
         raise HTTPException(status_code=404, detail="Org unit not found")
     if not current_user.is_superuser and unit.client_id != current_user.client_id:
         raise HTTPException(status_code=403, detail="Not enough privileges")
+    if session.exec(select(OrgUnit.id).where(OrgUnit.parent_id == id)).first():
+        raise HTTPException(status_code=409, detail="Org unit has child org units")
+    # Its closure rows go with it (ON DELETE CASCADE)
     session.delete(unit)
     session.commit()
     return Message(message="Org unit deleted successfully")
@@ -1,10 +1,12 @@
 import uuid
-from typing import Any, List, Optional
+from typing import Any, List
 
 from fastapi import APIRouter, HTTPException, status
-from sqlmodel import select
+from sqlmodel import col, select
 
+from app import crud
 from app.api.deps import CurrentUser, SessionDep
+from app.core.routing import notify_routes_changed
 from app.models.phone_booths import PhoneBooth, PhoneBoothCreate, PhoneBoothRead
 from app.models.general_models import Message
 import logging
@@ -20,11 +22,15 @@ router = APIRouter(prefix="/phone-booths", tags=["phone_booths"])
 def read_phone_booths(
     session: SessionDep,
     current_user: CurrentUser,
-    client_id: Optional[uuid.UUID] = None,
+    client_id: uuid.UUID | None = None,
+    org_unit_id: uuid.UUID | None = None,
     skip: int = 0,
     limit: int = 100,
 ) -> Any:
-    """List phone booths. Superusers see all; others limited to their client."""
+    """
+    List phone booths. Superusers see all; others limited to their client.
+    With org_unit_id, only booths in that org unit or any unit below it.
+    """
     logger.info(f"User {current_user} is requesting phone booths list")
     if current_user.is_superuser:
         statement = select(PhoneBooth)
@@ -34,7 +40,11 @@ def read_phone_booths(
         if not current_user.client_id:
             return []
         statement = select(PhoneBooth).where(PhoneBooth.client_id == current_user.client_id)
-    
+    if org_unit_id:
+        statement = statement.where(
+            col(PhoneBooth.org_unit_id).in_(crud.org_unit_subtree(org_unit_id))
+        )
+
     statement = statement.offset(skip).limit(limit)
     booths = session.exec(statement).all()
     
@@ -45,13 +55,15 @@ def read_phone_booths(
 def read_busy_phone_booths(
     session: SessionDep,
     current_user: CurrentUser,
-    client_id: Optional[uuid.UUID] = None,
+    client_id: uuid.UUID | None = None,
+    org_unit_id: uuid.UUID | None = None,
     skip: int = 0,
     limit: int = 100,
 ) -> Any:
     """
     Get only busy phone booths (state_id = 1).
     Superusers see all busy booths; others limited to their client's busy booths.
+    With org_unit_id, only booths in that org unit or any unit below it.
     """
     if current_user.is_superuser:
         statement = select(PhoneBooth).where(PhoneBooth.state_id == 1)
@@ -64,7 +76,11 @@ def read_busy_phone_booths(
             PhoneBooth.client_id == current_user.client_id,
             PhoneBooth.state_id == 1
         )
-    
+    if org_unit_id:
+        statement = statement.where(
+            col(PhoneBooth.org_unit_id).in_(crud.org_unit_subtree(org_unit_id))
+        )
+
     statement = statement.offset(skip).limit(limit)
     booths = session.exec(statement).all()
     
@@ -103,6 +119,7 @@ def update_phone_booth(*, session: SessionDep, current_user: CurrentUser, id: uu
     update_data = booth_in.model_dump(exclude_unset=True)
     booth.sqlmodel_update(update_data)
     session.add(booth)
+    notify_routes_changed(session)
     session.commit()
     session.refresh(booth)
     return booth
@@ -116,5 +133,6 @@ def delete_phone_booth(session: SessionDep, current_user: CurrentUser, id: uuid.
     if not current_user.is_superuser and booth.client_id != current_user.client_id:
         raise HTTPException(status_code=403, detail="Not enough privileges")
     session.delete(booth)
+    notify_routes_changed(session)
     session.commit()
     return Message(message="Phone booth deleted successfully")
@@ -0,0 +1,65 @@
+import uuid
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlmodel import col, func, select
+
+from app.api.deps import SessionDep, get_current_active_superuser
+from app.core.commands import command_runner
+from app.core.config import settings
+from app.models.sensor_commands import (
+    SensorCommandCreate,
+    SensorCommandJob,
+    SensorCommandJobRead,
+    SensorCommandJobsRead,
+)
+
+router = APIRouter(
+    prefix="/sensor-commands",
+    tags=["sensor_commands"],
+    dependencies=[Depends(get_current_active_superuser)],
+)
+
+
+@router.get("/", response_model=SensorCommandJobsRead)
+def read_sensor_commands(session: SessionDep, skip: int = 0, limit: int = 100) -> Any:
+    """
+    Retrieve sensor command jobs, newest first.
+    """
+    count = session.exec(select(func.count()).select_from(SensorCommandJob)).one()
+    statement = (
+        select(SensorCommandJob)
+        .order_by(col(SensorCommandJob.created_at).desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    jobs = session.exec(statement).all()
+    return SensorCommandJobsRead(data=list(jobs), count=count)
+
+
+@router.get("/{id}", response_model=SensorCommandJobRead)
+def read_sensor_command(session: SessionDep, id: uuid.UUID) -> Any:
+    """
+    Get a sensor command job and its progress.
+    """
+    job = session.get(SensorCommandJob, id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Sensor command job not found")
+    return job
+
+
+@router.post(
+    "/", response_model=SensorCommandJobRead, status_code=status.HTTP_202_ACCEPTED
+)
+def create_sensor_command(session: SessionDep, command_in: SensorCommandCreate) -> Any:
+    """
+    Publish a command to every matching sensor in the background.
+    """
+    if not settings.mqtt_enabled:
+        raise HTTPException(status_code=400, detail="MQTT is not configured")
+    job = SensorCommandJob.model_validate(command_in)
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    command_runner.submit(job.id)
+    return job
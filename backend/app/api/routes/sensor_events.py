@@ -1,24 +1,53 @@
 import uuid
+from datetime import datetime
 from typing import Any, List
 
 from fastapi import APIRouter, HTTPException, status
-from sqlmodel import select
+from sqlmodel import Session, col, select
 
+from app import crud
 from app.api.deps import CurrentUser, SessionDep
 from app.models.sensor_events import SensorEvent, SensorEventCreate, SensorEventRead
 from app.models.general_models import Message
+from app.utils import to_naive_utc
 
 router = APIRouter(prefix="/sensor-events", tags=["sensor_events"]) 
 
 
+def get_sensor_event(session: Session, id: uuid.UUID) -> SensorEvent | None:
+    # Not session.get: the primary key also holds event_time_utc
+    return session.exec(select(SensorEvent).where(SensorEvent.id == id)).first()
+
+
 @router.get("/", response_model=List[SensorEventRead])
-def read_sensor_events(session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100) -> Any:
+def read_sensor_events(
+    session: SessionDep,
+    current_user: CurrentUser,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    org_unit_id: uuid.UUID | None = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> Any:
+    """
+    List sensor events, optionally with event_time_utc in [start, end).
+    The time range limits the scan to the partitions it overlaps. With
+    org_unit_id, only events of booths in that org unit or any unit below it.
+    """
     if current_user.is_superuser:
         statement = select(SensorEvent)
     else:
         if not current_user.client_id:
             return []
         statement = select(SensorEvent).where(SensorEvent.client_id == current_user.client_id)
+    if start:
+        statement = statement.where(SensorEvent.event_time_utc >= to_naive_utc(start))
+    if end:
+        statement = statement.where(SensorEvent.event_time_utc < to_naive_utc(end))
+    if org_unit_id:
+        statement = statement.where(
+            col(SensorEvent.org_unit_id).in_(crud.org_unit_subtree(org_unit_id))
+        )
     statement = statement.offset(skip).limit(limit)
     events = session.exec(statement).all()
     return events
@@ -26,7 +55,7 @@ def read_sensor_events(session: SessionDep, current_user: CurrentUser, skip: int
 
 @router.get("/{id}", response_model=SensorEventRead)
 def read_sensor_event(session: SessionDep, current_user: CurrentUser, id: uuid.UUID) -> Any:
-    event = session.get(SensorEvent, id)
+    event = get_sensor_event(session, id)
     if not event:
         raise HTTPException(status_code=404, detail="Sensor event not found")
     if not current_user.is_superuser and event.client_id != current_user.client_id:
@@ -39,16 +68,13 @@ def create_sensor_event(*, session: SessionDep, current_user: CurrentUser, event
     # allow creation if user belongs to same client (or sup)
     if not current_user.is_superuser and event_in.client_id != current_user.client_id:
         raise HTTPException(status_code=403, detail="Not enough privileges")
-    event = SensorEvent.model_validate(event_in)
-    session.add(event)
-    session.commit()
-    session.refresh(event)
-    return event
+    # Retried requests return the event stored by the first one
+    return crud.create_sensor_event(session=session, event_in=event_in)
 
 
 @router.delete("/{id}", response_model=Message)
 def delete_sensor_event(session: SessionDep, current_user: CurrentUser, id: uuid.UUID) -> Any:
-    event = session.get(SensorEvent, id)
+    event = get_sensor_event(session, id)
     if not event:
         raise HTTPException(status_code=404, detail="Sensor event not found")
     if not current_user.is_superuser and event.client_id != current_user.client_id:
@@ -5,6 +5,7 @@ from fastapi import APIRouter, HTTPException, status
 from sqlmodel import select
 
 from app.api.deps import CurrentUser, SessionDep
+from app.core.routing import notify_routes_changed
 from app.models.sensors import Sensor, SensorCreate, SensorRead
 from app.models.general_models import Message
 
@@ -37,6 +38,7 @@ def create_sensor(*, session: SessionDep, current_user: CurrentUser, sensor_in:
     # allow superusers or users managing sensors for their client
     sensor = Sensor.model_validate(sensor_in)
     session.add(sensor)
+    notify_routes_changed(session)
     session.commit()
     session.refresh(sensor)
     return sensor
@@ -50,6 +52,7 @@ def update_sensor(*, session: SessionDep, current_user: CurrentUser, id: uuid.UU
     update_data = sensor_in.model_dump(exclude_unset=True)
     sensor.sqlmodel_update(update_data)
     session.add(sensor)
+    notify_routes_changed(session)
     session.commit()
     session.refresh(sensor)
     return sensor
@@ -61,5 +64,6 @@ def delete_sensor(session: SessionDep, current_user: CurrentUser, id: uuid.UUID)
     if not sensor:
         raise HTTPException(status_code=404, detail="Sensor not found")
     session.delete(sensor)
+    notify_routes_changed(session)
     session.commit()
     return Message(message="Sensor deleted successfully")
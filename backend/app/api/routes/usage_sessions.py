@@ -2,9 +2,17 @@ import uuid
 from typing import Any, List
 
 from fastapi import APIRouter, HTTPException, status
-from sqlmodel import select
+from sqlmodel import col, select
 
+from app import crud
 from app.api.deps import CurrentUser, SessionDep
+from app.core.rollups import (
+    HourlyUsage,
+    UsageKey,
+    add_session_usage,
+    rebuild_booth_usage,
+    upsert_usage,
+)
 from app.models.usage_sessions import UsageSession, UsageSessionCreate, UsageSessionRead
 from app.models.general_models import Message
 
@@ -12,13 +20,27 @@ router = APIRouter(prefix="/usage-sessions", tags=["usage_sessions"])
 
 
 @router.get("/", response_model=List[UsageSessionRead])
-def read_usage_sessions(session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100) -> Any:
+def read_usage_sessions(
+    session: SessionDep,
+    current_user: CurrentUser,
+    org_unit_id: uuid.UUID | None = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> Any:
+    """
+    List usage sessions. With org_unit_id, only those of booths in that org
+    unit or any unit below it.
+    """
     if current_user.is_superuser:
         statement = select(UsageSession)
     else:
         if not current_user.client_id:
             return []
         statement = select(UsageSession).where(UsageSession.client_id == current_user.client_id)
+    if org_unit_id:
+        statement = statement.where(
+            col(UsageSession.org_unit_id).in_(crud.org_unit_subtree(org_unit_id))
+        )
     statement = statement.offset(skip).limit(limit)
     sessions = session.exec(statement).all()
     return sessions
@@ -40,6 +62,18 @@ def create_usage_session(*, session: SessionDep, current_user: CurrentUser, s_in
         raise HTTPException(status_code=403, detail="Not enough privileges")
     s = UsageSession.model_validate(s_in)
     session.add(s)
+    if s.end_time is not None:
+        # Sessions closed by the sessionizer are rolled up the same way
+        usage: dict[UsageKey, HourlyUsage] = {}
+        add_session_usage(
+            usage,
+            phone_booth_id=s.phone_booth_id,
+            org_unit_id=s.org_unit_id,
+            client_id=s.client_id,
+            start_time=s.start_time,
+            end_time=s.end_time,
+        )
+        upsert_usage(session, usage)
     session.commit()
     session.refresh(s)
     return s
@@ -53,5 +87,11 @@ def delete_usage_session(session: SessionDep, current_user: CurrentUser, id: uui
     if not current_user.is_superuser and s.client_id != current_user.client_id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     session.delete(s)
+    if s.end_time is not None:
+        # Take the session back out of the hourly rollup
+        session.flush()
+        rebuild_booth_usage(
+            session, phone_booth_id=s.phone_booth_id, start=s.start_time, end=s.end_time
+        )
     session.commit()
     return Message(message="Usage session deleted successfully")
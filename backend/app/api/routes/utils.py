@@ -1,8 +1,15 @@
-from fastapi import APIRouter, Depends
+from typing import Any
+
+from fastapi import APIRouter, Depends, Response, status
 from pydantic.networks import EmailStr
 
 from app.api.deps import get_current_active_superuser
-from app.models.general_models import Message
+from app.core.config import settings
+from app.core.ingest import pipeline
+from app.core.metrics import ingest_metrics
+from app.core.mqtt import get_ingest_health, mqtt_connection
+from app.core.retention import retention_purger
+from app.models.general_models import IngestHealth, Message
 from app.utils import generate_test_email, send_email
 
 router = APIRouter(prefix="/utils", tags=["utils"])
@@ -29,3 +36,38 @@ def test_email(email_to: EmailStr) -> Message:
 @router.get("/health-check/")
 async def health_check() -> bool:
     return True
+
+
+@router.get("/health-check/ingest/")
+async def ingest_health_check(response: Response) -> IngestHealth:
+    """
+    MQTT ingest state of this API process; 503 while it is trying to reconnect.
+
+    With INGEST_IN_API disabled this reports nothing useful: the `python -m
+    app.ingest` service serves its own health on INGEST_HEALTH_PORT.
+    """
+    if mqtt_connection.health.reconnecting:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return get_ingest_health(enabled=settings.api_ingest_enabled)
+
+
+@router.get(
+    "/metrics/ingest/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def ingest_metrics_snapshot() -> dict[str, Any]:
+    """
+    Ingest counters and timings of this process, since it started.
+    """
+    return {"metrics": ingest_metrics.snapshot(), "pipeline": pipeline.snapshot()}
+
+
+@router.get(
+    "/retention/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def retention_progress() -> dict[str, Any]:
+    """
+    Progress of this process's retention purges and the rows they reclaimed.
+    """
+    return retention_purger.snapshot()
@@ -0,0 +1,40 @@
+"""Rebuild booth_usage_hourly from usage_sessions.
+
+Run with ``python -m app.backfill_usage`` once after upgrading, and after
+sessions were edited or deleted by hand. Without ``--start`` it starts at
+the first session, without ``--end`` it runs up to the current hour.
+"""
+
+import argparse
+import logging
+from datetime import datetime, timedelta
+
+from sqlmodel import Session
+
+from app.core.db import engine
+from app.core.rollups import backfill_usage
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--start", type=datetime.fromisoformat, help="UTC, e.g. 2024-01-01")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="UTC, exclusive")
+    parser.add_argument(
+        "--chunk-days", type=float, default=7, help="Days rebuilt per transaction"
+    )
+    args = parser.parse_args()
+    with Session(engine) as session:
+        rows = backfill_usage(
+            session,
+            start=args.start,
+            end=args.end,
+            chunk=timedelta(days=args.chunk_days),
+        )
+    logger.info(f"Rebuilt {rows} booth usage rows")
+
+
+if __name__ == "__main__":
+    main()
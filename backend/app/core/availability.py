@@ -0,0 +1,221 @@
+import json
+import logging
+import threading
+import uuid
+from collections import defaultdict
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from typing import Any
+
+from sqlmodel import Session, col, select
+
+from app.core.db import engine
+from app.core.sessionizer import BUSY_STATE_ID
+from app.models.phone_booths import PhoneBooth
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+Publish = Callable[[str, bytes, int, bool], None]
+
+
+@dataclass
+class AvailabilityStats:
+    changes: int = 0
+    flushes: int = 0
+    booth_publishes: int = 0
+    org_unit_publishes: int = 0
+    errors: int = 0
+
+
+def booth_topic(prefix: str, booth_id: uuid.UUID) -> str:
+    return f"{prefix}/booths/{booth_id}"
+
+
+def org_unit_topic(prefix: str, org_unit_id: uuid.UUID) -> str:
+    return f"{prefix}/org-units/{org_unit_id}"
+
+
+def booth_payload(booth: Any) -> bytes:
+    return json.dumps(
+        {
+            "booth_id": str(booth.id),
+            "org_unit_id": str(booth.org_unit_id) if booth.org_unit_id else None,
+            "state_id": booth.state_id,
+            "busy": booth.state_id == BUSY_STATE_ID,
+        }
+    ).encode()
+
+
+def org_unit_payload(org_unit_id: uuid.UUID, booths: list[Any]) -> bytes:
+    busy = sum(booth.state_id == BUSY_STATE_ID for booth in booths)
+    return json.dumps(
+        {
+            "org_unit_id": str(org_unit_id),
+            "total": len(booths),
+            "busy": busy,
+            "free": len(booths) - busy,
+            "booths": {str(booth.id): booth.state_id for booth in booths},
+        }
+    ).encode()
+
+
+class AvailabilityPublisher:
+    """Publish booth availability to MQTT as retained messages.
+
+    Every booth has a retained message on ``{prefix}/booths/{id}`` and every
+    org unit one on ``{prefix}/org-units/{id}`` summarising its booths, so a
+    display that subscribes gets the current state at once and every change
+    after it. Changed booths are collected for ``window`` seconds and then
+    published once each, with their org units, from the committed rows.
+    While ``is_connected`` is false nothing is published and changes keep
+    accumulating; the first flush after ``start``, and the first after
+    ``refresh``, publishes every booth.
+
+    The org unit each booth was last published under is remembered, so a
+    booth that moved is also taken out of its old org unit's summary, and a
+    booth that was deleted has its retained message cleared; so does an org
+    unit left without booths.
+    """
+
+    def __init__(
+        self,
+        *,
+        publish: Publish,
+        is_connected: Callable[[], bool],
+        topic_prefix: str,
+        window: float,
+        qos: int = 1,
+    ) -> None:
+        self.publish = publish
+        self.is_connected = is_connected
+        self.topic_prefix = topic_prefix
+        self.window = window
+        self.qos = qos
+        self.stats = AvailabilityStats()
+        self._changed: set[uuid.UUID] = set()
+        self._everything = True
+        # Org unit of every booth as last published
+        self._published: dict[uuid.UUID, uuid.UUID | None] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self.refresh()
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="availability-publisher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self._flush()
+
+    def add(self, booth_ids: Iterable[uuid.UUID]) -> None:
+        with self._lock:
+            before = len(self._changed)
+            self._changed.update(booth_ids)
+            self.stats.changes += len(self._changed) - before
+
+    def refresh(self) -> None:
+        """Publish every booth on the next flush, e.g. after booths were edited."""
+        with self._lock:
+            self._everything = True
+
+    def flush(self) -> int:
+        """Publish the booths changed since the last flush; returns how many."""
+        if not self.is_connected():
+            return 0
+        with self._lock:
+            changed, self._changed = self._changed, set()
+            everything, self._everything = self._everything, False
+        if not changed and not everything:
+            return 0
+        # Booths whose retained messages may be out of date
+        stale = set(self._published) if everything else changed
+        # Org units they were published under
+        previous = {
+            org_unit_id
+            for booth_id in stale
+            if (org_unit_id := self._published.get(booth_id))
+        }
+        try:
+            with Session(engine) as session:
+                booths = self._load(
+                    session,
+                    None if everything else changed,
+                    previous,
+                )
+        except Exception:
+            with self._lock:
+                self._changed |= changed
+                self._everything |= everything
+            raise
+
+        by_org_unit: dict[uuid.UUID, list[Any]] = defaultdict(list)
+        published = 0
+        for booth in booths:
+            if booth.org_unit_id:
+                by_org_unit[booth.org_unit_id].append(booth)
+            if everything or booth.id in changed:
+                self.publish(
+                    booth_topic(self.topic_prefix, booth.id),
+                    booth_payload(booth),
+                    self.qos,
+                    True,
+                )
+                self._published[booth.id] = booth.org_unit_id
+                published += 1
+        for booth_id in stale - {booth.id for booth in booths}:
+            # Deleted; an empty retained message clears the old one
+            self.publish(booth_topic(self.topic_prefix, booth_id), b"", self.qos, True)
+            self._published.pop(booth_id, None)
+        for org_unit_id, members in by_org_unit.items():
+            self.publish(
+                org_unit_topic(self.topic_prefix, org_unit_id),
+                org_unit_payload(org_unit_id, members),
+                self.qos,
+                True,
+            )
+        for emptied in previous - by_org_unit.keys():
+            # Its last booth moved away or was deleted
+            self.publish(org_unit_topic(self.topic_prefix, emptied), b"", self.qos, True)
+        self.stats.flushes += 1
+        self.stats.booth_publishes += published
+        self.stats.org_unit_publishes += len(by_org_unit)
+        return published
+
+    def _load(
+        self,
+        session: Session,
+        booth_ids: set[uuid.UUID] | None,
+        org_unit_ids: set[uuid.UUID],
+    ) -> list[Any]:
+        """The changed booths plus every other booth of their org units, old and new."""
+        statement = select(PhoneBooth.id, PhoneBooth.org_unit_id, PhoneBooth.state_id)
+        if booth_ids is not None:
+            org_units = select(PhoneBooth.org_unit_id).where(
+                col(PhoneBooth.id).in_(booth_ids)
+            )
+            statement = statement.where(
+                col(PhoneBooth.id).in_(booth_ids)
+                | col(PhoneBooth.org_unit_id).in_(org_units)
+                | col(PhoneBooth.org_unit_id).in_(org_unit_ids)
+            )
+        return list(session.exec(statement))
+
+    def _flush(self) -> None:
+        try:
+            self.flush()
+        except Exception as e:
+            self.stats.errors += 1
+            logger.error(f"Failed to publish booth availability: {e}")
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.window):
+            self._flush()
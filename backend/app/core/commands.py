@@ -0,0 +1,277 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any
+
+from paho.mqtt import client as mqtt_client
+from paho.mqtt.properties import Properties
+from paho.mqtt.reasoncodes import ReasonCode
+from sqlmodel import Session, col, func, select, update
+from sqlmodel.sql.expression import Select
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.mqtt import get_standalone_client
+from app.models.phone_booths import PhoneBooth
+from app.models.sensor_commands import SensorCommandJob
+from app.models.sensors import Sensor
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Token bucket allowing ``rate`` calls per second on average.
+
+    Bursts of up to ``burst`` calls go through at once; a ``rate`` of 0
+    disables the limit.
+    """
+
+    def __init__(self, *, rate: float, burst: int = 1) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens < 1:
+            time.sleep((1 - self._tokens) / self.rate)
+            self._updated = time.monotonic()
+            self._tokens = 0
+        else:
+            self._tokens -= 1
+
+
+@dataclass
+class CommandProgress:
+    sent: int = 0
+    published: int = 0
+    failed: int = 0
+
+
+def select_command_targets(
+    job: SensorCommandJob,
+) -> Select[tuple[uuid.UUID, str | None]]:
+    """The ids and MQTT topics of the sensors a command job is sent to."""
+    statement = select(col(Sensor.id), col(Sensor.mqtt_topic)).where(
+        col(Sensor.mqtt_topic).is_not(None), Sensor.status == "active"
+    )
+    if job.client_id:
+        statement = statement.join(
+            PhoneBooth, col(Sensor.phone_booth_id) == col(PhoneBooth.id)
+        ).where(PhoneBooth.client_id == job.client_id)
+    if job.sensor_type:
+        statement = statement.where(Sensor.type == job.sensor_type)
+    return statement
+
+
+class CommandRunner:
+    """Publish sensor command jobs to MQTT, one background thread per job.
+
+    Target topics are read in pages of ``fetch_size`` rows by sensor id, each
+    in its own short transaction, so neither memory use nor the length of a
+    transaction grows with the fleet. Commands are sent at QoS 1 with up to
+    ``max_inflight`` unacknowledged at once and no faster than ``rate`` per
+    second; a job's counters are written back to its row every
+    ``progress_interval`` seconds. Messages the broker has not acknowledged
+    ``drain_timeout`` seconds after the last publish count as failed.
+
+    A job whose row has not been written for ``stale_after`` seconds was left
+    behind by a process that died; ``fail_interrupted`` marks those failed.
+    """
+
+    def __init__(
+        self,
+        *,
+        client_factory: Callable[[str], mqtt_client.Client],
+        rate: float,
+        max_inflight: int,
+        fetch_size: int,
+        progress_interval: float,
+        connect_timeout: float = 30.0,
+        drain_timeout: float = 30.0,
+        stale_after: float = 300.0,
+    ) -> None:
+        self.client_factory = client_factory
+        self.rate = rate
+        self.max_inflight = max_inflight
+        self.fetch_size = fetch_size
+        self.progress_interval = progress_interval
+        self.connect_timeout = connect_timeout
+        self.drain_timeout = drain_timeout
+        self.stale_after = stale_after
+
+    def submit(self, job_id: uuid.UUID) -> None:
+        threading.Thread(
+            target=self.run, args=(job_id,), name=f"sensor-command-{job_id}", daemon=True
+        ).start()
+
+    def run(self, job_id: uuid.UUID) -> None:
+        with Session(engine) as session:
+            job = session.get(SensorCommandJob, job_id)
+            if job is None:
+                logger.error(f"Sensor command job {job_id} not found")
+                return
+            targets = select_command_targets(job)
+            job.total = session.exec(
+                select(func.count()).select_from(targets.subquery())
+            ).one()
+            job.status = "running"
+            job.started_at = job.updated_at = datetime.utcnow()
+            session.add(job)
+            session.commit()
+            session.refresh(job)
+            session.expunge(job)
+
+        progress = CommandProgress()
+        try:
+            self._publish(job, targets, progress)
+        except Exception as e:
+            logger.error(f"Sensor command job {job_id} failed: {e}")
+            self._save(job_id, progress, status="failed", error=str(e)[:500])
+        else:
+            self._save(job_id, progress, status="completed")
+        logger.info(
+            f"Sensor command job {job_id}: {progress.published} published, "
+            f"{progress.failed} failed of {job.total}"
+        )
+
+    def fail_interrupted(self, session: Session) -> int:
+        """Mark failed the jobs no live process is running; returns how many."""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_after)
+        result = session.connection().execute(
+            update(SensorCommandJob)
+            .where(
+                col(SensorCommandJob.status).in_(("pending", "running")),
+                func.coalesce(SensorCommandJob.updated_at, SensorCommandJob.created_at)
+                < cutoff,
+            )
+            .values(
+                status="failed",
+                error="Interrupted by a restart",
+                finished_at=datetime.utcnow(),
+            )
+        )
+        session.commit()
+        if result.rowcount:
+            logger.warning(f"Marked {result.rowcount} interrupted sensor command jobs failed")
+        return result.rowcount
+
+    def _publish(
+        self,
+        job: SensorCommandJob,
+        targets: Select[tuple[uuid.UUID, str | None]],
+        progress: CommandProgress,
+    ) -> None:
+        payload = json.dumps(job.payload).encode()
+        inflight = threading.Semaphore(self.max_inflight)
+        lock = threading.Lock()
+        connected = threading.Event()
+
+        def on_connect(
+            _client: mqtt_client.Client,
+            _userdata: Any,
+            _flags: mqtt_client.ConnectFlags,
+            reason_code: ReasonCode,
+            _properties: Properties | None,
+        ) -> None:
+            if not reason_code.is_failure:
+                connected.set()
+
+        def on_publish(
+            _client: mqtt_client.Client,
+            _userdata: Any,
+            _mid: int,
+            reason_code: ReasonCode,
+            _properties: Properties | None,
+        ) -> None:
+            with lock:
+                if reason_code.is_failure:
+                    progress.failed += 1
+                else:
+                    progress.published += 1
+            inflight.release()
+
+        client = self.client_factory(f"commands-{job.id}")
+        client.on_connect = on_connect
+        client.on_publish = on_publish
+        client.max_inflight_messages_set(self.max_inflight)
+        client.connect(settings.MQTT_BROKER or "", settings.MQTT_PORT)
+        client.loop_start()
+        try:
+            if not connected.wait(self.connect_timeout):
+                raise TimeoutError("Could not connect to the MQTT broker")
+            limiter = RateLimiter(rate=self.rate)
+            saved = time.monotonic()
+            after: uuid.UUID | None = None
+            while True:
+                page = targets.order_by(col(Sensor.id)).limit(self.fetch_size)
+                if after is not None:
+                    page = page.where(col(Sensor.id) > after)
+                with Session(engine) as session:
+                    rows = session.exec(page).all()
+                if not rows:
+                    break
+                after = rows[-1][0]
+                for _, topic in rows:
+                    limiter.acquire()
+                    # paho keeps messages published while reconnecting and
+                    # sends them later, so every one holds a slot until acked
+                    if not inflight.acquire(timeout=self.drain_timeout):
+                        raise TimeoutError("The MQTT broker stopped acknowledging")
+                    client.publish(f"{topic}/{job.topic_suffix}", payload, qos=1)
+                    progress.sent += 1
+                    if time.monotonic() - saved >= self.progress_interval:
+                        self._save(job.id, progress)
+                        saved = time.monotonic()
+            # Wait for the outstanding PUBACKs by taking back every slot
+            deadline = time.monotonic() + self.drain_timeout
+            for _ in range(self.max_inflight):
+                if not inflight.acquire(timeout=max(0.0, deadline - time.monotonic())):
+                    break
+        finally:
+            with lock:
+                progress.failed = progress.sent - progress.published
+            client.disconnect()
+            client.loop_stop()
+
+    def _save(
+        self,
+        job_id: uuid.UUID,
+        progress: CommandProgress,
+        *,
+        status: str | None = None,
+        error: str | None = None,
+    ) -> None:
+        with Session(engine) as session:
+            job = session.get(SensorCommandJob, job_id)
+            if job is None:
+                return
+            job.published = progress.published
+            job.failed = progress.failed
+            job.updated_at = datetime.utcnow()
+            if status:
+                job.status = status
+                job.error = error
+                job.finished_at = datetime.utcnow()
+            session.add(job)
+            session.commit()
+
+
+command_runner = CommandRunner(
+    client_factory=get_standalone_client,
+    rate=settings.SENSOR_COMMAND_RATE_PER_SECOND,
+    max_inflight=settings.SENSOR_COMMAND_MAX_INFLIGHT,
+    fetch_size=settings.SENSOR_COMMAND_FETCH_SIZE,
+    progress_interval=settings.SENSOR_COMMAND_PROGRESS_SECONDS,
+)
@@ -93,19 +93,147 @@ class Settings(BaseSettings):
     EMAIL_TEST_USER: EmailStr = "test@example.com"
     FIRST_SUPERUSER: EmailStr
     FIRST_SUPERUSER_PASSWORD: str
-    
+
     # MQTT Settings
     MQTT_BROKER: str | None = None
     MQTT_PORT: int = 8883  # Default TLS port
     MQTT_USERNAME: str | None = None
     MQTT_PASSWORD: str | None = None
     MQTT_CA_CERTS: str | None = None  # Path to CA certificate
-    
+    MQTT_TOPIC: str = "python/mqtt"
+    # How uvicorn workers and replicas share the subscription:
+    # "all" consumes everywhere, "shared" uses $share/<group>/<topic>,
+    # "leader" consumes only in the holder of a Postgres advisory lock
+    MQTT_CONSUMER_MODE: Literal["all", "shared", "leader"] = "shared"
+    MQTT_SHARED_GROUP: str = "ingest"
+    MQTT_LEADER_LOCK_KEY: int = 0x6D717474
+    MQTT_LEADER_RETRY_SECONDS: float = 5.0
+    # 1 turns on at-least-once ingest: QoS 1 subscriptions, a persistent
+    # session and acks sent only once a message's batch is committed. The
+    # session belongs to MQTT_CLIENT_ID, which must be stable and unique per
+    # consumer process. Unacked messages count against the broker's in-flight
+    # window (e.g. mosquitto max_inflight_messages), so size it to at least
+    # INGEST_BATCH_SIZE
+    MQTT_QOS: Literal[0, 1] = 0
+    MQTT_CLIENT_ID: str | None = None
+    MQTT_SESSION_EXPIRY_SECONDS: int = 24 * 60 * 60  # MQTT 5 only
+    # Reconnect delays grow exponentially between these bounds, with jitter
+    MQTT_RECONNECT_MIN_SECONDS: float = 1.0
+    MQTT_RECONNECT_MAX_SECONDS: float = 60.0
+    # With MQTT_QOS=1, messages left unacked (spool or dead-letter store
+    # unavailable) are only redelivered on a new connection, so the consumer
+    # reconnects, at most this often, after leaving any
+    MQTT_REDELIVERY_INTERVAL_SECONDS: float = 30.0
+    # Messages published while disconnected are kept until reconnecting
+    MQTT_OUTBOUND_BUFFER_SIZE: int = 1000
+    # Payload schema version per MQTT topic filter, e.g. {"booths/+/v2": "v2"};
+    # topics matching no filter use the default
+    MQTT_PAYLOAD_SCHEMAS: dict[str, str] = {}
+    MQTT_PAYLOAD_DEFAULT_SCHEMA: str = "v1"
+    # Payload encoding per MQTT topic filter, then per Sensor.type; JSON if
+    # neither matches
+    MQTT_PAYLOAD_ENCODINGS: dict[str, Literal["json", "msgpack", "cbor"]] = {}
+    MQTT_SENSOR_TYPE_ENCODINGS: dict[str, Literal["json", "msgpack", "cbor"]] = {}
+
+    # Ingest Settings
+    # Consume MQTT inside the API processes; disable when `python -m app.ingest`
+    # runs as its own service
+    INGEST_IN_API: bool = True
+    INGEST_BATCH_SIZE: int = 500  # Max sensor events per INSERT
+    INGEST_FLUSH_INTERVAL_MS: int = 250  # Max time an event waits in a batch
+    INGEST_WORKERS: int = 2
+    # `python -m app.ingest` serves its health on this port; 0 disables it
+    INGEST_HEALTH_PORT: int = 8001
+    INGEST_QUEUE_SIZE: int = 10_000
+    # What to do with new messages when the ingest queue is full. drop_oldest
+    # leaves the dropped message unacked, so QoS 1 messages are redelivered
+    INGEST_OVERFLOW_POLICY: Literal["block", "drop_oldest", "spill"] = "drop_oldest"
+    # Each process spills to its own file under INGEST_SPILL_DIR, up to
+    # INGEST_SPILL_MAX_BYTES
+    INGEST_SPILL_DIR: str = "/tmp/ingest-spill"
+    INGEST_SPILL_MAX_BYTES: int = 256 * 1024 * 1024
+    # Dedup keys of recently written sensor events kept in memory, so most
+    # redelivered messages are dropped before they reach Postgres
+    INGEST_DEDUP_CACHE_SIZE: int = 100_000
+    # Serial numbers and topics found to match no sensor, remembered so they
+    # are not looked up again on every batch
+    INGEST_ROUTING_UNKNOWN_CACHE_SIZE: int = 10_000
+    # Events from unroutable sensors are counted, and summarized in the log at
+    # most this often
+    INGEST_UNROUTABLE_LOG_INTERVAL_SECONDS: float = 60.0
+    # "changes" stores only events that change a sensor's state, plus one
+    # keepalive sample per INGEST_KEEPALIVE_SECONDS; last_seen still follows
+    # every message
+    INGEST_STORE_MODE: Literal["all", "changes"] = "all"
+    INGEST_KEEPALIVE_SECONDS: float = 300.0
+    # Undecodable MQTT messages, and events that fail to insert on their own,
+    # are stored in dead_letters
+    DEAD_LETTER_FLUSH_SECONDS: float = 2.0
+    DEAD_LETTER_LOG_INTERVAL_SECONDS: float = 60.0
+    # sensor_events is range-partitioned on event_time_utc. Partitions for the
+    # current interval and the next SENSOR_EVENTS_PARTITIONS_AHEAD are created
+    # in advance
+    SENSOR_EVENTS_PARTITION_INTERVAL: Literal["month", "day"] = "month"
+    SENSOR_EVENTS_PARTITIONS_AHEAD: int = 2
+    PARTITION_MAINTENANCE_ENABLED: bool = True
+    PARTITION_MAINTENANCE_INTERVAL_SECONDS: float = 60 * 60
+    PARTITION_MAINTENANCE_LOCK_KEY: int = 0x70617274
+    # Retention of clients without their own; None keeps everything. Events
+    # past every client's retention go with their whole partition, which is
+    # detached (kept as a plain table) or dropped
+    SENSOR_EVENTS_RETENTION_DAYS: int | None = None
+    SENSOR_EVENTS_EXPIRED_PARTITIONS: Literal["detach", "drop"] = "detach"
+    USAGE_SESSIONS_RETENTION_DAYS: int | None = None
+    # Other expired rows are deleted in chunks of RETENTION_CHUNK_SIZE, one
+    # transaction each, pausing between chunks and keeping under
+    # RETENTION_MAX_ROWS_PER_SECOND (0 for no limit)
+    RETENTION_ENABLED: bool = True
+    RETENTION_INTERVAL_SECONDS: float = 60 * 60
+    RETENTION_CHUNK_SIZE: int = 5000
+    RETENTION_CHUNK_SLEEP_SECONDS: float = 0.1
+    RETENTION_MAX_ROWS_PER_SECOND: float = 0
+    RETENTION_LOCK_KEY: int = 0x72657465
+    # Durable spool for batches that could not be written while the DB was down
+    # Each process spools to its own directory under SPOOL_DIR, up to
+    # SPOOL_MAX_BYTES
+    SPOOL_DIR: str = "/tmp/ingest-spool"
+    SPOOL_SEGMENT_BYTES: int = 16 * 1024 * 1024
+    SPOOL_MAX_BYTES: int = 1024 * 1024 * 1024
+    SPOOL_REPLAY_INTERVAL_SECONDS: float = 5.0
+    # Ingest metrics are broken down by this many leading MQTT topic levels
+    METRICS_TOPIC_LEVELS: int = 1
+    # Queue lag and decode time are timed on one message in this many
+    METRICS_SAMPLE_EVERY: int = 16
+    # How often buffered PhoneBooth.last_seen heartbeats are written
+    LAST_SEEN_FLUSH_SECONDS: float = 5.0
+    # Derive usage sessions and booth state from sensor events. Each booth's
+    # events must reach a single process: use leader mode, a single ingest
+    # worker, or a broker that dispatches shared subscriptions by topic
+    SESSIONIZER_ENABLED: bool = False
+    SESSIONIZER_LATENESS_SECONDS: float = 10.0  # Reorder window for late events
+    # Publish booth state as retained MQTT messages on
+    # <prefix>/booths/<id> and <prefix>/org-units/<id>; needs the sessionizer.
+    # Changes within the window are coalesced into one publish per booth
+    AVAILABILITY_PUBLISH_ENABLED: bool = False
+    AVAILABILITY_TOPIC_PREFIX: str = "availability"
+    AVAILABILITY_COALESCE_MS: int = 500
+    # Sensor command jobs: publishes per second (0 for no limit), QoS 1
+    # messages awaiting PUBACK, and sensors fetched per cursor round trip
+    SENSOR_COMMAND_RATE_PER_SECOND: float = 200.0
+    SENSOR_COMMAND_MAX_INFLIGHT: int = 100
+    SENSOR_COMMAND_FETCH_SIZE: int = 1000
+    SENSOR_COMMAND_PROGRESS_SECONDS: float = 1.0
+
     @computed_field  # type: ignore[prop-decorator]
     @property
     def mqtt_enabled(self) -> bool:
         return bool(self.MQTT_BROKER)
 
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def api_ingest_enabled(self) -> bool:
+        return self.mqtt_enabled and self.INGEST_IN_API
+
     def _check_default_secret(self, var_name: str, value: str | None) -> None:
         if value == "changethis":
             message = (
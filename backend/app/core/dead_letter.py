@@ -0,0 +1,132 @@
+import logging
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from sqlmodel import Session
+
+from app import crud
+from app.core.db import engine
+from app.models.dead_letters import DeadLetter
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DeadLetterStats:
+    received: int = 0
+    stored: int = 0
+    dropped: int = 0
+
+
+class DeadLetterWriter:
+    """Buffer undecodable MQTT messages and insert them into ``dead_letters`` in batches.
+
+    Logging is rate limited to one summary line per ``log_interval`` so a
+    storm of bad payloads costs a counter increment per message, not a log
+    record. At most ``max_buffered`` messages wait for the next flush; the
+    rest are counted as dropped. Messages whose insert fails are left
+    unacknowledged and reported to ``on_unacked``.
+    """
+
+    def __init__(
+        self, *, flush_interval: float, log_interval: float, max_buffered: int
+    ) -> None:
+        self.flush_interval = flush_interval
+        self.log_interval = log_interval
+        self.max_buffered = max_buffered
+        self.on_unacked: Callable[[], None] | None = None
+        self.stats = DeadLetterStats()
+        self._buffer: list[DeadLetter] = []
+        self._acks: list[Callable[[], None]] = []
+        self._errors: Counter[str] = Counter()
+        self._last_error = ""
+        self._last_log = time.monotonic()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="dead-letter-writer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        self._log_summary()
+
+    def add(
+        self,
+        topic: str,
+        payload: bytes,
+        error: Exception,
+        ack: Callable[[], None] | None = None,
+    ) -> None:
+        """Buffer a message; ``ack`` is called once it is stored or dropped."""
+        error_class = type(error).__name__
+        with self._lock:
+            self.stats.received += 1
+            self._errors[error_class] += 1
+            if len(self._buffer) >= self.max_buffered:
+                self.stats.dropped += 1
+                if ack:
+                    ack()
+                return
+            if ack:
+                self._acks.append(ack)
+            self._last_error = str(error)
+            self._buffer.append(
+                DeadLetter(
+                    topic=topic[:255],
+                    payload=payload,
+                    error_class=error_class[:100],
+                    error_message=self._last_error[:500],
+                )
+            )
+
+    def flush(self) -> int:
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+            acks, self._acks = self._acks, []
+        if not batch:
+            return 0
+        try:
+            with Session(engine) as session:
+                crud.create_dead_letters(session=session, dead_letters=batch)
+        except Exception as e:
+            # Left unacknowledged, for the broker to redeliver after a reconnect
+            logger.error(f"Failed to store {len(batch)} dead letters: {e}")
+            with self._lock:
+                self.stats.dropped += len(batch)
+            if acks and self.on_unacked:
+                self.on_unacked()
+            return 0
+        with self._lock:
+            self.stats.stored += len(batch)
+        for ack in acks:
+            ack()
+        return len(batch)
+
+    def _log_summary(self) -> None:
+        with self._lock:
+            errors, self._errors = self._errors, Counter()
+            last_error = self._last_error
+            self._last_log = time.monotonic()
+        if errors:
+            summary = ", ".join(f"{name}: {count}" for name, count in errors.items())
+            logger.error(f"Dead-lettered MQTT messages ({summary}); last error: {last_error}")
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
+            if time.monotonic() - self._last_log >= self.log_interval:
+                self._log_summary()
@@ -0,0 +1,71 @@
+import threading
+import uuid
+from collections import OrderedDict
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import datetime
+
+from app.core.config import settings
+from app.models.sensor_events import SensorEventCreate
+
+DedupKey = tuple[uuid.UUID, datetime, int]
+
+
+@dataclass
+class DedupStats:
+    filtered: int = 0  # Dropped by the in-memory filter
+    conflicts: int = 0  # Reached Postgres and were dropped by the unique index
+
+
+def dedup_key(event: SensorEventCreate) -> DedupKey:
+    """The natural key of a sensor event, as enforced by ``uq_sensor_events_dedup``."""
+    return (event.sensor_id, event.event_time_utc, event.state_id)
+
+
+class RecentKeys:
+    """Bounded LRU set of the dedup keys of recently committed sensor events.
+
+    Redelivered messages usually arrive shortly after the original, so most
+    duplicates are dropped here without a round trip. Anything the filter
+    misses is still caught by the unique index. Keys are only added once
+    their batch has committed, so a failed write never hides a redelivery.
+    """
+
+    def __init__(self, *, capacity: int) -> None:
+        self.capacity = capacity
+        self.stats = DedupStats()
+        self._keys: OrderedDict[DedupKey, None] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def filter(self, events: Iterable[SensorEventCreate]) -> list[SensorEventCreate]:
+        """Drop events already committed, or repeated within ``events``."""
+        fresh = []
+        seen: set[DedupKey] = set()
+        with self._lock:
+            for event in events:
+                key = dedup_key(event)
+                if key in self._keys:
+                    self._keys.move_to_end(key)
+                elif key not in seen:
+                    seen.add(key)
+                    fresh.append(event)
+                    continue
+                self.stats.filtered += 1
+        return fresh
+
+    def add_committed(self, events: list[SensorEventCreate], *, inserted: int) -> None:
+        """Remember a committed batch, of which ``inserted`` rows were new."""
+        with self._lock:
+            self.stats.conflicts += len(events) - inserted
+            for event in events:
+                key = dedup_key(event)
+                self._keys[key] = None
+                self._keys.move_to_end(key)
+            while len(self._keys) > self.capacity:
+                self._keys.popitem(last=False)
+
+
+recent_events = RecentKeys(capacity=settings.INGEST_DEDUP_CACHE_SIZE)
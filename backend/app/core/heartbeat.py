@@ -0,0 +1,97 @@
+import logging
+import threading
+import time
+import uuid
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlmodel import Session
+
+from app import crud
+from app.core.db import engine
+from app.models.sensor_events import SensorEventCreate
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LastSeenStats:
+    touches: int = 0
+    flushes: int = 0
+    rows: int = 0
+    last_flush_ms: float = 0.0
+
+
+class LastSeenBuffer:
+    """Write-behind buffer for ``PhoneBooth.last_seen``.
+
+    Keeps only the newest timestamp per booth and writes every dirty booth in
+    a single statement each ``flush_interval`` seconds, instead of one UPDATE
+    per sensor message.
+    """
+
+    def __init__(self, *, flush_interval: float) -> None:
+        self.flush_interval = flush_interval
+        self.stats = LastSeenStats()
+        self._dirty: dict[uuid.UUID, datetime] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="last-seen-flusher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def touch(self, booth_id: uuid.UUID, at: datetime) -> None:
+        with self._lock:
+            self.stats.touches += 1
+            self._touch(booth_id, at)
+
+    def add(self, events: Iterable[SensorEventCreate]) -> None:
+        with self._lock:
+            for event in events:
+                self.stats.touches += 1
+                self._touch(event.phone_booth_id, event.event_time_utc)
+
+    def _touch(self, booth_id: uuid.UUID, at: datetime) -> None:
+        current = self._dirty.get(booth_id)
+        if current is None or at > current:
+            self._dirty[booth_id] = at
+
+    def flush(self) -> int:
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+        if not dirty:
+            return 0
+        start = time.perf_counter()
+        try:
+            with Session(engine) as session:
+                updated = crud.update_booths_last_seen(session=session, last_seen=dirty)
+        except Exception as e:
+            logger.error(f"Failed to flush last_seen for {len(dirty)} booths: {e}")
+            # Keep the timestamps for the next flush unless newer ones arrived
+            with self._lock:
+                for booth_id, at in dirty.items():
+                    self._touch(booth_id, at)
+            return 0
+        with self._lock:
+            self.stats.flushes += 1
+            self.stats.rows += updated
+            self.stats.last_flush_ms = (time.perf_counter() - start) * 1000
+        return updated
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
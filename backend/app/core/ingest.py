@@ -0,0 +1,880 @@
+import logging
+import os
+import struct
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Sequence
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, BinaryIO, Literal
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import TimeoutError as SQLAlchemyTimeoutError
+from sqlmodel import Session, col, delete, select
+
+from app import crud
+from app.core.config import settings
+from app.core.db import engine
+from app.core.dead_letter import DeadLetterWriter
+from app.core.dedup import recent_events
+from app.core.heartbeat import LastSeenBuffer
+from app.core.metrics import ingest_metrics
+from app.core.payloads import SENSOR_READING, SensorReading, payload_decoder
+from app.core.process_dir import claim_process_dir, orphaned_dirs
+from app.core.routing import routing_table
+from app.core.sessionizer import Sessionizer
+from app.core.spool import Spool, SpoolReplayer
+from app.core.state_changes import StateChangeFilter
+from app.models.dead_letters import DeadLetter, DeadLetterReplayResult
+from app.models.sensor_events import SensorEventCreate
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+OverflowPolicy = Literal["block", "drop_oldest", "spill"]
+
+# Acknowledges one MQTT message to the broker (QoS 1 with manual acks)
+Ack = Callable[[], None]
+
+# Spill records are framed as <topic length><payload length><topic><payload>
+_SPILL_HEADER = struct.Struct("<HI")
+
+
+@dataclass
+class RawMessage:
+    topic: str
+    payload: bytes
+    ack: Ack | None = None
+    # perf_counter() when queued, on messages sampled for the lag metric
+    queued_at: float = 0.0
+
+
+@dataclass
+class QueueStats:
+    enqueued: int = 0
+    dropped: int = 0
+    spilled: int = 0
+    reclaimed: int = 0
+    blocked: int = 0
+
+
+@dataclass
+class BatchStats:
+    batches: int = 0
+    rows: int = 0
+    rejected: int = 0
+    last_batch_size: int = 0
+    last_flush_ms: float = 0.0
+    max_flush_ms: float = 0.0
+
+
+def ack_all(acks: Sequence[Ack | None]) -> None:
+    """Acknowledge messages once whatever they became is durable.
+
+    MQTT has no cumulative ack, so this sends one PUBACK per message, but only
+    after a whole batch commits, and back to back.
+    """
+    for ack in acks:
+        if ack is not None:
+            ack()
+
+
+def left_unacked(acks: Sequence[Ack | None], on_unacked: Callable[[], None] | None) -> None:
+    """Report messages given up on without an ack.
+
+    A broker resends unacknowledged QoS 1 messages only after the client
+    reconnects, and until then each one holds a slot of its in-flight window,
+    so ``on_unacked`` has to get the connection to reconnect.
+    """
+    if on_unacked is not None and any(ack is not None for ack in acks):
+        on_unacked()
+
+
+def decode_message(topic: str, payload: bytes) -> SensorReading:
+    return payload_decoder.decode(topic, payload)
+
+
+def route_sensor_events(
+    *, session: Session, messages: Sequence[SensorReading]
+) -> list[SensorEventCreate | None]:
+    """Turn decoded messages into sensor events, None for each unroutable one.
+
+    Messages are routed by serial number, or by MQTT topic when the payload
+    has none. Messages from unknown sensors, or from booths that are not
+    assigned to a client and org unit, are unroutable.
+    """
+    routes = routing_table.resolve(
+        session=session, keys=((m.serial_number, m.mqtt_topic) for m in messages)
+    )
+    events_in: list[SensorEventCreate | None] = []
+    for message, route in zip(messages, routes, strict=True):
+        if route is None or route.client_id is None or route.org_unit_id is None:
+            unroutable.add(message.serial_number or message.mqtt_topic or "")
+            events_in.append(None)
+            continue
+        events_in.append(
+            SensorEventCreate(
+                sensor_id=route.sensor_id,
+                phone_booth_id=route.phone_booth_id,
+                client_id=route.client_id,
+                org_unit_id=route.org_unit_id,
+                state_id=message.state_id,
+                event_time_utc=message.event_time_utc,
+                raw_payload=message.raw_payload,
+            )
+        )
+    return events_in
+
+
+def store_sensor_events(
+    *, session: Session, events_in: list[SensorEventCreate]
+) -> list[SensorEventCreate]:
+    """Insert routed events in one statement.
+
+    Duplicates of recently written events are dropped, and so are, with
+    ``INGEST_STORE_MODE=changes``, events that do not change their sensor's
+    state. Returns the events that were written, or were found to be stored
+    already.
+    """
+    events_in = recent_events.filter(events_in)
+    suppressed: list[SensorEventCreate] = []
+    if state_changes:
+        events_in, suppressed = state_changes.filter(events_in)
+    inserted = crud.insert_sensor_events(session=session, events_in=events_in)
+    recent_events.add_committed(events_in, inserted=inserted.total())
+    if state_changes:
+        state_changes.commit(events_in, suppressed, inserted=inserted.total())
+    # Only rows the unique index let through count as persisted
+    ingest_metrics.events_persisted(inserted)
+    return events_in
+
+
+def write_sensor_events(
+    *, session: Session, messages: Sequence[SensorReading]
+) -> list[SensorEventCreate]:
+    """Route a batch of decoded messages and insert them in one statement.
+
+    Unroutable messages are dropped; see ``route_sensor_events`` and
+    ``store_sensor_events``.
+    """
+    routed = route_sensor_events(session=session, messages=messages)
+    return store_sensor_events(
+        session=session, events_in=[event for event in routed if event is not None]
+    )
+
+
+def replay_dead_letters(
+    *, session: Session, start_id: int, end_id: int, limit: int
+) -> DeadLetterReplayResult:
+    """Run a range of dead letters through decoding and writing again.
+
+    Letters that now decode and route are written as sensor events, or found
+    to be stored already, and deleted; the others stay, with their error
+    updated. Written events go to the same listeners as live batches while
+    this process runs the ingest pipeline. Otherwise only last_seen is
+    updated: the sessionizer does not run here, and the one in the ingest
+    process only sees live events.
+    """
+    # The API process may not run the listener that keeps the table current
+    routing_table.load(session)
+    letters = session.exec(
+        select(DeadLetter)
+        .where(col(DeadLetter.id) >= start_id, col(DeadLetter.id) <= end_id)
+        .order_by(col(DeadLetter.id))
+        .limit(limit)
+    ).all()
+    messages = []
+    decoded = []
+    for letter in letters:
+        try:
+            messages.append(decode_message(letter.topic, letter.payload))
+            decoded.append(letter)
+        except Exception as e:
+            _set_error(letter, type(e).__name__, str(e))
+            session.add(letter)
+    routed = route_sensor_events(session=session, messages=messages)
+    events_in = []
+    handled = []
+    for letter, event in zip(decoded, routed, strict=True):
+        if event is None:
+            _set_error(letter, "UnroutableSensor", "No booth with a client and org unit")
+            session.add(letter)
+            continue
+        events_in.append(event)
+        handled.append(letter.id)
+    events = store_sensor_events(session=session, events_in=events_in)
+    if handled:
+        session.execute(delete(DeadLetter).where(col(DeadLetter.id).in_(handled)))
+    session.commit()
+    if pipeline.running:
+        batcher.notify(events)
+    else:
+        # Nothing flushes the buffer in a process that does not consume MQTT
+        last_seen.add(events)
+        last_seen.flush()
+    return DeadLetterReplayResult(
+        replayed=len(letters), written=len(events), failed=len(letters) - len(handled)
+    )
+
+
+def _set_error(letter: DeadLetter, error_class: str, error_message: str) -> None:
+    letter.error_class = error_class[:100]
+    letter.error_message = error_message[:500]
+
+
+class UnroutableLog:
+    """Count events dropped as unroutable and summarize them in the log.
+
+    A sensor that is not registered yet keeps sending, so a drop costs a
+    counter increment and the log gets at most one line per ``interval``.
+    """
+
+    def __init__(self, *, interval: float) -> None:
+        self.interval = interval
+        self.dropped = 0
+        self._since_log = 0
+        self._last_log = float("-inf")
+        self._lock = threading.Lock()
+
+    def add(self, key: str) -> None:
+        """Count an event from the sensor with serial number or topic ``key``."""
+        with self._lock:
+            self.dropped += 1
+            self._since_log += 1
+            now = time.monotonic()
+            if now - self._last_log < self.interval:
+                return
+            count, self._since_log = self._since_log, 0
+            self._last_log = now
+        logger.warning(f"Dropped {count} events from unroutable sensors, the last from {key}")
+
+
+class SensorEventBatcher:
+    """Collect decoded sensor messages into size- and time-bounded batches.
+
+    A batch is written as soon as it holds ``batch_size`` messages, or once its
+    oldest message has waited ``flush_interval`` seconds, whichever is first.
+    Batches that fail because the database is unreachable go to ``spool``;
+    ``on_unacked`` is called when messages fit in neither. Batches that fail
+    for any other reason are written again one message at a time, and the
+    messages that still fail go to ``dead_letters``.
+    """
+
+    def __init__(
+        self,
+        *,
+        batch_size: int,
+        flush_interval: float,
+        spool: Spool | None = None,
+        dead_letters: DeadLetterWriter | None = None,
+    ) -> None:
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spool = spool
+        self.dead_letters = dead_letters
+        self.on_unacked: Callable[[], None] | None = None
+        self.stats = BatchStats()
+        self._listeners: list[Callable[[list[SensorEventCreate]], None]] = []
+        self._buffer: list[SensorReading] = []
+        self._acks: list[Ack | None] = []
+        self._oldest: float = 0.0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def add_listener(self, listener: Callable[[list[SensorEventCreate]], None]) -> None:
+        """Call ``listener`` with the events of every batch once it is committed."""
+        self._listeners.append(listener)
+
+    def start(self) -> None:
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="sensor-event-batcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def add(self, message: SensorReading, ack: Ack | None = None) -> None:
+        """Queue ``message``; ``ack`` is called once it is committed or spooled."""
+        with self._lock:
+            if not self._buffer:
+                self._oldest = time.monotonic()
+            self._buffer.append(message)
+            self._acks.append(ack)
+            full = len(self._buffer) >= self.batch_size
+            if full:
+                batch, acks = self._take()
+        if full:
+            self._write(batch, acks)
+
+    def flush(self) -> None:
+        with self._lock:
+            batch, acks = self._take()
+        if batch:
+            self._write(batch, acks)
+
+    def _take(self) -> tuple[list[SensorReading], list[Ack | None]]:
+        batch, self._buffer = self._buffer, []
+        acks, self._acks = self._acks, []
+        return batch, acks
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.flush_interval / 4):
+            with self._lock:
+                due = (
+                    bool(self._buffer)
+                    and time.monotonic() - self._oldest >= self.flush_interval
+                )
+                batch, acks = self._take() if due else ([], [])
+            if batch:
+                self._write(batch, acks)
+
+    def write_batch(self, batch: list[SensorReading]) -> list[SensorEventCreate]:
+        """Write one batch and notify listeners; database errors propagate."""
+        start = time.perf_counter()
+        with Session(engine) as session:
+            events = write_sensor_events(session=session, messages=batch)
+        written = len(events)
+        elapsed = time.perf_counter() - start
+        ingest_metrics.flush_seconds.observe(elapsed)
+        elapsed_ms = elapsed * 1000
+        with self._lock:
+            stats = self.stats
+            stats.batches += 1
+            stats.rows += written
+            stats.rejected += len(batch) - written
+            stats.last_batch_size = len(batch)
+            stats.last_flush_ms = elapsed_ms
+            stats.max_flush_ms = max(stats.max_flush_ms, elapsed_ms)
+        logger.info(f"Flushed {written}/{len(batch)} sensor events in {elapsed_ms:.1f} ms")
+        self.notify(events)
+        return events
+
+    def notify(self, events: list[SensorEventCreate]) -> None:
+        """Pass committed events on to the listeners, e.g. after a replay."""
+        for listener in self._listeners:
+            listener(events)
+
+    def _write(self, batch: list[SensorReading], acks: list[Ack | None]) -> None:
+        try:
+            self.write_batch(batch)
+        except (OperationalError, SQLAlchemyTimeoutError) as e:
+            self._spool(batch, acks, e)
+            return
+        except Exception as e:
+            # Something in the batch itself; write the messages one at a time
+            # so the others still go in
+            logger.error(
+                f"Failed to write batch of {len(batch)} sensor events, "
+                f"retrying one at a time: {e}"
+            )
+            self._write_each(batch, acks)
+            return
+        ack_all(acks)
+
+    def _write_each(self, batch: list[SensorReading], acks: list[Ack | None]) -> None:
+        for i, (message, ack) in enumerate(zip(batch, acks, strict=True)):
+            try:
+                self.write_batch([message])
+            except (OperationalError, SQLAlchemyTimeoutError) as e:
+                self._spool(batch[i:], acks[i:], e)
+                return
+            except Exception as e:
+                self._reject(SENSOR_READING.dump_json(message), message.mqtt_topic, e, ack)
+                continue
+            ack_all([ack])
+
+    def _spool(
+        self, batch: list[SensorReading], acks: list[Ack | None], error: Exception
+    ) -> None:
+        # The database is unreachable: keep the batch for replay. Messages
+        # that are neither written nor spooled stay unacknowledged, for the
+        # broker to redeliver once on_unacked has us reconnect
+        if self.spool is None:
+            logger.error(f"Failed to write batch of {len(batch)} sensor events: {error}")
+            left_unacked(acks, self.on_unacked)
+            return
+        spooled = self.spool.append([SENSOR_READING.dump_json(m) for m in batch])
+        logger.warning(f"Spooled {spooled}/{len(batch)} sensor events: {error}")
+        ack_all(acks[:spooled])
+        left_unacked(acks[spooled:], self.on_unacked)
+
+    def _reject(
+        self, record: bytes, topic: str | None, error: Exception, ack: Ack | None
+    ) -> None:
+        """Dead-letter a message that fails on its own; it is acked once stored."""
+        if self.dead_letters is None:
+            logger.error(f"Failed to write sensor event {record!r}: {error}")
+            left_unacked([ack], self.on_unacked)
+            return
+        self.dead_letters.add(topic or "", record, error, ack)
+
+    def replay(self, records: list[bytes]) -> None:
+        """Spool replay handler: write spooled messages as one batch.
+
+        Database errors propagate, so the spool retries the batch later. Any
+        other error comes from the records themselves and would recur on every
+        retry, so the batch is written again one record at a time and records
+        that still fail are dead-lettered.
+        """
+        try:
+            self.write_batch([SENSOR_READING.validate_json(r) for r in records])
+        except (OperationalError, SQLAlchemyTimeoutError):
+            raise
+        except Exception:
+            for record in records:
+                try:
+                    self.write_batch([SENSOR_READING.validate_json(record)])
+                except (OperationalError, SQLAlchemyTimeoutError):
+                    raise
+                except Exception as e:
+                    self._reject(record, None, e, None)
+
+
+class IngestQueue:
+    """Bounded hand-off between the MQTT network thread and the writer workers.
+
+    When the queue is full, ``policy`` decides what ``put`` does: ``block``
+    waits for a free slot, ``drop_oldest`` discards the oldest queued message
+    and ``spill`` appends the new message to a file under ``spill_dir``.
+    Dropped messages are not acknowledged, so with QoS 1 the broker
+    redelivers them once ``on_unacked`` has the consumer reconnect; with
+    QoS 0 they are lost. Once
+    something is spilled, later messages are spilled behind it until the
+    workers, finding the queue empty, have drained the file, so messages
+    still come out in arrival order. Each process spills to a directory of
+    its own, claimed like the spool's, up to ``spill_max_bytes`` including
+    the part not drained yet; messages that do not fit are dropped
+    unacknowledged and reported to ``on_unacked``. Spill files left by a
+    process that died are drained by whichever process gets to them first,
+    looking for them at most every ``orphan_check_interval`` seconds.
+    """
+
+    def __init__(
+        self,
+        *,
+        maxsize: int,
+        policy: OverflowPolicy,
+        spill_dir: str,
+        spill_max_bytes: int = 256 * 1024 * 1024,
+        orphan_check_interval: float = 60.0,
+    ) -> None:
+        self.maxsize = maxsize
+        self.policy = policy
+        self.spill_max_bytes = spill_max_bytes
+        self.orphan_check_interval = orphan_check_interval
+        self.on_unacked: Callable[[], None] | None = None
+        self.stats = QueueStats()
+        self._items: deque[RawMessage] = deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        # Set while spilled messages wait on disk, so new ones queue up behind
+        self._spilling = False
+        self._spill_dir = Path(spill_dir)
+        # Claimed on first use, so processes that import but never consume
+        # do not hold on to a spill file another process left behind
+        self._spill_path: Path | None = None
+        self._spill_fd: int | None = None
+        self._spill_bytes = 0
+        self._spill_lock = threading.Lock()
+        self._drain_lock = threading.Lock()
+        # Whether the spill file may hold messages; set after each drained
+        # file too, to move on to the next one
+        self._spill_pending = True
+        self._next_orphan_check = 0.0
+        # The spill file being drained, renamed aside so spilling can go on
+        self._draining: BinaryIO | None = None
+
+    @property
+    def depth(self) -> int:
+        return len(self._items)
+
+    def close(self) -> None:
+        """Release this process's spill directory so another process can adopt it."""
+        with self._drain_lock, self._spill_lock:
+            if self._draining is not None:
+                self._draining.close()
+                self._draining = None
+            if self._spill_fd is not None:
+                os.close(self._spill_fd)
+            self._spill_path = None
+            self._spill_fd = None
+            self._spill_bytes = 0
+            self._spill_pending = True
+
+    def put(self, item: RawMessage) -> None:
+        with self._lock:
+            if not self._spilling and (
+                len(self._items) < self.maxsize or self._make_room()
+            ):
+                self._items.append(item)
+                self.stats.enqueued += 1
+                self._not_empty.notify()
+                return
+        self._spill(item)
+
+    def _make_room(self) -> bool:
+        """Apply the overflow policy to a full queue; False means spill."""
+        if self.policy == "block":
+            self.stats.blocked += 1
+            while len(self._items) >= self.maxsize:
+                self._not_full.wait()
+            return True
+        if self.policy == "drop_oldest":
+            dropped = self._items.popleft()
+            self.stats.dropped += 1
+            # Only schedules a reconnect, so it is safe under the lock
+            left_unacked([dropped.ack], self.on_unacked)
+            return True
+        return False
+
+    def get(self, timeout: float) -> RawMessage | None:
+        with self._lock:
+            if not self._items:
+                self._not_empty.wait(timeout)
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._not_full.notify()
+            return item
+
+    def _claim_spill_path(self) -> Path:
+        """This process's spill file; call with ``_spill_lock`` held."""
+        if self._spill_path is None:
+            directory, self._spill_fd = claim_process_dir(self._spill_dir)
+            self._spill_path = directory / "overflow.bin"
+            for path in (self._spill_path, self._spill_path.with_suffix(".draining")):
+                if path.exists():
+                    self._spill_bytes += path.stat().st_size
+        return self._spill_path
+
+    def _spill(self, item: RawMessage) -> None:
+        topic = item.topic.encode()
+        size = _SPILL_HEADER.size + len(topic) + len(item.payload)
+        with self._spill_lock:
+            path = self._claim_spill_path()
+            if self._spill_bytes + size > self.spill_max_bytes:
+                # Left unacked, for the broker to redeliver after a reconnect
+                with self._lock:
+                    self.stats.dropped += 1
+                left_unacked([item.ack], self.on_unacked)
+                return
+            with path.open("ab") as f:
+                f.write(_SPILL_HEADER.pack(len(topic), len(item.payload)))
+                f.write(topic)
+                f.write(item.payload)
+                if item.ack:
+                    # The ack hands the message over to us; it has to be on disk
+                    f.flush()
+                    os.fsync(f.fileno())
+            self._spill_bytes += size
+            self._spill_pending = True
+            with self._lock:
+                self._spilling = True
+                self.stats.spilled += 1
+        if item.ack:
+            item.ack()
+
+    def drain_spill(self, limit: int = 1000) -> list[RawMessage]:
+        """Take up to ``limit`` spilled messages off disk, oldest first.
+
+        The spill file is read a record at a time and deleted once it has
+        been read to the end, so draining holds at most ``limit`` messages in
+        memory.
+        """
+        if (
+            not self._spill_pending
+            and self._draining is None
+            and time.monotonic() < self._next_orphan_check
+        ):
+            return []
+        items: list[RawMessage] = []
+        with self._drain_lock:
+            if self._draining is None and not self._start_drain():
+                return []
+            assert self._draining is not None
+            while len(items) < limit:
+                header = self._draining.read(_SPILL_HEADER.size)
+                if len(header) < _SPILL_HEADER.size:
+                    self._finish_drain()
+                    break
+                topic_len, payload_len = _SPILL_HEADER.unpack(header)
+                topic = self._draining.read(topic_len)
+                payload = self._draining.read(payload_len)
+                if len(topic) < topic_len or len(payload) < payload_len:
+                    # Torn write from a crash; nothing after it is trustworthy
+                    self._finish_drain()
+                    break
+                items.append(RawMessage(topic.decode(), payload))
+        with self._lock:
+            self.stats.reclaimed += len(items)
+        return items
+
+    def _start_drain(self) -> bool:
+        """Open the next spill file for draining; call with ``_drain_lock`` held.
+
+        A ``.draining`` file left by a crash goes before the current file,
+        and files of processes that died go once this process's are done.
+        """
+        with self._spill_lock:
+            path = self._claim_spill_path()
+            draining = path.with_suffix(".draining")
+            if not draining.exists():
+                self._spill_pending = False
+                if path.exists():
+                    path.replace(draining)
+                elif not self._adopt_orphan(draining):
+                    with self._lock:
+                        self._spilling = False
+                    return False
+        self._draining = draining.open("rb")
+        return True
+
+    def _adopt_orphan(self, draining: Path) -> bool:
+        """Move one spill file of a dead process to ``draining``."""
+        self._next_orphan_check = time.monotonic() + self.orphan_check_interval
+        for orphan in orphaned_dirs(self._spill_dir):
+            for name in ("overflow.draining", "overflow.bin"):
+                path = orphan / name
+                if path.exists():
+                    logger.info(f"Draining spill file left behind in {path}")
+                    self._spill_bytes += path.stat().st_size
+                    path.replace(draining)
+                    # The orphan may hold another file
+                    self._spill_pending = True
+                    return True
+        return False
+
+    def _finish_drain(self) -> None:
+        """Delete the drained spill file; call with ``_drain_lock`` held."""
+        assert self._draining is not None
+        path = Path(self._draining.name)
+        self._draining.close()
+        self._draining = None
+        with self._spill_lock:
+            self._spill_bytes -= path.stat().st_size
+            path.unlink()
+            self._spill_pending = True
+
+
+class IngestPipeline:
+    """Decode queued MQTT messages on a pool of workers and batch them to the DB.
+
+    The MQTT callback only calls ``submit``, so a slow database never holds up
+    the paho network loop.
+    """
+
+    def __init__(
+        self,
+        *,
+        queue: IngestQueue,
+        batcher: SensorEventBatcher,
+        workers: int,
+        last_seen: LastSeenBuffer | None = None,
+        sessionizer: Sessionizer | None = None,
+        replayer: SpoolReplayer | None = None,
+        dead_letters: DeadLetterWriter | None = None,
+    ) -> None:
+        self.queue = queue
+        self.batcher = batcher
+        self.workers = workers
+        self.last_seen = last_seen
+        self.sessionizer = sessionizer
+        self.replayer = replayer
+        self.dead_letters = dead_letters
+        self.decode_errors = 0
+        self._stopped = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def on_unacked(self, callback: Callable[[], None]) -> None:
+        """Call ``callback`` whenever a stage gives up on messages without acking them."""
+        self.queue.on_unacked = callback
+        self.batcher.on_unacked = callback
+        if self.dead_letters:
+            self.dead_letters.on_unacked = callback
+
+    @property
+    def running(self) -> bool:
+        return bool(self._threads)
+
+    def submit(self, topic: str, payload: bytes, ack: Ack | None = None) -> None:
+        queued_at = ingest_metrics.message_received(topic)
+        self.queue.put(RawMessage(topic, payload, ack, queued_at))
+
+    def start(self) -> None:
+        self._stopped.clear()
+        routing_table.start()
+        if self.dead_letters:
+            self.dead_letters.start()
+        if self.last_seen:
+            self.last_seen.start()
+        if self.sessionizer:
+            self.sessionizer.start()
+        self.batcher.start()
+        if self.replayer:
+            self.replayer.start()
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f"ingest-worker-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        """Stop the workers once the queue is drained, then flush the batcher."""
+        self._stopped.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self.replayer:
+            self.replayer.stop()
+        self.batcher.stop()
+        if self.sessionizer:
+            self.sessionizer.stop()
+        if self.last_seen:
+            self.last_seen.stop()
+        if self.dead_letters:
+            self.dead_letters.stop()
+        routing_table.stop()
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "queue_depth": self.queue.depth,
+            "queue": asdict(self.queue.stats),
+            "batches": asdict(self.batcher.stats),
+            "decode_errors": self.decode_errors,
+            "unroutable": unroutable.dropped,
+            "dedup": {"keys": len(recent_events), **asdict(recent_events.stats)},
+            "dead_letters": asdict(self.dead_letters.stats) if self.dead_letters else None,
+            "spool": (
+                {
+                    "bytes": self.batcher.spool.size,
+                    "segments": self.batcher.spool.segment_count,
+                    **asdict(self.batcher.spool.stats),
+                }
+                if self.batcher.spool
+                else None
+            ),
+            "last_seen": asdict(self.last_seen.stats) if self.last_seen else None,
+            "sessionizer": asdict(self.sessionizer.stats) if self.sessionizer else None,
+            "state_changes": (
+                {
+                    **asdict(state_changes.stats),
+                    "suppression_ratio": state_changes.stats.suppression_ratio,
+                }
+                if state_changes
+                else None
+            ),
+        }
+
+    def _work(self) -> None:
+        timeout = 0.1
+        while not self._stopped.is_set() or self.queue.depth:
+            item = self.queue.get(timeout=timeout)
+            if item is None:
+                spilled = self.queue.drain_spill()
+                for message in spilled:
+                    self._handle(message)
+                # Keep draining without waiting while the spill file has more
+                timeout = 0 if spilled else 0.1
+                continue
+            self._handle(item)
+
+    def _handle(self, item: RawMessage) -> None:
+        counters = ingest_metrics.counters(item.topic)
+        if item.queued_at:
+            started = time.perf_counter()
+            ingest_metrics.queue_lag_seconds.observe(started - item.queued_at)
+        try:
+            message = decode_message(item.topic, item.payload)
+        except Exception as e:
+            counters.rejected += 1
+            self.decode_errors += 1
+            if self.dead_letters:
+                self.dead_letters.add(item.topic, item.payload, e, item.ack)
+            else:
+                logger.error(f"Error decoding MQTT message on {item.topic}: {e}")
+                ack_all([item.ack])
+            return
+        counters.decoded += 1
+        if item.queued_at:
+            ingest_metrics.decode_seconds.observe(time.perf_counter() - started)
+        self.batcher.add(message, item.ack)
+
+
+def database_is_healthy() -> bool:
+    try:
+        with Session(engine) as session:
+            session.execute(text("SELECT 1"))
+        return True
+    except Exception:
+        return False
+
+
+unroutable = UnroutableLog(interval=settings.INGEST_UNROUTABLE_LOG_INTERVAL_SECONDS)
+dead_letter_writer = DeadLetterWriter(
+    flush_interval=settings.DEAD_LETTER_FLUSH_SECONDS,
+    log_interval=settings.DEAD_LETTER_LOG_INTERVAL_SECONDS,
+    max_buffered=settings.INGEST_QUEUE_SIZE,
+)
+spool = Spool(
+    directory=settings.SPOOL_DIR,
+    segment_bytes=settings.SPOOL_SEGMENT_BYTES,
+    max_bytes=settings.SPOOL_MAX_BYTES,
+)
+batcher = SensorEventBatcher(
+    batch_size=settings.INGEST_BATCH_SIZE,
+    flush_interval=settings.INGEST_FLUSH_INTERVAL_MS / 1000,
+    spool=spool,
+    dead_letters=dead_letter_writer,
+)
+replayer = SpoolReplayer(
+    spool=spool,
+    handler=batcher.replay,
+    is_healthy=database_is_healthy,
+    interval=settings.SPOOL_REPLAY_INTERVAL_SECONDS,
+    batch_size=settings.INGEST_BATCH_SIZE,
+)
+ingest_queue = IngestQueue(
+    maxsize=settings.INGEST_QUEUE_SIZE,
+    policy=settings.INGEST_OVERFLOW_POLICY,
+    spill_dir=settings.INGEST_SPILL_DIR,
+    spill_max_bytes=settings.INGEST_SPILL_MAX_BYTES,
+)
+last_seen = LastSeenBuffer(flush_interval=settings.LAST_SEEN_FLUSH_SECONDS)
+batcher.add_listener(last_seen.add)
+sessionizer = (
+    Sessionizer(lateness=timedelta(seconds=settings.SESSIONIZER_LATENESS_SECONDS))
+    if settings.SESSIONIZER_ENABLED
+    else None
+)
+if sessionizer:
+    batcher.add_listener(sessionizer.add)
+state_changes = (
+    StateChangeFilter(
+        keepalive=timedelta(seconds=settings.INGEST_KEEPALIVE_SECONDS),
+        on_suppressed=last_seen.add,
+    )
+    if settings.INGEST_STORE_MODE == "changes"
+    else None
+)
+pipeline = IngestPipeline(
+    queue=ingest_queue,
+    batcher=batcher,
+    workers=settings.INGEST_WORKERS,
+    last_seen=last_seen,
+    sessionizer=sessionizer,
+    replayer=replayer,
+    dead_letters=dead_letter_writer,
+)
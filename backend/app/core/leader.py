@@ -0,0 +1,100 @@
+import logging
+import threading
+from collections.abc import Callable
+
+from sqlalchemy import Connection, Engine, text
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class LeaderElection:
+    """Elect a single process per deployment with a Postgres advisory lock.
+
+    The lock is session-scoped, so it is held for as long as the dedicated
+    connection stays open. If the leader dies or loses its connection, the
+    lock is released and another process takes over on its next attempt.
+    """
+
+    def __init__(
+        self,
+        *,
+        engine: Engine,
+        lock_key: int,
+        retry_interval: float,
+        on_elected: Callable[[], None],
+        on_demoted: Callable[[], None],
+    ) -> None:
+        self.engine = engine
+        self.lock_key = lock_key
+        self.retry_interval = retry_interval
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.is_leader = False
+        self._connection: Connection | None = None
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="leader-election", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                if self.is_leader:
+                    self._check_connection()
+                else:
+                    self._try_acquire()
+            except Exception as e:
+                logger.error(f"Leader election error: {e}")
+                self._resign()
+            self._stopped.wait(self.retry_interval)
+        self._resign()
+
+    def _try_acquire(self) -> None:
+        connection = self.engine.connect().execution_options(
+            isolation_level="AUTOCOMMIT"
+        )
+        acquired = connection.execute(
+            text("SELECT pg_try_advisory_lock(:key)"), {"key": self.lock_key}
+        ).scalar()
+        if not acquired:
+            connection.close()
+            return
+        self._connection = connection
+        self.is_leader = True
+        logger.info("Acquired ingest leadership")
+        self.on_elected()
+
+    def _check_connection(self) -> None:
+        assert self._connection is not None
+        self._connection.execute(text("SELECT 1"))
+
+    def _resign(self) -> None:
+        if not self.is_leader:
+            return
+        self.is_leader = False
+        logger.info("Giving up ingest leadership")
+        try:
+            self.on_demoted()
+        finally:
+            if self._connection is not None:
+                try:
+                    self._connection.execute(
+                        text("SELECT pg_advisory_unlock(:key)"), {"key": self.lock_key}
+                    )
+                except Exception as e:
+                    logger.error(f"Failed to release leader lock: {e}")
+                finally:
+                    self._connection.close()
+                    self._connection = None
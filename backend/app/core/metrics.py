@@ -0,0 +1,140 @@
+import time
+import uuid
+from bisect import bisect_left
+from collections.abc import Mapping
+from typing import Any
+
+from app.core.config import settings
+
+# Upper bounds in seconds, from 100 µs to 10 s
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class Histogram:
+    """Fixed-bucket histogram of durations in seconds.
+
+    Updates take no lock: under contention an observation can occasionally be
+    lost, which is fine for monitoring and keeps ``observe`` to a bisect and
+    two additions.
+    """
+
+    def __init__(self, bounds: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float | None:
+        """Upper bound of the bucket holding the ``q`` quantile.
+
+        None without observations, or if the quantile is above the last bound.
+        """
+        counts = list(self.counts)
+        total = sum(counts)
+        if not total:
+            return None
+        seen = 0
+        for bound, count in zip(self.bounds, counts[:-1], strict=True):
+            seen += count
+            if seen >= q * total:
+                return bound
+        return None
+
+    def snapshot(self) -> dict[str, Any]:
+        counts = list(self.counts)
+        return {
+            "count": sum(counts),
+            "sum": self.sum,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            # Non-cumulative counts per upper bound
+            "buckets": {
+                **{str(bound): count for bound, count in zip(self.bounds, counts[:-1], strict=True)},
+                "+Inf": counts[-1],
+            },
+        }
+
+
+class TopicCounters:
+    __slots__ = ("received", "decoded", "rejected")
+
+    def __init__(self) -> None:
+        self.received = 0
+        self.decoded = 0
+        self.rejected = 0
+
+
+class IngestMetrics:
+    """Process-local ingest counters by topic prefix and client, and timings.
+
+    Messages are counted as received, decoded and rejected per topic prefix
+    (the first ``topic_levels`` levels of the topic), and as persisted per
+    ``client_id`` once inserted; duplicates skipped by the unique index are
+    not persisted. The counters of a prefix are
+    cached per topic, so counting a message costs one dict lookup and an
+    addition; like ``Histogram``, they are updated without locks.
+
+    Queue lag and decode time are measured on one message in ``sample_every``
+    only, which keeps clock reads off the path of most messages. Batch flush
+    time is measured for every batch.
+    """
+
+    def __init__(self, *, topic_levels: int, sample_every: int) -> None:
+        self.topic_levels = topic_levels
+        self.sample_every = sample_every
+        self.persisted: dict[uuid.UUID | None, int] = {}
+        self.decode_seconds = Histogram()
+        self.flush_seconds = Histogram()
+        self.queue_lag_seconds = Histogram()
+        self.started_at = time.time()
+        self._by_prefix: dict[str, TopicCounters] = {}
+        self._by_topic: dict[str, TopicCounters] = {}
+        self._received = 0
+
+    def counters(self, topic: str) -> TopicCounters:
+        counters = self._by_topic.get(topic)
+        if counters is None:
+            prefix = "/".join(topic.split("/", self.topic_levels)[: self.topic_levels])
+            counters = self._by_prefix.setdefault(prefix, TopicCounters())
+            self._by_topic[topic] = counters
+        return counters
+
+    def message_received(self, topic: str) -> float:
+        """Count a message; returns the time to measure its lag from, or 0."""
+        self.counters(topic).received += 1
+        self._received += 1
+        if self._received % self.sample_every:
+            return 0.0
+        return time.perf_counter()
+
+    def events_persisted(self, by_client: Mapping[uuid.UUID, int]) -> None:
+        """Count inserted rows, given how many were inserted per ``client_id``."""
+        persisted = self.persisted
+        for client, count in by_client.items():
+            persisted[client] = persisted.get(client, 0) + count
+
+    def snapshot(self) -> dict[str, Any]:
+        by_prefix = dict(self._by_prefix)
+        return {
+            "started_at": self.started_at,
+            "received": {prefix: c.received for prefix, c in by_prefix.items()},
+            "decoded": {prefix: c.decoded for prefix, c in by_prefix.items()},
+            "rejected": {prefix: c.rejected for prefix, c in by_prefix.items()},
+            "persisted": {str(client): n for client, n in dict(self.persisted).items()},
+            "sample_every": self.sample_every,
+            "decode_seconds": self.decode_seconds.snapshot(),
+            "queue_lag_seconds": self.queue_lag_seconds.snapshot(),
+            "flush_seconds": self.flush_seconds.snapshot(),
+        }
+
+
+ingest_metrics = IngestMetrics(
+    topic_levels=settings.METRICS_TOPIC_LEVELS,
+    sample_every=settings.METRICS_SAMPLE_EVERY,
+)
@@ -1,52 +1,70 @@
-import json
+import logging
+import os
 import random
+import socket
 import ssl
-from typing import Any
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Literal, Protocol
 
 from paho.mqtt import client as mqtt_client
-from sqlmodel import Session
+from paho.mqtt.enums import CallbackAPIVersion, MQTTProtocolVersion
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
+from paho.mqtt.reasoncodes import ReasonCode
 
+from app.core.availability import AvailabilityPublisher
 from app.core.config import settings
-from app.crud import create_item
 from app.core.db import engine
-from app.models.item_model import ItemCreate
-import logging
+from app.core.ingest import pipeline, sessionizer
+from app.core.leader import LeaderElection
+from app.core.routing import routing_table
+from app.models.general_models import IngestHealth
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def on_connect(client: mqtt_client.Client, userdata: Any, flags: dict, rc: int) -> None:
-    if rc == 0:
+def get_subscription_topic() -> str:
+    if settings.MQTT_CONSUMER_MODE == "shared":
+        # Broker load-balances the topic across all members of the group
+        return f"$share/{settings.MQTT_SHARED_GROUP}/{settings.MQTT_TOPIC}"
+    return settings.MQTT_TOPIC
+
+
+def on_connect(
+    client: mqtt_client.Client,
+    _userdata: Any,
+    _flags: mqtt_client.ConnectFlags,
+    reason_code: ReasonCode,
+    _properties: Properties | None,
+) -> None:
+    if not reason_code.is_failure:
         logger.info("Connected to MQTT Broker!")
-        client.subscribe("python/mqtt")
+        client.subscribe(get_subscription_topic(), qos=settings.MQTT_QOS)
     else:
-        logger.error(f"Failed to connect, return code {rc}")
+        logger.error(f"Failed to connect, return code {reason_code}")
 
 
-def on_message(client: mqtt_client.Client, userdata: Any, msg: mqtt_client.MQTTMessage) -> None:
-    try:
-        payload = json.loads(msg.payload.decode())
-        item_data = ItemCreate(
-            title=payload["title"],
-            description=payload["description"]
-        )
-        owner_id = payload["owner_id"]
-        
-        with Session(engine) as session:
-            create_item(session=session, item_in=item_data, owner_id=owner_id)
-            logger.info(f"Successfully created item from MQTT message: {payload['title']}")
+def on_message(client: mqtt_client.Client, _userdata: Any, msg: mqtt_client.MQTTMessage) -> None:
+    # Decoding and DB writes happen on the ingest workers, never on paho's thread
+    def ack() -> None:
+        client.ack(msg.mid, msg.qos)
 
-    except Exception as e:
-        logger.error(f"Error processing MQTT message: {e}")
+    pipeline.submit(msg.topic, msg.payload, ack if msg.qos else None)
 
 
-def get_mqtt_client() -> mqtt_client.Client:
-    # Generate client ID with pub prefix randomly
-    client_id = f'fastapi-mqtt-{random.randint(0, 1000)}'
-    
-    client = mqtt_client.Client(mqtt_client.CallbackAPIVersion.VERSION1, client_id)
-    
+def get_protocol() -> MQTTProtocolVersion:
+    if settings.MQTT_CONSUMER_MODE == "shared":
+        return mqtt_client.MQTTv5
+    return mqtt_client.MQTTv311
+
+
+def configure_credentials(client: mqtt_client.Client) -> None:
     # Set up TLS if certificates are configured
     if hasattr(settings, "MQTT_CA_CERTS"):
         client.tls_set(
@@ -54,13 +72,372 @@ def get_mqtt_client() -> mqtt_client.Client:
             cert_reqs=ssl.CERT_REQUIRED,
             tls_version=ssl.PROTOCOL_TLS,
         )
-    
+
     # Set username and password if configured
     if hasattr(settings, "MQTT_USERNAME") and hasattr(settings, "MQTT_PASSWORD"):
         client.username_pw_set(settings.MQTT_USERNAME, settings.MQTT_PASSWORD)
-    
+
+
+def get_standalone_client(name: str) -> mqtt_client.Client:
+    """A client with the broker settings but none of the ingest callbacks."""
+    client = mqtt_client.Client(
+        CallbackAPIVersion.VERSION2,
+        f"fastapi-mqtt-{socket.gethostname()}-{os.getpid()}-{name}",
+        protocol=get_protocol(),
+    )
+    configure_credentials(client)
+    return client
+
+
+def get_mqtt_client() -> mqtt_client.Client:
+    # Unique per process, so workers and replicas never kick each other off
+    client_id = (
+        settings.MQTT_CLIENT_ID or f"fastapi-mqtt-{socket.gethostname()}-{os.getpid()}"
+    )
+    at_least_once = settings.MQTT_QOS == 1
+    if at_least_once and not settings.MQTT_CLIENT_ID:
+        logger.warning(
+            "MQTT_QOS is 1 without MQTT_CLIENT_ID: the persistent session will "
+            "not survive a restart"
+        )
+    protocol = get_protocol()
+    # MQTT 5 sets this per connection instead, see get_connect_options
+    clean_session = None if protocol == mqtt_client.MQTTv5 else not at_least_once
+
+    client = mqtt_client.Client(
+        CallbackAPIVersion.VERSION2,
+        client_id,
+        clean_session=clean_session,
+        protocol=protocol,
+        # MqttConnection reconnects, with jitter
+        reconnect_on_failure=False,
+        manual_ack=at_least_once,
+    )
+    configure_credentials(client)
+
     # Set callbacks
     client.on_connect = on_connect
     client.on_message = on_message
-    
-    return client
\ No newline at end of file
+
+    return client
+
+
+def get_connect_options() -> dict[str, Any]:
+    if get_protocol() != mqtt_client.MQTTv5 or settings.MQTT_QOS == 0:
+        return {}
+    # Resume the session, and keep it on the broker while we are away
+    properties = Properties(PacketTypes.CONNECT)  # type: ignore[no-untyped-call]
+    properties.SessionExpiryInterval = settings.MQTT_SESSION_EXPIRY_SECONDS
+    return {"clean_start": False, "properties": properties}
+
+
+class Consumer(Protocol):
+    def start(self) -> None: ...
+
+    def stop(self) -> None: ...
+
+
+ConnectionState = Literal["stopped", "connecting", "connected", "disconnected"]
+
+
+@dataclass
+class ConnectionHealth:
+    state: ConnectionState = "stopped"
+    since: datetime | None = None
+    connects: int = 0
+    disconnects: int = 0
+    failed_attempts: int = 0
+    last_error: str | None = None
+    outbound_buffered: int = 0
+    outbound_dropped: int = 0
+    redelivery_reconnects: int = 0
+
+    @property
+    def reconnecting(self) -> bool:
+        return self.state in ("connecting", "disconnected")
+
+
+class Backoff:
+    """Exponential backoff with full jitter, so reconnecting processes spread out."""
+
+    def __init__(self, *, initial: float, maximum: float) -> None:
+        self.initial = initial
+        self.maximum = maximum
+        self.attempt = 0
+
+    def next(self) -> float:
+        cap = min(self.maximum, self.initial * 2**self.attempt)
+        self.attempt += 1
+        return random.uniform(0, cap)
+
+    def reset(self) -> None:
+        self.attempt = 0
+
+
+@dataclass
+class OutboundMessage:
+    topic: str
+    payload: bytes
+    qos: int
+    retain: bool
+
+
+class MqttConnection:
+    """Keep an MQTT client connected from a background thread.
+
+    ``start`` never blocks on the broker. Failed and lost connections are
+    retried after ``backoff``, and messages published while disconnected wait
+    in a buffer of at most ``outbound_limit`` messages, oldest dropped first,
+    that is sent as soon as the connection is back.
+
+    The broker only resends unacknowledged QoS 1 messages on a new
+    connection, so ``request_redelivery`` reconnects, at most once per
+    ``redelivery_interval``.
+    """
+
+    def __init__(
+        self,
+        *,
+        client_factory: Callable[[], mqtt_client.Client],
+        backoff: Backoff,
+        outbound_limit: int,
+        redelivery_interval: float = 30.0,
+    ) -> None:
+        self.client_factory = client_factory
+        self.backoff = backoff
+        self.outbound_limit = outbound_limit
+        self.redelivery_interval = redelivery_interval
+        self.health = ConnectionHealth()
+        self.client: mqtt_client.Client | None = None
+        self._on_connect: Callable[..., None] | None = None
+        self._outbound: deque[OutboundMessage] = deque()
+        self._redelivery: threading.Timer | None = None
+        self._last_redelivery = float("-inf")
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._stopped.clear()
+        self.client = self.client_factory()
+        self._on_connect = self.client.on_connect
+        self.client.on_connect = self._handle_connect
+        self.client.on_disconnect = self._handle_disconnect
+        self._thread = threading.Thread(
+            target=self._run, name="mqtt-connection", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        with self._lock:
+            if self._redelivery:
+                self._redelivery.cancel()
+                self._redelivery = None
+        if self.client:
+            self.client.disconnect()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.client = None
+        self._set_state("stopped")
+
+    def is_connected(self) -> bool:
+        client = self.client
+        return client is not None and client.is_connected()
+
+    def publish(
+        self, topic: str, payload: bytes, qos: int = 0, retain: bool = False
+    ) -> None:
+        client = self.client
+        if client is not None and client.is_connected():
+            client.publish(topic, payload, qos=qos, retain=retain)
+            return
+        with self._lock:
+            if len(self._outbound) >= self.outbound_limit:
+                self._outbound.popleft()
+                self.health.outbound_dropped += 1
+            self._outbound.append(OutboundMessage(topic, payload, qos, retain))
+            self.health.outbound_buffered = len(self._outbound)
+
+    def request_redelivery(self) -> None:
+        """Reconnect soon, so the broker resends the messages left unacked.
+
+        Until then they hold slots of the broker's in-flight window, and once
+        it is full nothing more is delivered.
+        """
+        with self._lock:
+            if self._redelivery is not None or self._stopped.is_set():
+                return
+            delay = max(
+                0.0, self._last_redelivery + self.redelivery_interval - time.monotonic()
+            )
+            self._redelivery = threading.Timer(delay, self._redeliver)
+            self._redelivery.daemon = True
+            self._redelivery.start()
+
+    def _redeliver(self) -> None:
+        with self._lock:
+            self._redelivery = None
+            self._last_redelivery = time.monotonic()
+        client = self.client
+        if client is None or not client.is_connected():
+            # A new connection is on its way anyway
+            return
+        logger.warning("Reconnecting to MQTT to get unacknowledged messages redelivered")
+        with self._lock:
+            self.health.redelivery_reconnects += 1
+        # loop_forever returns and _run reconnects; the session is kept
+        client.disconnect()
+
+    def _run(self) -> None:
+        assert self.client is not None
+        while not self._stopped.is_set():
+            self._set_state("connecting")
+            try:
+                self.client.connect(
+                    settings.MQTT_BROKER,  # type: ignore[arg-type]
+                    settings.MQTT_PORT,
+                    **get_connect_options(),
+                )
+            except Exception as e:
+                with self._lock:
+                    self.health.failed_attempts += 1
+                    self.health.last_error = str(e)
+                self._set_state("disconnected")
+            else:
+                if self._stopped.is_set():
+                    self.client.disconnect()
+                # Returns once the connection is lost or closed by stop()
+                self.client.loop_forever()
+            if self._stopped.is_set():
+                break
+            delay = self.backoff.next()
+            logger.warning(f"MQTT connection down, reconnecting in {delay:.1f}s")
+            self._stopped.wait(delay)
+
+    def _handle_connect(
+        self,
+        client: mqtt_client.Client,
+        userdata: Any,
+        flags: mqtt_client.ConnectFlags,
+        reason_code: ReasonCode,
+        properties: Properties | None,
+    ) -> None:
+        if self._on_connect:
+            self._on_connect(client, userdata, flags, reason_code, properties)
+        if reason_code.is_failure:
+            with self._lock:
+                self.health.failed_attempts += 1
+                self.health.last_error = str(reason_code)
+            return
+        self.backoff.reset()
+        with self._lock:
+            self.health.connects += 1
+            self.health.last_error = None
+            outbound, self._outbound = self._outbound, deque()
+            self.health.outbound_buffered = 0
+        self._set_state("connected")
+        for message in outbound:
+            client.publish(
+                message.topic, message.payload, qos=message.qos, retain=message.retain
+            )
+
+    def _handle_disconnect(
+        self,
+        client: mqtt_client.Client,
+        userdata: Any,
+        flags: mqtt_client.DisconnectFlags,
+        reason_code: ReasonCode,
+        properties: Properties | None,
+    ) -> None:
+        with self._lock:
+            self.health.disconnects += 1
+        self._set_state("disconnected")
+
+    def _set_state(self, state: ConnectionState) -> None:
+        with self._lock:
+            if self.health.state != state:
+                self.health.state = state
+                self.health.since = datetime.utcnow()
+
+
+class MqttConsumer:
+    """Run the ingest pipeline fed by an MQTT connection."""
+
+    def __init__(
+        self,
+        *,
+        connection: MqttConnection,
+        availability: AvailabilityPublisher | None = None,
+    ) -> None:
+        self.connection = connection
+        self.availability = availability
+
+    def start(self) -> None:
+        pipeline.start()
+        self.connection.start()
+        if self.availability:
+            self.availability.start()
+
+    def stop(self) -> None:
+        if self.availability:
+            self.availability.stop()
+        self.connection.stop()
+        pipeline.stop()
+
+
+mqtt_connection = MqttConnection(
+    client_factory=get_mqtt_client,
+    backoff=Backoff(
+        initial=settings.MQTT_RECONNECT_MIN_SECONDS,
+        maximum=settings.MQTT_RECONNECT_MAX_SECONDS,
+    ),
+    outbound_limit=settings.MQTT_OUTBOUND_BUFFER_SIZE,
+    redelivery_interval=settings.MQTT_REDELIVERY_INTERVAL_SECONDS,
+)
+pipeline.on_unacked(mqtt_connection.request_redelivery)
+# Booth state comes from the sessionizer, so there is nothing to publish without it
+availability = (
+    AvailabilityPublisher(
+        publish=mqtt_connection.publish,
+        is_connected=mqtt_connection.is_connected,
+        topic_prefix=settings.AVAILABILITY_TOPIC_PREFIX,
+        window=settings.AVAILABILITY_COALESCE_MS / 1000,
+    )
+    if settings.AVAILABILITY_PUBLISH_ENABLED and sessionizer
+    else None
+)
+if availability and sessionizer:
+    publisher = availability
+    sessionizer.add_listener(lambda changes: publisher.add(changes.booths))
+    # Booths were added, moved or deleted
+    routing_table.add_listener(publisher.refresh)
+
+
+def get_ingest_health(enabled: bool) -> IngestHealth:
+    """MQTT ingest state of this process."""
+    return IngestHealth(
+        enabled=enabled,
+        queue_depth=pipeline.queue.depth,
+        **asdict(mqtt_connection.health),
+    )
+
+
+def get_consumer() -> Consumer:
+    """Build the MQTT consumer for the configured coordination mode.
+
+    ``all`` and ``shared`` consume in every process (``shared`` relies on the
+    broker to split messages across the group); ``leader`` only consumes in
+    the process holding the Postgres advisory lock.
+    """
+    consumer = MqttConsumer(connection=mqtt_connection, availability=availability)
+    if settings.MQTT_CONSUMER_MODE == "leader":
+        return LeaderElection(
+            engine=engine,
+            lock_key=settings.MQTT_LEADER_LOCK_KEY,
+            retry_interval=settings.MQTT_LEADER_RETRY_SECONDS,
+            on_elected=consumer.start,
+            on_demoted=consumer.stop,
+        )
+    return consumer
@@ -0,0 +1,207 @@
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Literal
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PartitionInterval = Literal["month", "day"]
+
+PARENT = "sensor_events"
+DEFAULT_PARTITION = "sensor_events_default"
+_NAME = re.compile(r"^sensor_events_p(\d{4})_(\d{2})(?:_(\d{2}))?$")
+
+
+def interval_start(at: datetime, interval: PartitionInterval) -> datetime:
+    start = at.replace(hour=0, minute=0, second=0, microsecond=0)
+    return start.replace(day=1) if interval == "month" else start
+
+
+def interval_end(start: datetime, interval: PartitionInterval) -> datetime:
+    if interval == "day":
+        return start + timedelta(days=1)
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def partition_name(start: datetime, interval: PartitionInterval) -> str:
+    if interval == "month":
+        return f"sensor_events_p{start:%Y_%m}"
+    return f"sensor_events_p{start:%Y_%m_%d}"
+
+
+def partition_range(name: str) -> tuple[datetime, datetime] | None:
+    """The [start, end) range of a partition named by ``partition_name``."""
+    match = _NAME.match(name)
+    if not match:
+        return None
+    year, month, day = match.groups()
+    if day is None:
+        start = datetime(int(year), int(month), 1)
+        return start, interval_end(start, "month")
+    start = datetime(int(year), int(month), int(day))
+    return start, interval_end(start, "day")
+
+
+def list_partitions(session: Session) -> list[str]:
+    return list(
+        session.execute(
+            text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = CAST(:parent AS regclass)"
+            ),
+            {"parent": PARENT},
+        ).scalars()
+    )
+
+
+def expire_partition(session: Session, name: str, mode: Literal["detach", "drop"]) -> None:
+    """Detach a partition, keeping it as a plain table to archive, or drop it."""
+    session.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {name}"))
+    if mode == "drop":
+        session.execute(text(f"DROP TABLE {name}"))
+    logger.info(f"Expired partition {name} ({mode})")
+
+
+@dataclass
+class PartitionStats:
+    runs: int = 0
+    created: int = 0
+    moved_rows: int = 0
+    errors: int = 0
+
+
+class PartitionMaintainer:
+    """Create upcoming ``sensor_events`` partitions.
+
+    Each run makes sure partitions exist for the current ``interval`` and the
+    ``ahead`` after it, so events are never routed to the default partition
+    in normal operation. Rows that did land in the default partition for a
+    new range are moved into it. Old partitions are expired by the retention
+    job (``app.core.retention``). Every process may run one: runs are
+    serialised by a transaction-level advisory lock on ``lock_key``.
+    """
+
+    def __init__(
+        self,
+        *,
+        interval: PartitionInterval,
+        ahead: int,
+        run_interval: float,
+        lock_key: int,
+    ) -> None:
+        self.interval = interval
+        self.ahead = ahead
+        self.run_interval = run_interval
+        self.lock_key = lock_key
+        self.stats = PartitionStats()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="partition-maintainer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def run(self, *, session: Session, now: datetime | None = None) -> bool:
+        """One maintenance pass; False if another process holds the lock."""
+        now = now or datetime.utcnow()
+        locked = session.execute(
+            text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": self.lock_key}
+        ).scalar()
+        if not locked:
+            session.rollback()
+            return False
+        partitions = list_partitions(session)
+        ranges = [r for r in map(partition_range, partitions) if r]
+        start = interval_start(now, self.interval)
+        for _ in range(self.ahead + 1):
+            end = interval_end(start, self.interval)
+            # Skip ranges covered by partitions made with another interval
+            if not any(lower < end and start < upper for lower, upper in ranges):
+                self._create(
+                    session,
+                    partition_name(start, self.interval),
+                    start,
+                    end,
+                    has_default=DEFAULT_PARTITION in partitions,
+                )
+            start = end
+        session.commit()
+        self.stats.runs += 1
+        return True
+
+    def _create(
+        self, session: Session, name: str, start: datetime, end: datetime, *, has_default: bool
+    ) -> None:
+        bounds = {"start": start, "end": end}
+        stray = has_default and session.execute(
+            text(
+                f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} "
+                "WHERE event_time_utc >= :start AND event_time_utc < :end)"
+            ),
+            bounds,
+        ).scalar()
+        # Postgres refuses a partition whose rows sit in the default partition
+        if stray:
+            session.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {DEFAULT_PARTITION}"))
+        session.execute(
+            text(
+                f"CREATE TABLE {name} PARTITION OF {PARENT} "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            )
+        )
+        if stray:
+            moved = session.connection().execute(
+                text(
+                    f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+                    "WHERE event_time_utc >= :start AND event_time_utc < :end "
+                    f"RETURNING *) INSERT INTO {PARENT} SELECT * FROM moved"
+                ),
+                bounds,
+            )
+            session.execute(
+                text(f"ALTER TABLE {PARENT} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT")
+            )
+            self.stats.moved_rows += moved.rowcount
+            logger.warning(f"Moved {moved.rowcount} sensor events from the default partition to {name}")
+        self.stats.created += 1
+        logger.info(f"Created partition {name}")
+
+    def _run(self) -> None:
+        while True:
+            try:
+                with Session(engine) as session:
+                    self.run(session=session)
+            except Exception as e:
+                self.stats.errors += 1
+                logger.error(f"Partition maintenance failed: {e}")
+            if self._stopped.wait(self.run_interval):
+                break
+
+
+partition_maintainer = PartitionMaintainer(
+    interval=settings.SENSOR_EVENTS_PARTITION_INTERVAL,
+    ahead=settings.SENSOR_EVENTS_PARTITIONS_AHEAD,
+    run_interval=settings.PARTITION_MAINTENANCE_INTERVAL_SECONDS,
+    lock_key=settings.PARTITION_MAINTENANCE_LOCK_KEY,
+)
@@ -0,0 +1,177 @@
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Literal
+
+import cbor2
+import msgpack  # type: ignore[import-untyped]
+from paho.mqtt.client import topic_matches_sub
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
+from pydantic_core import to_jsonable_python
+
+from app.core.config import settings
+from app.core.routing import routing_table
+
+PayloadEncoding = Literal["json", "msgpack", "cbor"]
+
+
+@dataclass(slots=True)
+class SensorReading:
+    """A decoded sensor message, as it moves through the ingest pipeline.
+
+    Sensors without a serial number in the payload are routed by topic.
+    ``event_time_utc`` is timezone-naive UTC, like the rest of the schema.
+    """
+
+    state_id: int
+    event_time_utc: datetime
+    serial_number: str | None = None
+    mqtt_topic: str | None = None
+    raw_payload: dict[str, Any] | None = None
+
+
+# Used to write readings to the spool and read them back
+SENSOR_READING = TypeAdapter(SensorReading)
+
+
+class SensorPayloadV1(BaseModel):
+    """The original JSON payload. Unknown keys are kept for ``raw_payload``."""
+
+    model_config = ConfigDict(extra="allow")
+
+    serial_number: str | None = None
+    state_id: int
+    event_time_utc: datetime
+
+    def raw(self) -> dict[str, Any]:
+        return {
+            "serial_number": self.serial_number,
+            "state_id": self.state_id,
+            "event_time_utc": self.event_time_utc.isoformat(),
+            **(self.__pydantic_extra__ or {}),
+        }
+
+
+class SensorPayloadV2(SensorPayloadV1):
+    """Short keys and a Unix timestamp, for firmware on constrained sensors."""
+
+    model_config = ConfigDict(extra="allow", populate_by_name=True)
+
+    serial_number: str | None = Field(default=None, alias="sn")
+    state_id: int = Field(alias="s")
+    event_time_utc: datetime = Field(alias="t")
+
+
+# Validators are compiled once; validate_json parses straight from the bytes
+PAYLOAD_SCHEMAS: dict[str, TypeAdapter[Any]] = {
+    "v1": TypeAdapter(SensorPayloadV1),
+    "v2": TypeAdapter(SensorPayloadV2),
+}
+
+
+def _unpack_msgpack(payload: bytes) -> Any:
+    # Timestamp extensions come back as aware datetimes
+    return msgpack.unpackb(payload, timestamp=3)
+
+
+# Binary encodings are unpacked in C, then validated from the Python objects
+BINARY_DECODERS: dict[str, Callable[[bytes], Any]] = {
+    "msgpack": _unpack_msgpack,
+    "cbor": cbor2.loads,
+}
+
+
+def _match(filters: dict[str, str], topic: str) -> str | None:
+    return next((v for f, v in filters.items() if topic_matches_sub(f, topic)), None)
+
+
+def to_reading(topic: str, payload: SensorPayloadV1) -> SensorReading:
+    event_time = payload.event_time_utc
+    offset = event_time.utcoffset()
+    if offset is not None:
+        event_time = event_time.replace(tzinfo=None) - offset
+    return SensorReading(
+        state_id=payload.state_id,
+        event_time_utc=event_time,
+        serial_number=payload.serial_number,
+        mqtt_topic=topic,
+        raw_payload=payload.raw(),
+    )
+
+
+class PayloadDecoder:
+    """Decode MQTT payloads with the schema version and encoding of their topic.
+
+    ``schemas`` maps MQTT topic filters (wildcards allowed) to a version in
+    ``PAYLOAD_SCHEMAS``; topics matching none use ``default``. The encoding
+    is taken from the first filter in ``encodings`` that matches, then from
+    ``sensor_types`` by the type of the sensor publishing on the topic, and
+    is JSON otherwise. What the filters select is cached per topic, so they
+    are only matched once per topic; the cache is emptied when it reaches
+    ``cache_size`` topics, so stray topics cannot grow it without bound.
+    """
+
+    def __init__(
+        self,
+        *,
+        schemas: dict[str, str],
+        default: str,
+        encodings: dict[str, PayloadEncoding] | None = None,
+        sensor_types: dict[str, PayloadEncoding] | None = None,
+        sensor_type: Callable[[str], str | None] | None = None,
+        cache_size: int = 10_000,
+    ) -> None:
+        for version in (*schemas.values(), default):
+            if version not in PAYLOAD_SCHEMAS:
+                raise ValueError(f"Unknown payload schema {version!r}")
+        self.schemas = schemas
+        self.default = default
+        self.encodings: dict[str, str] = dict(encodings or {})
+        self.sensor_types: dict[str, str] = dict(sensor_types or {})
+        for encoding in (*self.encodings.values(), *self.sensor_types.values()):
+            if encoding != "json" and encoding not in BINARY_DECODERS:
+                raise ValueError(f"Unknown payload encoding {encoding!r}")
+        self.sensor_type = sensor_type
+        self.cache_size = cache_size
+        self._by_topic: dict[str, tuple[TypeAdapter[Any], str | None]] = {}
+
+    def _resolve(self, topic: str) -> tuple[TypeAdapter[Any], str | None]:
+        resolved = self._by_topic.get(topic)
+        if resolved is None:
+            version = _match(self.schemas, topic) or self.default
+            resolved = (PAYLOAD_SCHEMAS[version], _match(self.encodings, topic))
+            if len(self._by_topic) >= self.cache_size:
+                self._by_topic = {}
+            self._by_topic[topic] = resolved
+        return resolved
+
+    def schema_for(self, topic: str) -> TypeAdapter[Any]:
+        return self._resolve(topic)[0]
+
+    def encoding_for(self, topic: str) -> str:
+        encoding = self._resolve(topic)[1]
+        if encoding is None and self.sensor_types and self.sensor_type:
+            # Not cached: a sensor's type can change while the topic stays
+            sensor_type = self.sensor_type(topic)
+            encoding = self.sensor_types.get(sensor_type) if sensor_type else None
+        return encoding or "json"
+
+    def decode(self, topic: str, payload: bytes) -> SensorReading:
+        adapter = self.schema_for(topic)
+        encoding = self.encoding_for(topic)
+        if encoding == "json":
+            return to_reading(topic, adapter.validate_json(payload))
+        data = BINARY_DECODERS[encoding](payload)
+        reading = to_reading(topic, adapter.validate_python(data))
+        # Binary formats can carry bytes and datetimes, which JSONB cannot
+        reading.raw_payload = to_jsonable_python(reading.raw_payload, bytes_mode="base64")
+        return reading
+
+
+payload_decoder = PayloadDecoder(
+    schemas=settings.MQTT_PAYLOAD_SCHEMAS,
+    default=settings.MQTT_PAYLOAD_DEFAULT_SCHEMA,
+    encodings=settings.MQTT_PAYLOAD_ENCODINGS,
+    sensor_types=settings.MQTT_SENSOR_TYPE_ENCODINGS,
+    sensor_type=routing_table.sensor_type,
+)
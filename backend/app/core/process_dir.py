@@ -0,0 +1,54 @@
+import fcntl
+import os
+from collections.abc import Iterator
+from pathlib import Path
+
+_LOCK_FILE = ".lock"
+
+
+def claim_process_dir(base: Path) -> tuple[Path, int]:
+    """Take the first numbered subdirectory of ``base`` no other process holds.
+
+    Several processes (uvicorn workers, ingest replicas on a shared volume)
+    may use the same ``base``; each gets a subdirectory of its own, held with
+    an exclusive ``flock`` until the returned descriptor is closed or the
+    process exits. A directory left behind by a process that died is picked
+    up by the next one to start, together with whatever it contains.
+    """
+    base.mkdir(parents=True, exist_ok=True)
+    index = 0
+    while True:
+        directory = base / str(index)
+        directory.mkdir(exist_ok=True)
+        fd = os.open(directory / _LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            index += 1
+            continue
+        return directory, fd
+
+
+def orphaned_dirs(base: Path) -> Iterator[Path]:
+    """Yield the numbered subdirectories of ``base`` that no live process holds.
+
+    Each directory is locked while the caller handles it and released when
+    the iteration moves on, so it is adopted by one process at a time. The
+    calling process's own directory is never yielded: its lock is held on
+    another open file description, which ``flock`` treats as a conflict.
+    """
+    if not base.is_dir():
+        return
+    numbered = [d for d in base.iterdir() if d.name.isdigit() and d.is_dir()]
+    for directory in sorted(numbered, key=lambda d: int(d.name)):
+        fd = os.open(directory / _LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            continue
+        try:
+            yield directory
+        finally:
+            os.close(fd)
@@ -0,0 +1,265 @@
+import logging
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Literal
+
+from sqlalchemy import text
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.db import engine
+from app.core.partitions import (
+    DEFAULT_PARTITION,
+    expire_partition,
+    list_partitions,
+    partition_range,
+)
+from app.models.clients import Client
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Each statement deletes one chunk of a client's oldest expired rows, walking
+# the (client_id, time) index
+_PURGES = {
+    "sensor_events": (
+        "DELETE FROM sensor_events WHERE (id, event_time_utc) IN ("
+        "SELECT id, event_time_utc FROM sensor_events "
+        "WHERE client_id = :client AND event_time_utc < :cutoff "
+        "ORDER BY event_time_utc LIMIT :limit)"
+    ),
+    # Partition expiry never reaches events that landed in the default partition
+    DEFAULT_PARTITION: (
+        f"DELETE FROM {DEFAULT_PARTITION} WHERE (id, event_time_utc) IN ("
+        f"SELECT id, event_time_utc FROM {DEFAULT_PARTITION} "
+        "WHERE client_id = :client AND event_time_utc < :cutoff "
+        "ORDER BY event_time_utc LIMIT :limit)"
+    ),
+    # Open sessions have no end_time and are never purged
+    "usage_sessions": (
+        "DELETE FROM usage_sessions WHERE id IN ("
+        "SELECT id FROM usage_sessions "
+        "WHERE client_id = :client AND end_time < :cutoff "
+        "ORDER BY end_time LIMIT :limit)"
+    ),
+}
+
+
+@dataclass
+class RetentionStats:
+    runs: int = 0
+    chunks: int = 0
+    deleted_rows: dict[str, int] = field(default_factory=dict)
+    expired_partitions: int = 0
+    # From the planner's estimate (pg_class.reltuples), not a count
+    expired_partition_rows: int = 0
+    errors: int = 0
+
+
+@dataclass
+class RetentionProgress:
+    """The current run, or the last one once ``running`` is False."""
+
+    running: bool = False
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    table: str | None = None
+    client_id: uuid.UUID | None = None
+    reclaimed_rows: int = 0
+
+
+class RetentionPurger:
+    """Remove sensor events and usage sessions past their client's retention.
+
+    A client keeps ``Client.sensor_event_retention_days`` and
+    ``Client.usage_session_retention_days`` of data, or the deployment
+    defaults when those are None; a None default keeps everything.
+
+    Sensor event partitions that end before every client's cutoff are
+    expired whole, which costs no row deletes. Events of clients with their
+    own, shorter retention, and usage sessions, are deleted oldest first in
+    chunks of ``chunk_size`` rows, each in its own short transaction, so no
+    lock is held for long and autovacuum can reclaim the space as the purge
+    goes. Between chunks the purge sleeps ``chunk_sleep`` seconds, longer if
+    needed to stay under ``max_rows_per_second``. Events of clients on the
+    default retention go with their partition, up to one partition interval
+    after they expire, or are deleted in chunks if they sit in the default
+    partition. When some client keeps events longer than the default, their
+    partitions stay, and the default clients' events are deleted in chunks
+    like everyone else's.
+
+    Runs across processes are serialised by a session-level advisory lock
+    on ``lock_key``, held on a dedicated connection while chunks commit.
+    """
+
+    def __init__(
+        self,
+        *,
+        event_retention_days: int | None,
+        session_retention_days: int | None,
+        expired: Literal["detach", "drop"],
+        chunk_size: int,
+        chunk_sleep: float,
+        max_rows_per_second: float,
+        run_interval: float,
+        lock_key: int,
+    ) -> None:
+        self.event_retention_days = event_retention_days
+        self.session_retention_days = session_retention_days
+        self.expired = expired
+        self.chunk_size = chunk_size
+        self.chunk_sleep = chunk_sleep
+        self.max_rows_per_second = max_rows_per_second
+        self.run_interval = run_interval
+        self.lock_key = lock_key
+        self.stats = RetentionStats()
+        self.progress = RetentionProgress()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="retention-purger", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop after the chunk being deleted."""
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"stats": asdict(self.stats), "progress": asdict(self.progress)}
+
+    def run(self, *, session: Session, now: datetime | None = None) -> bool:
+        """One purge pass; False if another process holds the lock."""
+        now = now or datetime.utcnow()
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock:
+            locked = lock.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": self.lock_key}
+            ).scalar()
+            if not locked:
+                return False
+            try:
+                self._purge(session, now)
+            finally:
+                lock.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.lock_key})
+        self.stats.runs += 1
+        return True
+
+    def _purge(self, session: Session, now: datetime) -> None:
+        progress = self.progress = RetentionProgress(running=True, started_at=datetime.utcnow())
+        clients = session.exec(
+            select(
+                Client.id,
+                Client.sensor_event_retention_days,
+                Client.usage_session_retention_days,
+            )
+        ).all()
+        has_default = DEFAULT_PARTITION in list_partitions(session)
+        session.commit()
+        days = [self.event_retention_days if d is None else d for _, d, _ in clients]
+        days = days or [self.event_retention_days]
+        # None if some client keeps its events forever
+        partition_days = None if None in days else max(d for d in days if d is not None)
+        # Partition expiry keeps up with the default retention only if no
+        # client keeps its events longer
+        default_table = (
+            DEFAULT_PARTITION
+            if partition_days == self.event_retention_days
+            else "sensor_events"
+        )
+        try:
+            if partition_days is not None:
+                self._expire_partitions(session, now - timedelta(days=partition_days))
+            for client_id, event_days, session_days in clients:
+                if event_days is not None:
+                    self._delete(session, "sensor_events", client_id, now - timedelta(days=event_days))
+                elif self.event_retention_days is not None and (
+                    has_default or default_table != DEFAULT_PARTITION
+                ):
+                    self._delete(
+                        session,
+                        default_table,
+                        client_id,
+                        now - timedelta(days=self.event_retention_days),
+                    )
+                if session_days is None:
+                    session_days = self.session_retention_days
+                if session_days is not None:
+                    self._delete(session, "usage_sessions", client_id, now - timedelta(days=session_days))
+        finally:
+            progress.running = False
+            progress.table = progress.client_id = None
+            progress.finished_at = datetime.utcnow()
+        logger.info(f"Retention run reclaimed {progress.reclaimed_rows} rows")
+
+    def _expire_partitions(self, session: Session, cutoff: datetime) -> None:
+        for name in list_partitions(session):
+            bounds = partition_range(name)
+            if self._stopped.is_set() or not bounds or bounds[1] > cutoff:
+                continue
+            # A count(*) would scan the whole partition while holding the lock
+            rows = session.execute(
+                text("SELECT reltuples FROM pg_class WHERE oid = CAST(:name AS regclass)"),
+                {"name": name},
+            ).scalar()
+            rows = max(int(rows or 0), 0)  # -1 until the partition is analyzed
+            expire_partition(session, name, self.expired)
+            session.commit()
+            self.stats.expired_partitions += 1
+            self.stats.expired_partition_rows += rows
+            self.progress.reclaimed_rows += rows
+
+    def _delete(self, session: Session, table: str, client_id: uuid.UUID, cutoff: datetime) -> None:
+        progress = self.progress
+        progress.table, progress.client_id = table, client_id
+        deleted = 0
+        while not self._stopped.is_set():
+            started = time.monotonic()
+            count = session.connection().execute(
+                text(_PURGES[table]),
+                {"client": client_id, "cutoff": cutoff, "limit": self.chunk_size},
+            ).rowcount
+            session.commit()
+            deleted += count
+            progress.reclaimed_rows += count
+            self.stats.chunks += 1
+            self.stats.deleted_rows[table] = self.stats.deleted_rows.get(table, 0) + count
+            if count < self.chunk_size:
+                break
+            pause = self.chunk_sleep
+            if self.max_rows_per_second > 0:
+                pause = max(pause, count / self.max_rows_per_second - (time.monotonic() - started))
+            self._stopped.wait(pause)
+        if deleted:
+            logger.info(f"Purged {deleted} rows of client {client_id} from {table} before {cutoff}")
+
+    def _run(self) -> None:
+        while True:
+            try:
+                with Session(engine) as session:
+                    self.run(session=session)
+            except Exception as e:
+                self.stats.errors += 1
+                logger.error(f"Retention purge failed: {e}")
+            if self._stopped.wait(self.run_interval):
+                break
+
+
+retention_purger = RetentionPurger(
+    event_retention_days=settings.SENSOR_EVENTS_RETENTION_DAYS,
+    session_retention_days=settings.USAGE_SESSIONS_RETENTION_DAYS,
+    expired=settings.SENSOR_EVENTS_EXPIRED_PARTITIONS,
+    chunk_size=settings.RETENTION_CHUNK_SIZE,
+    chunk_sleep=settings.RETENTION_CHUNK_SLEEP_SECONDS,
+    max_rows_per_second=settings.RETENTION_MAX_ROWS_PER_SECOND,
+    run_interval=settings.RETENTION_INTERVAL_SECONDS,
+    lock_key=settings.RETENTION_LOCK_KEY,
+)
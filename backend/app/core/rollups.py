@@ -0,0 +1,185 @@
+import logging
+import uuid
+from collections.abc import Mapping
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import Session, col, delete, select
+
+from app.models.booth_usage import BoothUsageHourly
+from app.models.usage_sessions import UsageSession
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+HOUR = timedelta(hours=1)
+
+# (phone_booth_id, org_unit_id, client_id, hour), the key of booth_usage_hourly
+UsageKey = tuple[uuid.UUID, uuid.UUID, uuid.UUID, datetime]
+
+
+@dataclass(slots=True)
+class HourlyUsage:
+    busy_seconds: float = 0.0
+    session_count: int = 0
+    max_session_seconds: float = 0.0
+
+
+def truncate_hour(at: datetime) -> datetime:
+    return at.replace(minute=0, second=0, microsecond=0)
+
+
+def add_session_usage(
+    usage: dict[UsageKey, HourlyUsage],
+    *,
+    phone_booth_id: uuid.UUID,
+    org_unit_id: uuid.UUID,
+    client_id: uuid.UUID,
+    start_time: datetime,
+    end_time: datetime,
+) -> None:
+    """Split a closed session over the hours it spans, adding to ``usage``.
+
+    Each hour gets the busy time the session covers in it; the session is
+    counted, with its full length, in the hour it started. Mirrors the SQL
+    of ``backfill_usage``.
+    """
+    hour = first = truncate_hour(start_time)
+    while hour == first or hour < end_time:
+        row = usage.get((phone_booth_id, org_unit_id, client_id, hour))
+        if row is None:
+            row = usage[(phone_booth_id, org_unit_id, client_id, hour)] = HourlyUsage()
+        row.busy_seconds += (min(end_time, hour + HOUR) - max(start_time, hour)).total_seconds()
+        if hour == first:
+            row.session_count += 1
+            row.max_session_seconds = max(
+                row.max_session_seconds, (end_time - start_time).total_seconds()
+            )
+        hour += HOUR
+
+
+def upsert_usage(session: Session, usage: Mapping[UsageKey, HourlyUsage]) -> None:
+    """Add ``usage`` to the stored rollup rows, in the caller's transaction."""
+    if not usage:
+        return
+    statement = pg_insert(BoothUsageHourly)
+    table = BoothUsageHourly.__table__  # type: ignore[attr-defined]
+    statement = statement.on_conflict_do_update(
+        index_elements=["phone_booth_id", "org_unit_id", "client_id", "hour"],
+        set_={
+            "busy_seconds": table.c.busy_seconds + statement.excluded.busy_seconds,
+            "session_count": table.c.session_count + statement.excluded.session_count,
+            "max_session_seconds": func.greatest(
+                table.c.max_session_seconds, statement.excluded.max_session_seconds
+            ),
+        },
+    )
+    # A fixed row order keeps concurrent upserts from deadlocking
+    rows = [
+        {
+            "phone_booth_id": booth_id,
+            "org_unit_id": org_unit_id,
+            "client_id": client_id,
+            "hour": hour,
+            "busy_seconds": row.busy_seconds,
+            "session_count": row.session_count,
+            "max_session_seconds": row.max_session_seconds,
+        }
+        for (booth_id, org_unit_id, client_id, hour), row in sorted(
+            usage.items(), key=lambda item: item[0]
+        )
+    ]
+    session.execute(statement, rows)
+
+
+_BACKFILL = text(
+    """
+    INSERT INTO booth_usage_hourly (
+        phone_booth_id, org_unit_id, client_id, hour,
+        busy_seconds, session_count, max_session_seconds
+    )
+    SELECT
+        s.phone_booth_id, s.org_unit_id, s.client_id, h.hour,
+        sum(CAST(EXTRACT(EPOCH FROM
+            least(s.end_time, h.hour + interval '1 hour') - greatest(s.start_time, h.hour)
+        ) AS double precision)),
+        count(*) FILTER (WHERE s.start_time >= h.hour),
+        coalesce(max(CAST(EXTRACT(EPOCH FROM s.end_time - s.start_time) AS double precision))
+            FILTER (WHERE s.start_time >= h.hour), 0)
+    FROM usage_sessions s
+    CROSS JOIN LATERAL generate_series(
+        date_trunc('hour', s.start_time),
+        greatest(s.start_time, s.end_time - interval '1 microsecond'),
+        interval '1 hour'
+    ) AS h(hour)
+    WHERE s.end_time IS NOT NULL
+        AND s.start_time < :end AND s.end_time >= :start
+        AND h.hour >= :start AND h.hour < :end
+        AND (CAST(:booth AS uuid) IS NULL OR s.phone_booth_id = CAST(:booth AS uuid))
+    GROUP BY s.phone_booth_id, s.org_unit_id, s.client_id, h.hour
+    """
+)
+
+
+def backfill_usage(
+    session: Session,
+    *,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    chunk: timedelta = timedelta(days=7),
+) -> int:
+    """Rebuild the rollup of the hours in [start, end) from usage_sessions.
+
+    ``start`` defaults to the first session and ``end`` to the current hour
+    included; both are widened to whole hours. Hours are rebuilt ``chunk``
+    at a time, each chunk replacing its rows in one transaction. Returns
+    the number of rows written.
+    """
+    if start is None:
+        start = session.exec(select(func.min(UsageSession.start_time))).one()
+        if start is None:
+            return 0
+    if end is None:
+        end = datetime.utcnow()
+    start = truncate_hour(start)
+    if end != truncate_hour(end):
+        end = truncate_hour(end) + HOUR
+    written = 0
+    lower = start
+    while lower < end:
+        upper = min(lower + chunk, end)
+        session.execute(
+            delete(BoothUsageHourly).where(
+                col(BoothUsageHourly.hour) >= lower, col(BoothUsageHourly.hour) < upper
+            )
+        )
+        rows = session.connection().execute(
+            _BACKFILL, {"start": lower, "end": upper, "booth": None}
+        ).rowcount
+        session.commit()
+        written += rows
+        logger.info(f"Rebuilt {rows} booth usage rows from {lower} to {upper}")
+        lower = upper
+    return written
+
+
+def rebuild_booth_usage(
+    session: Session, *, phone_booth_id: uuid.UUID, start: datetime, end: datetime
+) -> None:
+    """Rebuild one booth's rollup of the hours [start, end) touches.
+
+    For sessions edited or deleted after they were rolled up; runs in the
+    caller's transaction, which must already hold the change.
+    """
+    start = truncate_hour(start)
+    end = truncate_hour(end) + HOUR
+    session.execute(
+        delete(BoothUsageHourly).where(
+            col(BoothUsageHourly.phone_booth_id) == phone_booth_id,
+            col(BoothUsageHourly.hour) >= start,
+            col(BoothUsageHourly.hour) < end,
+        )
+    )
+    session.execute(_BACKFILL, {"start": start, "end": end, "booth": phone_booth_id})
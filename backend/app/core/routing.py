@@ -0,0 +1,238 @@
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from typing import Any
+
+import psycopg
+import sqlalchemy as sa
+from sqlalchemy import event, text
+from sqlmodel import Session, col
+
+from app.core.config import settings
+from app.core.db import engine
+from app.models.phone_booths import PhoneBooth
+from app.models.sensors import Sensor
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ROUTES_CHANGED_CHANNEL = "sensor_routes_changed"
+
+
+@dataclass(frozen=True)
+class SensorRoute:
+    sensor_id: uuid.UUID
+    phone_booth_id: uuid.UUID
+    client_id: uuid.UUID | None
+    org_unit_id: uuid.UUID | None
+    sensor_type: str | None = None
+
+
+def _select_routes() -> sa.Select[Any]:
+    return sa.select(
+        col(Sensor.serial_number),
+        col(Sensor.mqtt_topic),
+        col(Sensor.id),
+        col(PhoneBooth.id),
+        col(PhoneBooth.client_id),
+        col(PhoneBooth.org_unit_id),
+        col(Sensor.type),
+    ).join(PhoneBooth, col(Sensor.phone_booth_id) == col(PhoneBooth.id))
+
+
+def notify_routes_changed(session: Session) -> None:
+    """Tell every ingest process to drop its routing table.
+
+    Call before committing a change to sensors or phone booths; Postgres only
+    delivers the notification once the transaction commits, and this
+    process's own table is invalidated at the same point.
+    """
+    session.execute(
+        text("SELECT pg_notify(:channel, '')"), {"channel": ROUTES_CHANGED_CHANNEL}
+    )
+    event.listen(
+        session, "after_commit", lambda _: routing_table.invalidate(), once=True
+    )
+
+
+class UnknownKeys:
+    """Bounded LRU set of serial numbers or topics that match no sensor.
+
+    Keeps noise on the topic (typos, retired sensors, scans) from costing a
+    query per batch without letting it grow memory without bound.
+    """
+
+    def __init__(self, *, capacity: int) -> None:
+        self.capacity = capacity
+        self._keys: OrderedDict[str, None] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            if key not in self._keys:
+                return False
+            self._keys.move_to_end(key)  # type: ignore[arg-type]
+            return True
+
+    def add(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._keys[key] = None
+                self._keys.move_to_end(key)
+            while len(self._keys) > self.capacity:
+                self._keys.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._keys.clear()
+
+
+class RoutingTable:
+    """Process-local map from sensor serial number and MQTT topic to event keys.
+
+    The whole table is loaded with one query and reloaded lazily after an
+    invalidation, so routing a batch normally issues no queries at all.
+    Sensors missing from the table (e.g. created since the last load) are
+    looked up once per batch and cached, including negative results, of
+    which at most ``unknown_capacity`` per key kind are kept.
+    """
+
+    def __init__(self, *, unknown_capacity: int = 10_000) -> None:
+        self._by_serial: dict[str, SensorRoute] = {}
+        self._by_topic: dict[str, SensorRoute] = {}
+        self._unknown_serials = UnknownKeys(capacity=unknown_capacity)
+        self._unknown_topics = UnknownKeys(capacity=unknown_capacity)
+        self._stale = True
+        # Bumped on every invalidation, so a load that raced one stays stale
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._listener: threading.Thread | None = None
+        self._on_invalidate: list[Callable[[], None]] = []
+
+    def add_listener(self, listener: Callable[[], None]) -> None:
+        """Call ``listener`` on every invalidation, i.e. when sensors or booths change."""
+        self._on_invalidate.append(listener)
+
+    def start(self) -> None:
+        """Warm the table and follow invalidations from other processes."""
+        with Session(engine) as session:
+            self.load(session)
+        self._stopped.clear()
+        self._listener = threading.Thread(
+            target=self._listen, name="routing-listener", daemon=True
+        )
+        self._listener.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._listener:
+            self._listener.join()
+            self._listener = None
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._stale = True
+        for listener in self._on_invalidate:
+            listener()
+
+    def load(self, session: Session) -> None:
+        generation = self._generation
+        by_serial: dict[str, SensorRoute] = {}
+        by_topic: dict[str, SensorRoute] = {}
+        for serial, topic, *keys in session.execute(_select_routes()):
+            route = SensorRoute(*keys)
+            by_serial[serial] = route
+            if topic:
+                by_topic[topic] = route
+        with self._lock:
+            self._by_serial = by_serial
+            self._by_topic = by_topic
+            self._unknown_serials.clear()
+            self._unknown_topics.clear()
+            self._stale = generation != self._generation
+        logger.info(f"Loaded {len(by_serial)} sensor routes")
+
+    def lookup(self, *, serial_number: str | None, topic: str | None) -> SensorRoute | None:
+        if serial_number is not None:
+            return self._by_serial.get(serial_number)
+        if topic is not None:
+            return self._by_topic.get(topic)
+        return None
+
+    def sensor_type(self, topic: str) -> str | None:
+        """``Sensor.type`` of the sensor publishing on ``topic``, if loaded."""
+        route = self._by_topic.get(topic)
+        return route.sensor_type if route else None
+
+    def resolve(
+        self, *, session: Session, keys: Iterable[tuple[str | None, str | None]]
+    ) -> list[SensorRoute | None]:
+        """Route (serial number, topic) pairs; the serial number wins if given."""
+        if self._stale:
+            self.load(session)
+        keys = list(keys)
+        missing_serials = {
+            serial
+            for serial, _ in keys
+            if serial is not None
+            and serial not in self._by_serial
+            and serial not in self._unknown_serials
+        }
+        missing_topics = {
+            topic
+            for serial, topic in keys
+            if serial is None
+            and topic is not None
+            and topic not in self._by_topic
+            and topic not in self._unknown_topics
+        }
+        if missing_serials or missing_topics:
+            self._fetch(session, missing_serials, missing_topics)
+        return [self.lookup(serial_number=serial, topic=topic) for serial, topic in keys]
+
+    def _fetch(self, session: Session, serials: set[str], topics: set[str]) -> None:
+        statement = _select_routes().where(
+            col(Sensor.serial_number).in_(serials) | col(Sensor.mqtt_topic).in_(topics)
+        )
+        with self._lock:
+            for serial, topic, *keys in session.execute(statement):
+                route = SensorRoute(*keys)
+                self._by_serial[serial] = route
+                if topic:
+                    self._by_topic[topic] = route
+            self._unknown_serials.add(serials - self._by_serial.keys())
+            self._unknown_topics.add(topics - self._by_topic.keys())
+
+    def _listen(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                with psycopg.connect(
+                    host=settings.POSTGRES_SERVER,
+                    port=settings.POSTGRES_PORT,
+                    user=settings.POSTGRES_USER,
+                    password=settings.POSTGRES_PASSWORD,
+                    dbname=settings.POSTGRES_DB,
+                    autocommit=True,
+                ) as connection:
+                    connection.execute(f"LISTEN {ROUTES_CHANGED_CHANNEL}")
+                    # Changes made while we were not listening are unknown
+                    self.invalidate()
+                    while not self._stopped.is_set():
+                        for _ in connection.notifies(timeout=1.0):
+                            self.invalidate()
+            except Exception as e:
+                logger.error(f"Sensor route listener failed: {e}")
+                self._stopped.wait(5)
+
+
+routing_table = RoutingTable(
+    unknown_capacity=settings.INGEST_ROUTING_UNKNOWN_CACHE_SIZE
+)
@@ -0,0 +1,270 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+import uuid
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any
+
+import sqlalchemy as sa
+from sqlalchemy import insert, update
+from sqlmodel import Session, col, select
+
+from app.core.db import engine
+from app.core.ids import uuid7
+from app.core.rollups import HourlyUsage, UsageKey, add_session_usage, upsert_usage
+from app.models.phone_booths import PhoneBooth
+from app.models.sensor_events import SensorEventCreate
+from app.models.usage_sessions import UsageSession
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BUSY_STATE_ID = 1
+
+
+@dataclass(slots=True)
+class BoothTrack:
+    """Everything the state machine remembers about one booth."""
+
+    client_id: uuid.UUID | None
+    org_unit_id: uuid.UUID | None
+    state_id: int | None = None
+    last_event_time: datetime | None = None
+    session_id: uuid.UUID | None = None
+    session_start: datetime | None = None
+
+
+@dataclass
+class SessionChanges:
+    """Rows to write, keyed by primary key so repeated changes coalesce."""
+
+    opened: dict[uuid.UUID, dict[str, Any]] = field(default_factory=dict)
+    closed: dict[uuid.UUID, dict[str, Any]] = field(default_factory=dict)
+    booths: dict[uuid.UUID, dict[str, Any]] = field(default_factory=dict)
+    # Hourly rollup of the closed sessions, added in the same transaction
+    usage: dict[UsageKey, HourlyUsage] = field(default_factory=dict)
+
+    def __bool__(self) -> bool:
+        return bool(self.opened or self.closed or self.booths or self.usage)
+
+    def merge(self, newer: "SessionChanges") -> "SessionChanges":
+        """Fold ``newer`` into these changes, as if both were made in one tick."""
+        self.opened.update(newer.opened)
+        for session_id, closed in newer.closed.items():
+            if session_id in self.opened:
+                self.opened[session_id].update(closed)
+            else:
+                self.closed[session_id] = closed
+        self.booths.update(newer.booths)
+        for key, row in newer.usage.items():
+            merged = self.usage.get(key)
+            if merged is None:
+                self.usage[key] = row
+                continue
+            merged.busy_seconds += row.busy_seconds
+            merged.session_count += row.session_count
+            merged.max_session_seconds = max(
+                merged.max_session_seconds, row.max_session_seconds
+            )
+        return self
+
+
+@dataclass
+class SessionizerStats:
+    events: int = 0
+    late_events: int = 0
+    sessions_opened: int = 0
+    sessions_closed: int = 0
+
+
+def apply_session_changes(*, session: Session, changes: SessionChanges) -> None:
+    if changes.opened:
+        session.execute(insert(UsageSession), list(changes.opened.values()))
+    if changes.closed:
+        session.execute(update(UsageSession), list(changes.closed.values()))
+    if changes.booths:
+        session.execute(update(PhoneBooth), list(changes.booths.values()))
+    upsert_usage(session, changes.usage)
+    session.commit()
+
+
+class Sessionizer:
+    """Derive usage sessions and booth state from the sensor event stream.
+
+    Events are held in a reorder buffer and applied in ``event_time_utc``
+    order once they are older than the newest event seen minus ``lateness``,
+    or have waited ``lateness`` in wall-clock time. A booth opens a session
+    when it turns busy and closes it when it turns anything else, and the
+    booth's ``state_id`` is updated on every transition. Events that
+    arrive after a later event of the same booth was applied are counted as
+    late and ignored.
+    """
+
+    def __init__(self, *, lateness: timedelta, tick_interval: float = 1.0) -> None:
+        self.lateness = lateness
+        self.tick_interval = tick_interval
+        self.stats = SessionizerStats()
+        self._booths: dict[uuid.UUID, BoothTrack] = {}
+        self._pending: list[tuple[datetime, int, float, SensorEventCreate]] = []
+        self._sequence = itertools.count()
+        self._newest: datetime | None = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._listeners: list[Callable[[SessionChanges], None]] = []
+        # Changes a failed write left behind; the booth tracks already reflect
+        # them, so they are retried with the next tick's changes
+        self._unwritten = SessionChanges()
+
+    def add_listener(self, listener: Callable[[SessionChanges], None]) -> None:
+        """Call ``listener`` with every set of changes once it is committed."""
+        self._listeners.append(listener)
+
+    def start(self) -> None:
+        with Session(engine) as session:
+            self.load(session)
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="sessionizer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self._write(self.drain())
+
+    def load(self, session: Session) -> None:
+        """Resume from the booth states and open sessions stored in the DB."""
+        booths = {
+            booth_id: BoothTrack(client_id, org_unit_id, state_id, last_seen)
+            for booth_id, client_id, org_unit_id, state_id, last_seen in session.execute(
+                sa.select(
+                    col(PhoneBooth.id),
+                    col(PhoneBooth.client_id),
+                    col(PhoneBooth.org_unit_id),
+                    col(PhoneBooth.state_id),
+                    col(PhoneBooth.last_seen),
+                )
+            )
+        }
+        open_sessions = session.exec(
+            select(UsageSession.id, UsageSession.phone_booth_id, UsageSession.start_time)
+            .where(col(UsageSession.end_time).is_(None))
+            .order_by(col(UsageSession.start_time))
+        )
+        for session_id, booth_id, start_time in open_sessions:
+            if track := booths.get(booth_id):
+                track.session_id = session_id
+                track.session_start = start_time
+        with self._lock:
+            self._booths = booths
+
+    def add(self, events: Iterable[SensorEventCreate]) -> None:
+        arrival = time.monotonic()
+        with self._lock:
+            for event in events:
+                heapq.heappush(
+                    self._pending,
+                    (event.event_time_utc, next(self._sequence), arrival, event),
+                )
+                if self._newest is None or event.event_time_utc > self._newest:
+                    self._newest = event.event_time_utc
+
+    def advance(self, now: float | None = None) -> SessionChanges:
+        """Apply every event that can no longer be overtaken by a late one."""
+        now = time.monotonic() if now is None else now
+        changes = SessionChanges()
+        with self._lock:
+            if self._newest is None:
+                return changes
+            watermark = self._newest - self.lateness
+            waited = now - self.lateness.total_seconds()
+            pending = self._pending
+            while pending and (pending[0][0] <= watermark or pending[0][2] <= waited):
+                self._apply(heapq.heappop(pending)[3], changes)
+        return changes
+
+    def drain(self) -> SessionChanges:
+        changes = SessionChanges()
+        with self._lock:
+            while self._pending:
+                self._apply(heapq.heappop(self._pending)[3], changes)
+        return changes
+
+    def _apply(self, event: SensorEventCreate, changes: SessionChanges) -> None:
+        self.stats.events += 1
+        booth_id = event.phone_booth_id
+        at = event.event_time_utc
+        track = self._booths.get(booth_id)
+        if track is None:
+            track = self._booths[booth_id] = BoothTrack(event.client_id, event.org_unit_id)
+        elif track.last_event_time is not None and at < track.last_event_time:
+            self.stats.late_events += 1
+            return
+
+        busy = event.state_id == BUSY_STATE_ID
+        if busy and track.session_id is None:
+            track.session_id = uuid7()
+            track.session_start = at
+            changes.opened[track.session_id] = {
+                "id": track.session_id,
+                "phone_booth_id": booth_id,
+                "client_id": event.client_id,
+                "org_unit_id": event.org_unit_id,
+                "start_time": at,
+            }
+            self.stats.sessions_opened += 1
+        elif not busy and track.session_id is not None:
+            assert track.session_start is not None
+            closed = {
+                "end_time": at,
+                "duration_seconds": int((at - track.session_start).total_seconds()),
+            }
+            if track.session_id in changes.opened:
+                changes.opened[track.session_id].update(closed)
+            else:
+                changes.closed[track.session_id] = {"id": track.session_id, **closed}
+            add_session_usage(
+                changes.usage,
+                phone_booth_id=booth_id,
+                org_unit_id=track.org_unit_id or event.org_unit_id,
+                client_id=track.client_id or event.client_id,
+                start_time=track.session_start,
+                end_time=at,
+            )
+            track.session_id = None
+            track.session_start = None
+            self.stats.sessions_closed += 1
+
+        if event.state_id != track.state_id:
+            # last_seen is written behind by LastSeenBuffer, not per event
+            changes.booths[booth_id] = {"id": booth_id, "state_id": event.state_id}
+        track.state_id = event.state_id
+        track.last_event_time = at
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.tick_interval):
+            self._write(self.advance())
+
+    def _write(self, changes: SessionChanges) -> None:
+        if self._unwritten:
+            changes = self._unwritten.merge(changes)
+            self._unwritten = SessionChanges()
+        if not changes:
+            return
+        try:
+            with Session(engine) as session:
+                apply_session_changes(session=session, changes=changes)
+        except Exception as e:
+            logger.error(f"Failed to write usage sessions, retrying on the next tick: {e}")
+            self._unwritten = changes
+            return
+        for listener in self._listeners:
+            listener(changes)
@@ -0,0 +1,266 @@
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+from app.core.process_dir import claim_process_dir, orphaned_dirs
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Each record is <payload length><crc32 of payload><payload>
+_RECORD_HEADER = struct.Struct("<II")
+_SEGMENT_SUFFIX = ".seg"
+_CHECKPOINT = "replay.offset"
+
+
+@dataclass
+class SpoolStats:
+    appended: int = 0
+    dropped: int = 0
+    replayed: int = 0
+    fsyncs: int = 0
+    corrupt_segments: int = 0
+
+
+class Spool:
+    """Append-only, size-limited spool of opaque records in segment files.
+
+    Writers append whole batches and fsync once per batch. Closed segments are
+    read back in order through ``mmap`` and deleted once every record in them
+    has been handled; the position inside the segment being replayed is
+    checkpointed so a restart does not replay it from the start.
+
+    Each process spools to a numbered subdirectory of ``directory`` of its
+    own, claimed on first use, and ``max_bytes`` applies per process.
+    Directories whose process died are replayed by whichever live process
+    gets to them first.
+    """
+
+    def __init__(self, *, directory: str, segment_bytes: int, max_bytes: int) -> None:
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.stats = SpoolStats()
+        self._lock = threading.Lock()
+        self._replay_lock = threading.Lock()
+        # Claimed on first use, so processes that import but never ingest do
+        # not hold on to a spool another process left behind
+        self._own: Path | None = None
+        self._fd: int | None = None
+        self._next_index = 0
+        self._size = 0
+        self._current: Path | None = None
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def segment_count(self) -> int:
+        return len(self._segments(self._own)) if self._own else 0
+
+    def pending(self) -> bool:
+        """Whether this process's spool, or one a dead process left, holds records."""
+        if self._size:
+            return True
+        return any(self._segments(d) for d in orphaned_dirs(self.directory))
+
+    def close(self) -> None:
+        """Release this process's directory so another process can adopt it."""
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+            self._own = None
+            self._fd = None
+            self._size = 0
+            self._current = None
+
+    def append(self, records: list[bytes]) -> int:
+        """Durably append ``records``; returns how many fit under ``max_bytes``."""
+        with self._lock:
+            directory = self._claim()
+            data = bytearray()
+            accepted = 0
+            for record in records:
+                framed = _RECORD_HEADER.size + len(record)
+                if self._size + len(data) + framed > self.max_bytes:
+                    break
+                data += _RECORD_HEADER.pack(len(record), zlib.crc32(record))
+                data += record
+                accepted += 1
+            self.stats.dropped += len(records) - accepted
+            if not data:
+                return 0
+            if self._current is None or self._current.stat().st_size >= self.segment_bytes:
+                self._current = directory / f"{self._next_index:016d}{_SEGMENT_SUFFIX}"
+                self._next_index += 1
+            with self._current.open("ab") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self.stats.fsyncs += 1
+            self.stats.appended += accepted
+            self._size += len(data)
+        return accepted
+
+    def replay(self, handler: Callable[[list[bytes]], None], batch_size: int) -> int:
+        """Feed spooled records to ``handler`` in order, oldest first.
+
+        This process's own records go first, then those of directories left
+        by dead processes. Stops at the first batch ``handler`` raises on;
+        that batch is retried on the next call. Returns the number of records
+        handled.
+        """
+        with self._replay_lock:
+            with self._lock:
+                directory = self._claim()
+                # Seal the segment being written so it can be read safely
+                self._current = None
+                segments = self._segments(directory)
+            handled = 0
+            try:
+                handled += self._replay_dir(
+                    directory, segments, handler, batch_size, own=True
+                )
+                for orphan in orphaned_dirs(self.directory):
+                    segments = self._segments(orphan)
+                    if segments:
+                        logger.info(f"Replaying spool left behind in {orphan}")
+                        handled += self._replay_dir(
+                            orphan, segments, handler, batch_size, own=False
+                        )
+            finally:
+                with self._lock:
+                    self.stats.replayed += handled
+            return handled
+
+    def _claim(self) -> Path:
+        """This process's spool directory; call with ``_lock`` held."""
+        if self._own is None:
+            self._own, self._fd = claim_process_dir(self.directory)
+            segments = self._segments(self._own)
+            self._next_index = int(segments[-1].stem) + 1 if segments else 0
+            self._size = sum(segment.stat().st_size for segment in segments)
+        return self._own
+
+    def _replay_dir(
+        self,
+        directory: Path,
+        segments: list[Path],
+        handler: Callable[[list[bytes]], None],
+        batch_size: int,
+        *,
+        own: bool,
+    ) -> int:
+        handled = 0
+        segment, offset = self._read_checkpoint(directory)
+        for path in segments:
+            if segment != path.name:
+                offset = 0
+            batch: list[bytes] = []
+            end = offset
+            for record, record_end in self._read(path, offset):
+                batch.append(record)
+                end = record_end
+                if len(batch) >= batch_size:
+                    handler(batch)
+                    handled += len(batch)
+                    self._write_checkpoint(directory, path.name, end)
+                    batch = []
+            if batch:
+                handler(batch)
+                handled += len(batch)
+            self._remove(path, own=own)
+        return handled
+
+    def _read(self, path: Path, offset: int) -> Iterator[tuple[bytes, int]]:
+        with path.open("rb") as f:
+            if os.fstat(f.fileno()).st_size <= offset:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                while offset + _RECORD_HEADER.size <= len(data):
+                    length, crc = _RECORD_HEADER.unpack_from(data, offset)
+                    start = offset + _RECORD_HEADER.size
+                    record = data[start : start + length]
+                    if len(record) < length or zlib.crc32(record) != crc:
+                        # Torn write from a crash; nothing after it is trustworthy
+                        logger.error(f"Corrupt spool record in {path.name} at {offset}")
+                        self.stats.corrupt_segments += 1
+                        return
+                    offset = start + length
+                    yield record, offset
+
+    @staticmethod
+    def _segments(directory: Path) -> list[Path]:
+        return sorted(directory.glob(f"*{_SEGMENT_SUFFIX}"))
+
+    def _remove(self, path: Path, *, own: bool) -> None:
+        with self._lock:
+            if own:
+                self._size -= path.stat().st_size
+            path.unlink()
+        (path.parent / _CHECKPOINT).unlink(missing_ok=True)
+
+    @staticmethod
+    def _read_checkpoint(directory: Path) -> tuple[str | None, int]:
+        try:
+            name, offset = (directory / _CHECKPOINT).read_text().split()
+            return name, int(offset)
+        except (FileNotFoundError, ValueError):
+            return None, 0
+
+    @staticmethod
+    def _write_checkpoint(directory: Path, segment: str, offset: int) -> None:
+        tmp = directory / f"{_CHECKPOINT}.tmp"
+        tmp.write_text(f"{segment} {offset}")
+        tmp.replace(directory / _CHECKPOINT)
+
+
+class SpoolReplayer:
+    """Periodically drain a spool once ``is_healthy`` says the sink is back."""
+
+    def __init__(
+        self,
+        *,
+        spool: Spool,
+        handler: Callable[[list[bytes]], None],
+        is_healthy: Callable[[], bool],
+        interval: float,
+        batch_size: int,
+    ) -> None:
+        self.spool = spool
+        self.handler = handler
+        self.is_healthy = is_healthy
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="spool-replayer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            if not self.spool.pending() or not self.is_healthy():
+                continue
+            try:
+                replayed = self.spool.replay(self.handler, self.batch_size)
+                logger.info(f"Replayed {replayed} spooled records")
+            except Exception as e:
+                logger.error(f"Spool replay stopped: {e}")
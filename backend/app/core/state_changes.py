@@ -0,0 +1,90 @@
+import threading
+import uuid
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from app.models.sensor_events import SensorEventCreate
+
+
+@dataclass
+class StateChangeStats:
+    received: int = 0
+    stored: int = 0
+    suppressed: int = 0
+
+    @property
+    def suppression_ratio(self) -> float:
+        return self.suppressed / self.received if self.received else 0.0
+
+
+class StateChangeFilter:
+    """Keep only the sensor events that change a sensor's state.
+
+    An event is stored if its ``state_id`` differs from the last stored event
+    of the same sensor, if ``keepalive`` has passed since that event, or if it
+    is older than that event (late events are never dropped). Suppressed
+    events are handed to ``on_suppressed`` so ``last_seen`` still advances.
+    What was stored is only remembered once the batch commits, so a failed
+    or replayed batch is filtered against the same state again.
+    """
+
+    def __init__(
+        self,
+        *,
+        keepalive: timedelta,
+        on_suppressed: Callable[[list[SensorEventCreate]], None] | None = None,
+    ) -> None:
+        self.keepalive = keepalive
+        self.on_suppressed = on_suppressed
+        self.stats = StateChangeStats()
+        self._stored: dict[uuid.UUID, tuple[int, datetime]] = {}
+        self._lock = threading.Lock()
+
+    def filter(
+        self, events: list[SensorEventCreate]
+    ) -> tuple[list[SensorEventCreate], list[SensorEventCreate]]:
+        """Split ``events`` into the ones to store and the ones to suppress."""
+        kept: list[SensorEventCreate] = []
+        suppressed: list[SensorEventCreate] = []
+        batch: dict[uuid.UUID, tuple[int, datetime]] = {}
+        with self._lock:
+            for event in events:
+                last = batch.get(event.sensor_id) or self._stored.get(event.sensor_id)
+                if last is not None:
+                    state_id, at = last
+                    if (
+                        event.state_id == state_id
+                        and at <= event.event_time_utc < at + self.keepalive
+                    ):
+                        suppressed.append(event)
+                        continue
+                    if event.event_time_utc < at:
+                        kept.append(event)
+                        continue
+                batch[event.sensor_id] = (event.state_id, event.event_time_utc)
+                kept.append(event)
+        return kept, suppressed
+
+    def commit(
+        self,
+        kept: list[SensorEventCreate],
+        suppressed: list[SensorEventCreate],
+        *,
+        inserted: int,
+    ) -> None:
+        """Record a committed batch split by ``filter``.
+
+        ``inserted`` is how many of ``kept`` were new rows; the rest were
+        already stored and are not counted as stored again.
+        """
+        with self._lock:
+            for event in kept:
+                last = self._stored.get(event.sensor_id)
+                if last is None or event.event_time_utc >= last[1]:
+                    self._stored[event.sensor_id] = (event.state_id, event.event_time_utc)
+            self.stats.received += len(kept) + len(suppressed)
+            self.stats.stored += inserted
+            self.stats.suppressed += len(suppressed)
+        if suppressed and self.on_suppressed:
+            self.on_suppressed(suppressed)
@@ -1,10 +1,32 @@
 import uuid
+from collections import Counter
+from collections.abc import Mapping, Sequence
+from datetime import datetime
 from typing import Any
 
-from sqlmodel import Session, select
+from sqlalchemy import (
+    DateTime,
+    Uuid,
+    column,
+    delete,
+    insert,
+    literal,
+    or_,
+    true,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, col, select
+from sqlmodel.sql.expression import SelectOfScalar
 
 from app.core.security import get_password_hash, verify_password
+from app.models.dead_letters import DeadLetter
 from app.models.item_model import Item, ItemCreate
+from app.models.org_units import OrgUnit, OrgUnitClosure
+from app.models.phone_booths import PhoneBooth
+from app.models.sensor_events import SensorEvent, SensorEventCreate
 from app.models.user_model import User, UserCreate, UserUpdate
 
 
@@ -53,3 +75,153 @@ def create_item(*, session: Session, item_in: ItemCreate, owner_id: uuid.UUID) -
     session.commit()
     session.refresh(db_item)
     return db_item
+
+
+# Columns of uq_sensor_events_dedup, the natural key of a sensor event
+SENSOR_EVENT_KEY = ["sensor_id", "event_time_utc", "state_id"]
+
+
+def create_sensor_event(*, session: Session, event_in: SensorEventCreate) -> SensorEvent:
+    """Insert one sensor event, or return the stored event with the same key."""
+    row = SensorEvent.model_validate(event_in).model_dump()
+    statement = (
+        pg_insert(SensorEvent)
+        .values(row)
+        .on_conflict_do_nothing(index_elements=SENSOR_EVENT_KEY)
+    )
+    session.execute(statement)
+    session.commit()
+    # The new row, or the one stored first; the key includes the partition key
+    event = session.exec(
+        select(SensorEvent).where(
+            SensorEvent.sensor_id == event_in.sensor_id,
+            SensorEvent.event_time_utc == event_in.event_time_utc,
+            SensorEvent.state_id == event_in.state_id,
+        )
+    ).first()
+    assert event is not None
+    return event
+
+
+def insert_sensor_events(
+    *, session: Session, events_in: Sequence[SensorEventCreate]
+) -> Counter[uuid.UUID]:
+    """Insert many sensor events with a single multi-row INSERT.
+
+    Events whose key is already stored are skipped; returns how many rows
+    were inserted for each ``client_id``.
+    """
+    if not events_in:
+        return Counter()
+    rows = [SensorEvent.model_validate(event_in).model_dump() for event_in in events_in]
+    statement = (
+        pg_insert(SensorEvent)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=SENSOR_EVENT_KEY)
+        .returning(col(SensorEvent.client_id))
+    )
+    inserted = Counter(session.execute(statement).scalars())
+    session.commit()
+    return inserted
+
+
+def update_booths_last_seen(
+    *, session: Session, last_seen: Mapping[uuid.UUID, datetime]
+) -> int:
+    """Move ``last_seen`` forward for many booths with one UPDATE ... FROM (VALUES ...)."""
+    if not last_seen:
+        return 0
+    new = values(
+        column("id", Uuid), column("last_seen", DateTime), name="new"
+    ).data(list(last_seen.items()))
+    statement = (
+        update(PhoneBooth)
+        .where(
+            col(PhoneBooth.id) == new.c.id,
+            or_(
+                col(PhoneBooth.last_seen).is_(None),
+                col(PhoneBooth.last_seen) < new.c.last_seen,
+            ),
+        )
+        .values(last_seen=new.c.last_seen)
+    )
+    result = session.execute(statement)
+    session.commit()
+    return result.rowcount  # type: ignore[attr-defined, no-any-return]
+
+
+def create_dead_letters(*, session: Session, dead_letters: Sequence[DeadLetter]) -> int:
+    if not dead_letters:
+        return 0
+    rows = [dead_letter.model_dump(exclude={"id"}) for dead_letter in dead_letters]
+    session.execute(insert(DeadLetter).values(rows))
+    session.commit()
+    return len(rows)
+
+
+def add_org_unit_closure(*, session: Session, unit: OrgUnit) -> None:
+    """Link a new org unit to itself and to every ancestor of its parent."""
+    session.execute(
+        insert(OrgUnitClosure).values(ancestor_id=unit.id, descendant_id=unit.id, depth=0)
+    )
+    if unit.parent_id is None:
+        return
+    ancestors = select(
+        col(OrgUnitClosure.ancestor_id),
+        literal(unit.id, Uuid),
+        col(OrgUnitClosure.depth) + 1,
+    ).where(OrgUnitClosure.descendant_id == unit.parent_id)
+    session.execute(
+        insert(OrgUnitClosure).from_select(["ancestor_id", "descendant_id", "depth"], ancestors)
+    )
+
+
+def is_org_unit_descendant(
+    *, session: Session, ancestor_id: uuid.UUID, descendant_id: uuid.UUID
+) -> bool:
+    """Whether ``descendant_id`` is ``ancestor_id`` or somewhere below it."""
+    return session.get(OrgUnitClosure, (ancestor_id, descendant_id)) is not None
+
+
+def move_org_unit_closure(
+    *, session: Session, unit_id: uuid.UUID, parent_id: uuid.UUID | None
+) -> None:
+    """Re-link the subtree of ``unit_id`` after it moved under ``parent_id``.
+
+    The caller makes sure ``parent_id`` is not inside the subtree.
+    """
+    subtree = select(col(OrgUnitClosure.descendant_id)).where(
+        OrgUnitClosure.ancestor_id == unit_id
+    )
+    # Drop the paths from the old ancestors, keep those within the subtree
+    session.execute(
+        delete(OrgUnitClosure).where(
+            col(OrgUnitClosure.descendant_id).in_(subtree),
+            col(OrgUnitClosure.ancestor_id).not_in(subtree),
+        )
+    )
+    if parent_id is None:
+        return
+    above = aliased(OrgUnitClosure)
+    below = aliased(OrgUnitClosure)
+    # Every ancestor of the new parent to every unit of the subtree
+    paths = (
+        select(above.ancestor_id, below.descendant_id, above.depth + below.depth + 1)
+        .select_from(above)
+        .join(below, true())
+        .where(above.descendant_id == parent_id, below.ancestor_id == unit_id)
+    )
+    session.execute(
+        insert(OrgUnitClosure).from_select(["ancestor_id", "descendant_id", "depth"], paths)
+    )
+
+
+def org_unit_subtree(root_id: uuid.UUID) -> SelectOfScalar[uuid.UUID]:
+    """Ids of ``root_id`` and every org unit below it, to filter with ``IN``.
+
+    Postgres runs ``org_unit_id IN (...)`` as a semi-join on the closure
+    table's primary key.
+    """
+    return select(col(OrgUnitClosure.descendant_id)).where(
+        OrgUnitClosure.ancestor_id == root_id
+    )
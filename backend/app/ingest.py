@@ -0,0 +1,75 @@
+import logging
+import signal
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from app.core.config import settings
+from app.core.mqtt import get_consumer, get_ingest_health, mqtt_connection
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class HealthHandler(BaseHTTPRequestHandler):
+    """Serve the ingest health on any GET; 503 while reconnecting to MQTT."""
+
+    def do_GET(self) -> None:
+        body = get_ingest_health(enabled=True).model_dump_json().encode()
+        if mqtt_connection.health.reconnecting:
+            self.send_response(HTTPStatus.SERVICE_UNAVAILABLE)
+        else:
+            self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_: Any) -> None:
+        # Health probes would flood the log
+        pass
+
+
+def start_health_server(port: int) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("", port), HealthHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="ingest-health", daemon=True).start()
+    return server
+
+
+def run(stop_event: threading.Event) -> None:
+    health_server = (
+        start_health_server(settings.INGEST_HEALTH_PORT)
+        if settings.INGEST_HEALTH_PORT
+        else None
+    )
+    consumer = get_consumer()
+    consumer.start()
+    logger.info(f"Ingest worker started with {settings.INGEST_WORKERS} workers")
+    stop_event.wait()
+    logger.info("Draining ingest queue")
+    consumer.stop()
+    if health_server:
+        health_server.shutdown()
+        health_server.server_close()
+
+
+def main() -> None:
+    if not settings.mqtt_enabled:
+        logger.error("MQTT_BROKER is not configured, nothing to ingest")
+        raise SystemExit(1)
+
+    stop_event = threading.Event()
+
+    def request_stop(*_: Any) -> None:
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    run(stop_event)
+    logger.info("Ingest worker stopped")
+
+
+if __name__ == "__main__":
+    main()
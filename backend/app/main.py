@@ -1,11 +1,16 @@
 import sentry_sdk
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
+from sqlmodel import Session
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
+from app.core.commands import command_runner
 from app.core.config import settings
-from app.core.mqtt import get_mqtt_client
+from app.core.db import engine
+from app.core.mqtt import get_consumer
+from app.core.partitions import partition_maintainer
+from app.core.retention import retention_purger
 from contextlib import asynccontextmanager
 import logging
 
@@ -20,24 +25,30 @@ def custom_generate_unique_id(route: APIRoute) -> str:
 if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
     sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
 
-mqtt_client = None
+mqtt_consumer = None
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    if settings.mqtt_enabled:
-        global mqtt_client
-        mqtt_client = get_mqtt_client()
-        try:
-            mqtt_client.connect(settings.MQTT_BROKER, settings.MQTT_PORT)
-            mqtt_client.loop_start()
-        except Exception as e:
-            logger.error(f"Failed to connect to MQTT broker: {e}")
+    # Jobs that were running in a process that died will never finish
+    with Session(engine) as session:
+        command_runner.fail_interrupted(session)
+    if settings.PARTITION_MAINTENANCE_ENABLED:
+        partition_maintainer.start()
+    if settings.RETENTION_ENABLED:
+        retention_purger.start()
+    if settings.api_ingest_enabled:
+        global mqtt_consumer
+        mqtt_consumer = get_consumer()
+        mqtt_consumer.start()
     
     yield
     # Shutdown
-    if mqtt_client:
-        mqtt_client.loop_stop()
-        mqtt_client.disconnect()
+    if mqtt_consumer:
+        mqtt_consumer.stop()
+    if settings.RETENTION_ENABLED:
+        retention_purger.stop()
+    if settings.PARTITION_MAINTENANCE_ENABLED:
+        partition_maintainer.stop()
 
 app = FastAPI(
     lifespan=lifespan,
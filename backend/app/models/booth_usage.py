@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import uuid
+from datetime import datetime
+
+from sqlalchemy import Index
+from sqlmodel import Field, SQLModel
+
+
+class BoothUsageHourlyBase(SQLModel):
+    phone_booth_id: uuid.UUID
+    org_unit_id: uuid.UUID
+    client_id: uuid.UUID
+    hour: datetime
+    # Time within the hour covered by closed sessions
+    busy_seconds: float = 0.0
+    # Sessions started within the hour, and the longest of them
+    session_count: int = 0
+    max_session_seconds: float = 0.0
+
+
+class BoothUsageHourly(BoothUsageHourlyBase, table=True):
+    """Closed usage sessions rolled up per booth and hour.
+
+    Maintained by ``app.core.rollups`` as sessions close; rebuilt from
+    ``usage_sessions`` with ``python -m app.backfill_usage``.
+    """
+
+    __tablename__ = "booth_usage_hourly"
+    __table_args__ = (
+        Index("ix_booth_usage_hourly_org_unit_id_hour", "org_unit_id", "hour"),
+        Index("ix_booth_usage_hourly_client_id_hour", "client_id", "hour"),
+    )
+
+    # Derived data, so it goes with whatever it is rolled up from
+    phone_booth_id: uuid.UUID = Field(
+        foreign_key="phone_booths.id", primary_key=True, ondelete="CASCADE"
+    )
+    org_unit_id: uuid.UUID = Field(
+        foreign_key="org_units.id", primary_key=True, ondelete="CASCADE"
+    )
+    client_id: uuid.UUID = Field(
+        foreign_key="clients.id", primary_key=True, ondelete="CASCADE"
+    )
+    hour: datetime = Field(primary_key=True)
+
+
+class BoothUsageHourlyRead(BoothUsageHourlyBase):
+    pass
+
+
+class BoothUsageSummary(SQLModel):
+    # The booth, org unit or client the rows are grouped by
+    id: uuid.UUID
+    busy_seconds: float
+    session_count: int
+    max_session_seconds: float
+    # Booths with usage in the period
+    booths: int
@@ -2,13 +2,15 @@ from __future__ import annotations
 
 import uuid
 from datetime import datetime
-from typing import Optional
 
 from sqlmodel import Field, SQLModel
 
 
 class ClientBase(SQLModel):
     name: str
+    # Days of data kept; None uses the deployment default
+    sensor_event_retention_days: int | None = Field(default=None, ge=0)
+    usage_session_retention_days: int | None = Field(default=None, ge=0)
 
 
 class Client(ClientBase, table=True):
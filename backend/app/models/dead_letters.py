@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import base64
+from datetime import datetime
+from typing import Annotated
+
+from pydantic import PlainSerializer
+from sqlalchemy import BigInteger, Column, LargeBinary
+from sqlmodel import Field, SQLModel
+
+# Raw payloads may be binary, so they are returned base64-encoded
+Base64Payload = Annotated[
+    bytes,
+    PlainSerializer(lambda v: base64.b64encode(v).decode(), return_type=str),
+]
+
+
+class DeadLetterBase(SQLModel):
+    topic: str = Field(max_length=255)
+    error_class: str = Field(max_length=100)
+    error_message: str = Field(max_length=500)
+    received_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+# MQTT messages that could not be decoded, kept for inspection and replay
+class DeadLetter(DeadLetterBase, table=True):
+    __tablename__ = "dead_letters"
+
+    # Sequential so that a bad-firmware incident can be replayed as an id range
+    id: int | None = Field(
+        default=None, sa_column=Column(BigInteger, primary_key=True, autoincrement=True)
+    )
+    payload: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+
+
+class DeadLetterRead(DeadLetterBase):
+    id: int
+    payload: Base64Payload
+
+
+class DeadLettersRead(SQLModel):
+    data: list[DeadLetterRead]
+    count: int
+
+
+class DeadLetterReplayResult(SQLModel):
+    replayed: int
+    written: int
+    failed: int
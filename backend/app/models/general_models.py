@@ -1,6 +1,23 @@
-from sqlmodel import Field, Relationship, SQLModel
+from datetime import datetime
+
+from sqlmodel import SQLModel
 
 
 # Generic message
 class Message(SQLModel):
-    message: str
\ No newline at end of file
+    message: str
+
+
+# State of this process's MQTT ingest connection
+class IngestHealth(SQLModel):
+    enabled: bool
+    state: str
+    since: datetime | None = None
+    connects: int
+    disconnects: int
+    failed_attempts: int
+    last_error: str | None = None
+    outbound_buffered: int
+    outbound_dropped: int
+    redelivery_reconnects: int
+    queue_depth: int
@@ -4,6 +4,8 @@ from pydantic import EmailStr
 from sqlmodel import Field, Relationship, SQLModel
 from typing import TYPE_CHECKING, Optional
 
+from app.core.ids import uuid7
+
 if TYPE_CHECKING:
     from .user_model import User
 
@@ -26,7 +28,7 @@ class ItemUpdate(ItemBase):
 
 # Database model, database table inferred from class name
 class Item(ItemBase, table=True):
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    id: uuid.UUID = Field(default_factory=uuid7, primary_key=True)
     owner_id: uuid.UUID = Field(
         foreign_key="user.id", nullable=False, ondelete="CASCADE"
     )
@@ -4,6 +4,7 @@ import uuid
 from datetime import datetime
 from typing import Optional
 
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
 
@@ -26,6 +27,26 @@ class OrgUnit(OrgUnitBase, table=True):
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+class OrgUnitClosure(SQLModel, table=True):
+    """Every (ancestor, descendant) pair of the org unit tree.
+
+    Each unit is its own ancestor at depth 0. Kept in sync with
+    ``OrgUnit.parent_id`` by the org unit routes, through ``app.crud``, so a
+    subtree is one join on the primary key instead of a recursive query.
+    """
+
+    __tablename__ = "org_unit_closure"
+    __table_args__ = (Index("ix_org_unit_closure_descendant_id", "descendant_id"),)
+
+    ancestor_id: uuid.UUID = Field(
+        foreign_key="org_units.id", primary_key=True, ondelete="CASCADE"
+    )
+    descendant_id: uuid.UUID = Field(
+        foreign_key="org_units.id", primary_key=True, ondelete="CASCADE"
+    )
+    depth: int
+
+
 class OrgUnitCreate(OrgUnitBase):
     client_id: uuid.UUID
     parent_id: Optional[uuid.UUID] = None
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import uuid
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import Column
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlmodel import Field, SQLModel
+
+
+class SensorCommandBase(SQLModel):
+    # Published to <Sensor.mqtt_topic>/<topic_suffix>
+    topic_suffix: str = Field(default="cmd", max_length=100)
+    # Optional target filters; all active sensors with a topic otherwise
+    client_id: uuid.UUID | None = None
+    sensor_type: str | None = Field(default=None, max_length=100)
+
+
+class SensorCommandCreate(SensorCommandBase):
+    payload: dict[str, Any]
+
+
+# A command fanned out to many sensors, with its progress
+class SensorCommandJob(SensorCommandBase, table=True):
+    __tablename__ = "sensor_command_jobs"
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    payload: dict[str, Any] = Field(sa_column=Column(JSONB, nullable=False))
+    status: str = Field(default="pending", max_length=20)
+    total: int = 0
+    # Acknowledged by the broker (PUBACK)
+    published: int = 0
+    failed: int = 0
+    error: str | None = Field(default=None, max_length=500)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    # Written with the progress, so jobs left by a dead process can be told apart
+    updated_at: datetime | None = None
+
+
+class SensorCommandJobRead(SensorCommandBase):
+    id: uuid.UUID
+    payload: dict[str, Any]
+    status: str
+    total: int
+    published: int
+    failed: int
+    error: str | None
+    created_at: datetime
+    started_at: datetime | None
+    finished_at: datetime | None
+
+
+class SensorCommandJobsRead(SQLModel):
+    data: list[SensorCommandJobRead]
+    count: int
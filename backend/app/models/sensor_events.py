@@ -4,10 +4,12 @@ import uuid
 from datetime import datetime
 from typing import Optional, Any
 
-from sqlalchemy import Column
+from sqlalchemy import DDL, Column, Index, UniqueConstraint, event
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlmodel import Field, SQLModel
 
+from app.core.ids import uuid7
+
 
 class SensorEventBase(SQLModel):
     state_id: int
@@ -17,18 +19,38 @@ class SensorEventBase(SQLModel):
 
 class SensorEvent(SensorEventBase, table=True):
     __tablename__: str = "sensor_events"
+    # Natural key: redelivered or retried events are inserted only once
+    __table_args__ = (
+        UniqueConstraint(
+            "sensor_id", "event_time_utc", "state_id", name="uq_sensor_events_dedup"
+        ),
+        # Retention purges select a client's oldest events
+        Index("ix_sensor_events_client_id_event_time_utc", "client_id", "event_time_utc"),
+        # Partitions are managed by app.core.partitions
+        {"postgresql_partition_by": "RANGE (event_time_utc)"},
+    )
 
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    # Keys of a partitioned table must include the partition key
+    id: uuid.UUID = Field(default_factory=uuid7, primary_key=True)
     sensor_id: uuid.UUID = Field(foreign_key="sensors.id")
     phone_booth_id: uuid.UUID = Field(foreign_key="phone_booths.id")
     client_id: uuid.UUID = Field(foreign_key="clients.id")
     org_unit_id: uuid.UUID = Field(foreign_key="org_units.id")
     state_id: int
-    event_time_utc: datetime
+    event_time_utc: datetime = Field(primary_key=True)
     received_at: datetime = Field(default_factory=datetime.utcnow)
     raw_payload: Optional[dict] = Field(default=None, sa_column=Column(JSONB))
 
 
+# Catches events outside every time partition, e.g. when the table is created
+# without migrations
+event.listen(
+    SensorEvent.__table__,  # type: ignore[attr-defined]
+    "after_create",
+    DDL("CREATE TABLE sensor_events_default PARTITION OF sensor_events DEFAULT"),  # type: ignore[no-untyped-call]
+)
+
+
 class SensorEventCreate(SensorEventBase):
     sensor_id: uuid.UUID
     phone_booth_id: uuid.UUID
@@ -43,3 +65,4 @@ class SensorEventRead(SensorEventBase):
     client_id: uuid.UUID
     org_unit_id: uuid.UUID
     received_at: datetime
+
@@ -4,8 +4,11 @@ import uuid
 from datetime import datetime
 from typing import Optional
 
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
+from app.core.ids import uuid7
+
 
 class UsageSessionBase(SQLModel):
     start_time: datetime
@@ -15,8 +18,12 @@ class UsageSessionBase(SQLModel):
 
 class UsageSession(UsageSessionBase, table=True):
     __tablename__: str = "usage_sessions"
-    
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    # Retention purges select a client's oldest closed sessions
+    __table_args__ = (
+        Index("ix_usage_sessions_client_id_end_time", "client_id", "end_time"),
+    )
+
+    id: uuid.UUID = Field(default_factory=uuid7, primary_key=True)
     phone_booth_id: uuid.UUID = Field(foreign_key="phone_booths.id")
     client_id: uuid.UUID = Field(foreign_key="clients.id")
     org_unit_id: uuid.UUID = Field(foreign_key="org_units.id")
@@ -22,6 +22,13 @@ class EmailData:
     subject: str
 
 
+def to_naive_utc(at: datetime) -> datetime:
+    """``at`` as naive UTC, the way timestamps are stored; naive input is UTC already."""
+    if at.tzinfo is None:
+        return at
+    return at.astimezone(timezone.utc).replace(tzinfo=None)
+
+
 def render_email_template(*, template_name: str, context: dict[str, Any]) -> str:
     template_str = (
         Path(__file__).parent / "email-templates" / "build" / template_name
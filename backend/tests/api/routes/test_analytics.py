@@ -0,0 +1,101 @@
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.models.phone_booths import PhoneBooth
+from tests.utils.sensor import create_random_sensor
+
+
+def _create_session(
+    client: TestClient, headers: dict[str, str], booth: PhoneBooth, start: str, end: str
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/usage-sessions/",
+        headers=headers,
+        json={
+            "phone_booth_id": str(booth.id),
+            "client_id": str(booth.client_id),
+            "org_unit_id": str(booth.org_unit_id),
+            "start_time": start,
+            "end_time": end,
+        },
+    )
+    assert response.status_code == 201
+
+
+def test_booth_usage_from_created_sessions(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    sensor = create_random_sensor(db)
+    booth = db.get(PhoneBooth, sensor.phone_booth_id)
+    assert booth
+    _create_session(
+        client, superuser_token_headers, booth, "2092-05-04T09:30:00", "2092-05-04T10:10:00"
+    )
+    _create_session(
+        client, superuser_token_headers, booth, "2092-05-04T10:20:00", "2092-05-04T10:30:00"
+    )
+    period = {"start": "2092-05-04T00:00:00", "end": "2092-05-05T00:00:00"}
+
+    response = client.get(
+        f"{settings.API_V1_STR}/analytics/booth-usage/hourly",
+        headers=superuser_token_headers,
+        params={**period, "phone_booth_id": str(booth.id)},
+    )
+    assert response.status_code == 200
+    assert [(row["hour"], row["busy_seconds"], row["session_count"]) for row in response.json()] == [
+        ("2092-05-04T09:00:00", 1800, 1),
+        ("2092-05-04T10:00:00", 1200, 1),
+    ]
+
+    response = client.get(
+        f"{settings.API_V1_STR}/analytics/booth-usage/summary",
+        headers=superuser_token_headers,
+        params={**period, "group_by": "org_unit", "org_unit_id": str(booth.org_unit_id)},
+    )
+    assert response.status_code == 200
+    assert response.json() == [
+        {
+            "id": str(booth.org_unit_id),
+            "busy_seconds": 3000,
+            "session_count": 2,
+            "max_session_seconds": 2400,
+            "booths": 1,
+        }
+    ]
+
+
+def test_booth_usage_of_user_without_client(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/analytics/booth-usage/summary",
+        headers=normal_user_token_headers,
+        params={"start": "2092-05-04T00:00:00", "end": "2092-05-05T00:00:00"},
+    )
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+def test_booth_usage_period_with_utc_offset(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    sensor = create_random_sensor(db)
+    booth = db.get(PhoneBooth, sensor.phone_booth_id)
+    assert booth
+    _create_session(
+        client, superuser_token_headers, booth, "2092-06-04T09:30:00", "2092-06-04T10:10:00"
+    )
+
+    response = client.get(
+        f"{settings.API_V1_STR}/analytics/booth-usage/hourly",
+        headers=superuser_token_headers,
+        params={
+            # 09:00 to 10:00 UTC
+            "start": "2092-06-04T11:00:00+02:00",
+            "end": "2092-06-04T12:00:00+02:00",
+            "phone_booth_id": str(booth.id),
+        },
+    )
+    assert response.status_code == 200
+    assert [row["hour"] for row in response.json()] == ["2092-06-04T09:00:00"]
@@ -0,0 +1,49 @@
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.models.dead_letters import DeadLetter
+
+
+def test_read_dead_letters(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    letter = DeadLetter(
+        topic="booths/1", payload=b"\x00ab", error_class="E", error_message="bad"
+    )
+    db.add(letter)
+    db.commit()
+    response = client.get(
+        f"{settings.API_V1_STR}/dead-letters/",
+        headers=superuser_token_headers,
+        params={"limit": 1000},
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["count"] >= 1
+    stored = next(d for d in content["data"] if d["id"] == letter.id)
+    assert stored["payload"] == "AGFi"
+
+
+def test_read_dead_letters_requires_superuser(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/dead-letters/", headers=normal_user_token_headers
+    )
+    assert response.status_code == 403
+
+
+def test_replay_dead_letters(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    letter = DeadLetter(topic="booths/1", payload=b"{", error_class="E", error_message="")
+    db.add(letter)
+    db.commit()
+    response = client.post(
+        f"{settings.API_V1_STR}/dead-letters/replay",
+        headers=superuser_token_headers,
+        params={"start_id": letter.id, "end_id": letter.id},
+    )
+    assert response.status_code == 200
+    assert response.json() == {"replayed": 1, "written": 0, "failed": 1}
@@ -0,0 +1,140 @@
+import uuid
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.models.clients import Client
+from app.models.org_units import OrgUnitClosure
+from app.models.phone_booths import PhoneBooth
+from tests.utils.sensor import ensure_lookup_rows
+from tests.utils.utils import random_lower_string
+
+
+def _create_unit(
+    client: TestClient,
+    headers: dict[str, str],
+    client_id: uuid.UUID,
+    parent_id: str | None = None,
+) -> str:
+    response = client.post(
+        f"{settings.API_V1_STR}/org-units/",
+        headers=headers,
+        json={"name": random_lower_string(), "client_id": str(client_id), "parent_id": parent_id},
+    )
+    assert response.status_code == 201
+    return str(response.json()["id"])
+
+
+def _tree(
+    client: TestClient, headers: dict[str, str], db: Session
+) -> tuple[uuid.UUID, str, str, str, str]:
+    """A building with two floors, the first with a zone."""
+    ensure_lookup_rows(db)
+    owner = Client(name=random_lower_string())
+    db.add(owner)
+    db.commit()
+    building = _create_unit(client, headers, owner.id)
+    floor_1 = _create_unit(client, headers, owner.id, building)
+    zone = _create_unit(client, headers, owner.id, floor_1)
+    floor_2 = _create_unit(client, headers, owner.id, building)
+    return owner.id, building, floor_1, zone, floor_2
+
+
+def _paths(db: Session, ancestor_id: str) -> dict[str, int]:
+    db.expire_all()
+    rows = db.exec(
+        select(OrgUnitClosure).where(OrgUnitClosure.ancestor_id == uuid.UUID(ancestor_id))
+    ).all()
+    return {str(row.descendant_id): row.depth for row in rows}
+
+
+def test_closure_follows_created_and_moved_units(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    owner_id, building, floor_1, zone, floor_2 = _tree(client, superuser_token_headers, db)
+    assert _paths(db, building) == {building: 0, floor_1: 1, zone: 2, floor_2: 1}
+
+    # Move the first floor, with its zone, under the second
+    response = client.put(
+        f"{settings.API_V1_STR}/org-units/{floor_1}",
+        headers=superuser_token_headers,
+        json={"name": "floor 1", "client_id": str(owner_id), "parent_id": floor_2},
+    )
+    assert response.status_code == 200
+    assert _paths(db, building) == {building: 0, floor_1: 2, zone: 3, floor_2: 1}
+    assert _paths(db, floor_2) == {floor_2: 0, floor_1: 1, zone: 2}
+    assert _paths(db, floor_1) == {floor_1: 0, zone: 1}
+
+    # And back to the top
+    response = client.put(
+        f"{settings.API_V1_STR}/org-units/{floor_1}",
+        headers=superuser_token_headers,
+        json={"name": "floor 1", "client_id": str(owner_id), "parent_id": None},
+    )
+    assert response.status_code == 200
+    assert _paths(db, building) == {building: 0, floor_2: 1}
+    assert _paths(db, floor_1) == {floor_1: 0, zone: 1}
+
+
+def test_unit_cannot_move_under_its_subtree(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    owner_id, building, _, zone, _ = _tree(client, superuser_token_headers, db)
+    response = client.put(
+        f"{settings.API_V1_STR}/org-units/{building}",
+        headers=superuser_token_headers,
+        json={"name": "building", "client_id": str(owner_id), "parent_id": zone},
+    )
+    assert response.status_code == 400
+
+
+def test_delete_unit(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    _, building, floor_1, zone, _ = _tree(client, superuser_token_headers, db)
+    response = client.delete(
+        f"{settings.API_V1_STR}/org-units/{floor_1}", headers=superuser_token_headers
+    )
+    assert response.status_code == 409
+
+    response = client.delete(
+        f"{settings.API_V1_STR}/org-units/{zone}", headers=superuser_token_headers
+    )
+    assert response.status_code == 200
+    assert zone not in _paths(db, building)
+    assert _paths(db, zone) == {}
+
+
+def test_list_booths_in_subtree(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    owner_id, _, floor_1, zone, floor_2 = _tree(client, superuser_token_headers, db)
+    booths = {}
+    for unit in (floor_1, zone, floor_2):
+        booth = PhoneBooth(
+            client_id=owner_id,
+            org_unit_id=uuid.UUID(unit),
+            name=random_lower_string(),
+            serial_number=random_lower_string(),
+        )
+        db.add(booth)
+        db.commit()
+        booths[unit] = str(booth.id)
+
+    response = client.get(
+        f"{settings.API_V1_STR}/phone-booths/",
+        headers=superuser_token_headers,
+        params={"org_unit_id": floor_1, "limit": 1000},
+    )
+    assert response.status_code == 200
+    assert {b["id"] for b in response.json()} == {booths[floor_1], booths[zone]}
+
+    for path in ("usage-sessions", "sensor-events"):
+        response = client.get(
+            f"{settings.API_V1_STR}/{path}/",
+            headers=superuser_token_headers,
+            params={"org_unit_id": floor_2},
+        )
+        assert response.status_code == 200
+        assert response.json() == []
@@ -0,0 +1,54 @@
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.commands import command_runner
+from app.core.config import settings
+
+
+def test_create_sensor_command(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    submitted: list[uuid.UUID] = []
+    monkeypatch.setattr(settings, "MQTT_BROKER", "broker")
+    monkeypatch.setattr(command_runner, "submit", submitted.append)
+    response = client.post(
+        f"{settings.API_V1_STR}/sensor-commands/",
+        headers=superuser_token_headers,
+        json={"payload": {"firmware": "1.2.3"}, "sensor_type": "occupancy"},
+    )
+    assert response.status_code == 202
+    content = response.json()
+    assert content["status"] == "pending"
+    assert content["topic_suffix"] == "cmd"
+    assert submitted == [uuid.UUID(content["id"])]
+
+    response = client.get(
+        f"{settings.API_V1_STR}/sensor-commands/{content['id']}",
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 200
+    assert response.json()["payload"] == {"firmware": "1.2.3"}
+
+
+def test_create_sensor_command_without_mqtt(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/sensor-commands/",
+        headers=superuser_token_headers,
+        json={"payload": {}},
+    )
+    assert response.status_code == 400
+
+
+def test_sensor_commands_require_superuser(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/sensor-commands/", headers=normal_user_token_headers
+    )
+    assert response.status_code == 403
@@ -0,0 +1,56 @@
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.mqtt import mqtt_connection
+
+
+def test_ingest_health_check_when_not_consuming(client: TestClient) -> None:
+    response = client.get(f"{settings.API_V1_STR}/utils/health-check/ingest/")
+    assert response.status_code == 200
+    content = response.json()
+    assert content["state"] == "stopped"
+    assert content["queue_depth"] == 0
+    assert content["redelivery_reconnects"] == 0
+
+
+def test_ingest_health_check_while_reconnecting(client: TestClient) -> None:
+    with patch.object(mqtt_connection.health, "state", "disconnected"):
+        response = client.get(f"{settings.API_V1_STR}/utils/health-check/ingest/")
+    assert response.status_code == 503
+    assert response.json()["state"] == "disconnected"
+
+
+def test_ingest_metrics(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/metrics/ingest/", headers=superuser_token_headers
+    )
+    assert r.status_code == 200
+    content = r.json()
+    assert "received" in content["metrics"]
+    assert content["metrics"]["flush_seconds"]["buckets"]["+Inf"] >= 0
+    assert "queue_depth" in content["pipeline"]
+
+
+def test_ingest_metrics_requires_superuser(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/metrics/ingest/", headers=normal_user_token_headers
+    )
+    assert r.status_code == 403
+
+
+def test_retention_progress(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/retention/", headers=superuser_token_headers
+    )
+    assert r.status_code == 200
+    content = r.json()
+    assert content["stats"]["expired_partitions"] >= 0
+    assert "reclaimed_rows" in content["progress"]
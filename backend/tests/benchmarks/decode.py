@@ -0,0 +1,118 @@
+"""Micro-benchmark of MQTT payload decoding, single-threaded.
+
+Run with ``python -m tests.benchmarks.decode``. Each decoder turns the same
+readings, in every schema version and encoding, into records; the rate
+reported is messages per second on one core. The first row is the decoding
+the ingest path used before payload schemas.
+"""
+
+import argparse
+import json
+import logging
+import time
+from collections.abc import Callable
+from datetime import datetime, timezone
+from typing import Any
+
+import cbor2
+import msgpack  # type: ignore[import-untyped]
+from pydantic import field_validator
+from sqlmodel import SQLModel
+
+from app.core.payloads import PayloadDecoder
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TOPIC = "booths/0/occupancy"
+
+
+def v1_document(n: int) -> dict[str, Any]:
+    return {
+        "serial_number": f"SN-{n:06d}",
+        "state_id": n % 2,
+        "event_time_utc": "2024-01-01T09:00:00Z",
+        "battery": 87,
+        "rssi": -61,
+    }
+
+
+def v2_document(n: int) -> dict[str, Any]:
+    return {"sn": f"SN-{n:06d}", "s": n % 2, "t": 1704099600, "battery": 87, "rssi": -61}
+
+
+def json_payload(n: int) -> bytes:
+    return json.dumps(v1_document(n)).encode()
+
+
+ENCODERS: dict[str, Callable[[dict[str, Any]], bytes]] = {
+    "json": lambda document: json.dumps(document).encode(),
+    "msgpack": msgpack.packb,
+    "cbor": cbor2.dumps,
+}
+
+
+class LegacySensorEventMessage(SQLModel):
+    """The SQLModel record the ingest path decoded into before payload schemas."""
+
+    serial_number: str | None = None
+    mqtt_topic: str | None = None
+    state_id: int
+    event_time_utc: datetime
+    raw_payload: dict[str, Any] | None = None
+
+    @field_validator("event_time_utc")
+    @classmethod
+    def _to_naive_utc(cls, v: datetime) -> datetime:
+        if v.tzinfo is not None:
+            v = v.astimezone(timezone.utc).replace(tzinfo=None)
+        return v
+
+
+def legacy_decode(topic: str, payload: bytes) -> LegacySensorEventMessage:
+    # Parse to a dict, then validate the dict field by field
+    data = json.loads(payload.decode())
+    return LegacySensorEventMessage.model_validate(
+        data, update={"raw_payload": data, "mqtt_topic": topic}
+    )
+
+
+def measure(decode: Callable[[str, bytes], object], payloads: list[bytes]) -> float:
+    start = time.perf_counter()
+    for payload in payloads:
+        decode(TOPIC, payload)
+    return len(payloads) / (time.perf_counter() - start)
+
+
+def run(messages: int) -> dict[str, tuple[float, float]]:
+    """Return messages/s and mean payload size in bytes per decoder."""
+    cases: list[tuple[str, Callable[[str, bytes], object], list[bytes]]] = [
+        ("json.loads + model_validate", legacy_decode, [json_payload(n) for n in range(messages)])
+    ]
+    for version, document in (("v1", v1_document), ("v2", v2_document)):
+        for encoding, encode in ENCODERS.items():
+            decoder = PayloadDecoder(
+                schemas={}, default=version, encodings={"#": encoding}  # type: ignore[dict-item]
+            )
+            payloads = [encode(document(n)) for n in range(messages)]
+            cases.append((f"{version} {encoding}", decoder.decode, payloads))
+    return {
+        name: (measure(decode, payloads), sum(map(len, payloads)) / len(payloads))
+        for name, decode, payloads in cases
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=200_000)
+    args = parser.parse_args()
+    results = run(args.messages)
+    baseline = next(iter(results.values()))[0]
+    for name, (rate, size) in results.items():
+        logger.info(
+            f"{name:<30} {rate:>12,.0f} msg/s  {rate / baseline:.2f}x  {size:>6.1f} B/msg"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""End-to-end benchmark of MQTT ingest, from ``on_message`` to committed rows.
+
+Run with ``python -m tests.benchmarks.ingest`` against a development database.
+A fleet of booths and sensors is created for the run and deleted afterwards.
+Synthetic ``MQTTMessage`` objects are fed to ``on_message`` on one thread, as
+paho's network loop would, at ``--rate`` messages per second in bursts of
+``--burst`` messages (``--rate 0`` sends as fast as possible). Each sensor
+reports its occupancy on every message and changes it with probability
+``--change-probability``, like a heartbeat with occasional transitions.
+
+Every ingest store mode in ``--modes`` runs in its own process, since the
+mode is fixed at import. For each mode it reports the rate ``on_message``
+accepted messages at, the end-to-end rate until the last batch was
+committed, p50/p99 latency from publish to commit of the stored events,
+sensor_events rows written per second, and the process CPU time per message
+(generating the traffic included).
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from paho.mqtt.client import MQTTMessage
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import Session, col, delete, func, select
+
+from app import crud
+from app.core.config import settings
+from app.core.db import engine
+from app.models.booth_states import BoothState
+from app.models.booth_usage import BoothUsageHourly
+from app.models.clients import Client
+from app.models.org_unit_types import OrgUnitType
+from app.models.org_units import OrgUnit
+from app.models.phone_booths import PhoneBooth
+from app.models.sensor_events import SensorEvent, SensorEventCreate
+from app.models.sensors import Sensor
+from app.models.usage_sessions import UsageSession
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MODES = ("all", "changes")
+
+
+def create_fleet(session: Session, sensors: int) -> tuple[uuid.UUID, list[Sensor]]:
+    """A client with one booth and one sensor per ``sensors``, in one org unit."""
+    session.execute(pg_insert(OrgUnitType).values(id=0, name="default").on_conflict_do_nothing())
+    session.execute(pg_insert(BoothState).values(id=0, name="free").on_conflict_do_nothing())
+    session.execute(pg_insert(BoothState).values(id=1, name="busy").on_conflict_do_nothing())
+    run = uuid.uuid4().hex[:8]
+    client = Client(name=f"ingest-benchmark-{run}")
+    session.add(client)
+    session.flush()
+    org_unit = OrgUnit(client_id=client.id, name=f"ingest-benchmark-{run}")
+    session.add(org_unit)
+    session.flush()
+    crud.add_org_unit_closure(session=session, unit=org_unit)
+    fleet = []
+    for n in range(sensors):
+        booth = PhoneBooth(
+            client_id=client.id,
+            org_unit_id=org_unit.id,
+            name=f"booth-{n}",
+            serial_number=f"bench-{run}-booth-{n}",
+        )
+        session.add(booth)
+        session.flush()
+        sensor = Sensor(
+            phone_booth_id=booth.id,
+            serial_number=f"bench-{run}-{n}",
+            mqtt_topic=f"booths/{booth.id}/occupancy",
+        )
+        session.add(sensor)
+        fleet.append(sensor)
+    session.commit()
+    for sensor in fleet:
+        session.refresh(sensor)
+    return client.id, fleet
+
+
+def delete_fleet(session: Session, client_id: uuid.UUID) -> None:
+    booths = select(PhoneBooth.id).where(PhoneBooth.client_id == client_id)
+    session.execute(delete(SensorEvent).where(col(SensorEvent.client_id) == client_id))
+    session.execute(delete(UsageSession).where(col(UsageSession.client_id) == client_id))
+    session.execute(
+        delete(BoothUsageHourly).where(col(BoothUsageHourly.client_id) == client_id)
+    )
+    session.execute(delete(Sensor).where(col(Sensor.phone_booth_id).in_(booths)))
+    session.execute(delete(PhoneBooth).where(col(PhoneBooth.client_id) == client_id))
+    session.execute(delete(OrgUnit).where(col(OrgUnit.client_id) == client_id))
+    session.execute(delete(Client).where(col(Client.id) == client_id))
+    session.commit()
+
+
+def message(mid: int, sensor: Sensor, state_id: int) -> MQTTMessage:
+    msg = MQTTMessage(mid, (sensor.mqtt_topic or "").encode())
+    # The publish time travels in the event, to measure latency at commit
+    msg.payload = json.dumps(
+        {
+            "serial_number": sensor.serial_number,
+            "state_id": state_id,
+            "event_time_utc": datetime.utcnow().isoformat() + "Z",
+            "battery": 87,
+        }
+    ).encode()
+    return msg
+
+
+def percentile(values: list[float], q: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100)[q - 1]
+
+
+def run_mode(
+    *, sensors: int, messages: int, rate: float, burst: int, change_probability: float
+) -> None:
+    # Imported here: the ingest singletons read INGEST_STORE_MODE at import
+    from app.core.ingest import batcher, pipeline
+    from app.core.mqtt import on_message
+
+    # One line per flushed batch would drown the results
+    logging.getLogger("app.core.ingest").setLevel(logging.WARNING)
+    latencies: list[float] = []
+    lock = threading.Lock()
+
+    def record(events: list[SensorEventCreate]) -> None:
+        committed = datetime.utcnow()
+        with lock:
+            latencies.extend(
+                (committed - event.event_time_utc).total_seconds() * 1000 for event in events
+            )
+
+    batcher.add_listener(record)
+    with Session(engine) as session:
+        client_id, fleet = create_fleet(session, sensors)
+    states = [0] * len(fleet)
+    try:
+        pipeline.start()
+        interval = burst / rate if rate > 0 else 0.0
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        next_tick = start
+        for sent in range(0, messages, burst):
+            for mid in range(sent, min(sent + burst, messages)):
+                n = random.randrange(len(fleet))
+                if random.random() < change_probability:
+                    states[n] ^= 1
+                on_message(None, None, message(mid, fleet[n], states[n]))  # type: ignore[arg-type]
+            if interval:
+                next_tick += interval
+                time.sleep(max(0.0, next_tick - time.perf_counter()))
+        submitted = time.perf_counter() - start
+        # Stopping drains the queue and flushes the last batch
+        pipeline.stop()
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - cpu_start
+        snapshot = pipeline.snapshot()
+        with Session(engine) as session:
+            rows = session.exec(
+                select(func.count())
+                .select_from(SensorEvent)
+                .where(col(SensorEvent.client_id) == client_id)
+            ).one()
+    finally:
+        with Session(engine) as session:
+            delete_fleet(session, client_id)
+
+    logger.info(
+        f"mode={settings.INGEST_STORE_MODE:<8} "
+        f"on_message {messages / submitted:>10,.0f} msg/s  "
+        f"end-to-end {messages / elapsed:>10,.0f} msg/s  "
+        f"p50 {percentile(latencies, 50):>8.1f} ms  "
+        f"p99 {percentile(latencies, 99):>8.1f} ms  "
+        f"{rows / elapsed:>10,.0f} rows/s  "
+        f"{cpu / messages * 1e6:>6.1f} µs CPU/msg  "
+        f"({rows} rows, {snapshot['queue']['dropped']} dropped)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sensors", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--rate", type=float, default=0, help="messages/s, 0 for max")
+    parser.add_argument("--burst", type=int, default=100)
+    parser.add_argument("--change-probability", type=float, default=0.05)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.mode:
+        run_mode(
+            sensors=args.sensors,
+            messages=args.messages,
+            rate=args.rate,
+            burst=args.burst,
+            change_probability=args.change_probability,
+        )
+        return
+    for mode in args.modes:
+        subprocess.run(
+            [sys.executable, "-m", "tests.benchmarks.ingest", "--mode", mode, *sys.argv[1:]],
+            env={**os.environ, "INGEST_STORE_MODE": mode},
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
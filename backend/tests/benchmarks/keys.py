@@ -0,0 +1,109 @@
+"""Benchmark of random (v4) against time-ordered (v7) UUID primary keys.
+
+Run with ``python -m tests.benchmarks.keys`` against a development database.
+For each generator a scratch table shaped like ``sensor_events`` (a UUID
+primary key and a few columns, no foreign keys) is filled with ``--rows``
+rows, ``--batch`` per INSERT and transaction, the way the ingest batcher
+writes. Once the index outgrows shared_buffers, random keys dirty a
+different leaf page on almost every insert and split pages all over the
+tree, while time-ordered keys append to the rightmost leaf.
+
+It reports insert throughput over the whole run and its last tenth, where
+the index is largest, the WAL generated per row and the size of the primary
+key index. The tables are dropped afterwards.
+"""
+
+import argparse
+import logging
+import time
+import uuid
+from collections.abc import Callable
+from datetime import datetime, timedelta
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, Table, Uuid, insert, text
+
+from app.core.db import engine
+from app.core.ids import uuid7
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+GENERATORS: dict[str, Callable[[], uuid.UUID]] = {"uuid4": uuid.uuid4, "uuid7": uuid7}
+
+
+def scratch_table(name: str) -> Table:
+    return Table(
+        f"keys_benchmark_{name}",
+        MetaData(),
+        Column("id", Uuid, primary_key=True),
+        Column("sensor_id", Uuid, nullable=False),
+        Column("state_id", Integer, nullable=False),
+        Column("event_time_utc", DateTime, nullable=False),
+    )
+
+
+def run(name: str, rows: int, batch: int) -> dict[str, float]:
+    generate = GENERATORS[name]
+    table = scratch_table(name)
+    table.drop(engine, checkfirst=True)
+    table.create(engine)
+    sensor_id = uuid.uuid4()
+    started_at = datetime.utcnow()
+    elapsed = tail_elapsed = 0.0
+    tail_from = rows * 9 // 10 // batch * batch
+    try:
+        with engine.connect() as connection:
+            wal_start = connection.execute(text("SELECT pg_current_wal_lsn()")).scalar()
+            for offset in range(0, rows, batch):
+                values = [
+                    {
+                        "id": generate(),
+                        "sensor_id": sensor_id,
+                        "state_id": n % 2,
+                        "event_time_utc": started_at + timedelta(seconds=n),
+                    }
+                    for n in range(offset, min(offset + batch, rows))
+                ]
+                # Only the database's share is timed, not generating keys
+                start = time.perf_counter()
+                connection.execute(insert(table), values)
+                connection.commit()
+                took = time.perf_counter() - start
+                elapsed += took
+                if offset >= tail_from:
+                    tail_elapsed += took
+            wal_bytes = connection.execute(
+                text("SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), :start)"),
+                {"start": wal_start},
+            ).scalar_one()
+            index_bytes = connection.execute(
+                text("SELECT pg_relation_size(:index)"), {"index": f"{table.name}_pkey"}
+            ).scalar_one()
+    finally:
+        table.drop(engine)
+    return {
+        "rows_per_second": rows / elapsed,
+        "tail_rows_per_second": (rows - tail_from) / tail_elapsed,
+        "wal_bytes_per_row": float(wal_bytes) / rows,
+        "index_bytes": float(index_bytes),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--generators", nargs="+", choices=GENERATORS, default=list(GENERATORS))
+    args = parser.parse_args()
+    for name in args.generators:
+        result = run(name, args.rows, args.batch)
+        logger.info(
+            f"{name}: {result['rows_per_second']:>10,.0f} rows/s"
+            f"  last 10%: {result['tail_rows_per_second']:>10,.0f} rows/s"
+            f"  WAL {result['wal_bytes_per_row']:>6.1f} B/row"
+            f"  index {result['index_bytes'] / 1024 / 1024:>8.1f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Micro-benchmark of the sessionizer state machine, single-threaded.
+
+Run with ``python -m tests.benchmarks.sessionizer``. A fleet of booths
+reports a state every few minutes for a day; events reach the sessionizer
+in batches, a share of them behind newer ones, and each batch is followed
+by a tick. The rate reported is events per second on one core, with the
+sessions and booth state changes the ticks produced. Nothing is written to
+the database.
+"""
+
+import argparse
+import logging
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from app.core.sessionizer import Sessionizer
+from app.models.sensor_events import SensorEventCreate
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+START = datetime(2024, 1, 1)
+
+
+def fleet_events(
+    booths: int, interval: timedelta, *, out_of_order: float, seed: int = 0
+) -> list[SensorEventCreate]:
+    """A day of events for ``booths`` booths, in roughly arrival order."""
+    rng = random.Random(seed)
+    fleet = [(uuid.uuid4(), uuid.uuid4(), uuid.uuid4()) for _ in range(booths)]
+    events: list[tuple[datetime, SensorEventCreate]] = []
+    at = START
+    while at < START + timedelta(days=1):
+        for booth_id, client_id, org_unit_id in fleet:
+            event_time = at + timedelta(seconds=rng.uniform(0, interval.total_seconds()))
+            # Some are delivered after the next report of the same booth
+            delay = interval * 1.5 if rng.random() < out_of_order else timedelta(0)
+            arrival = event_time + delay
+            events.append(
+                (
+                    arrival,
+                    SensorEventCreate.model_construct(
+                        sensor_id=booth_id,
+                        phone_booth_id=booth_id,
+                        client_id=client_id,
+                        org_unit_id=org_unit_id,
+                        state_id=rng.randint(0, 1),
+                        event_time_utc=event_time,
+                    ),
+                )
+            )
+        at += interval
+    events.sort(key=lambda pair: pair[0])
+    return [event for _, event in events]
+
+
+def run(
+    events: list[SensorEventCreate], *, batch: int, lateness: timedelta
+) -> dict[str, float]:
+    """Feed ``events`` in batches, ticking after each; return rates and counts."""
+    sessionizer = Sessionizer(lateness=lateness)
+    opened = closed = booth_updates = 0
+    start = time.perf_counter()
+    for offset in range(0, len(events), batch):
+        sessionizer.add(events[offset : offset + batch])
+        # A tick that applies events by the watermark only, not by wall time
+        changes = sessionizer.advance(now=float("-inf"))
+        opened += len(changes.opened)
+        closed += len(changes.closed)
+        booth_updates += len(changes.booths)
+    changes = sessionizer.drain()
+    elapsed = time.perf_counter() - start
+    return {
+        "events_per_second": len(events) / elapsed,
+        "sessions_opened": opened + len(changes.opened),
+        "sessions_closed": closed + len(changes.closed),
+        "booth_updates": booth_updates + len(changes.booths),
+        "late_events": sessionizer.stats.late_events,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--booths", type=int, default=2_000)
+    parser.add_argument("--interval-seconds", type=float, default=300)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--lateness-seconds", type=float, default=30)
+    parser.add_argument("--out-of-order", type=float, default=0.01)
+    args = parser.parse_args()
+    events = fleet_events(
+        args.booths,
+        timedelta(seconds=args.interval_seconds),
+        out_of_order=args.out_of_order,
+    )
+    result = run(
+        events, batch=args.batch, lateness=timedelta(seconds=args.lateness_seconds)
+    )
+    logger.info(
+        f"{len(events):,} events: {result['events_per_second']:,.0f} events/s, "
+        f"{result['sessions_opened']:,.0f} sessions opened, "
+        f"{result['sessions_closed']:,.0f} closed, "
+        f"{result['booth_updates']:,.0f} booth updates, "
+        f"{result['late_events']:,.0f} late events"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""Capture MQTT traffic to a file and replay it through the ingest pipeline.
+
+``python -m tests.benchmarks.traffic capture hour.cap --duration 3600``
+subscribes to ``MQTT_TOPIC`` without the shared group, so it receives a copy
+of the traffic without taking any from the ingest consumers, and records
+every message with its arrival time.
+
+``python -m tests.benchmarks.traffic replay hour.cap --speed 10`` feeds the
+capture to ``on_message`` with the original gaps between messages divided by
+``--speed`` (``--speed 0`` replays as fast as possible), then reports the
+replay rate and the pipeline's counters. Replayed messages are routed like
+live ones, so the target database needs the captured sensors.
+
+A capture is ``MAGIC`` followed by one record per message: a ``RECORD``
+header (arrival time in ns since the epoch, topic and payload lengths), the
+UTF-8 topic and the payload. Captures are read through ``mmap``, so a long
+capture is never loaded into memory.
+"""
+
+import argparse
+import json
+import logging
+import mmap
+import struct
+import threading
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any, BinaryIO
+
+from paho.mqtt import client as mqtt_client
+from paho.mqtt.properties import Properties
+from paho.mqtt.reasoncodes import ReasonCode
+
+from app.core.config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MAGIC = b"MQTTCAP1"
+RECORD = struct.Struct("<qHI")
+
+
+class CaptureWriter:
+    """Append MQTT messages to a capture file."""
+
+    def __init__(self, f: BinaryIO) -> None:
+        self.f = f
+        self.messages = 0
+        self._lock = threading.Lock()
+        f.write(MAGIC)
+
+    def write(self, topic: str, payload: bytes, timestamp_ns: int | None = None) -> None:
+        encoded = topic.encode()
+        header = RECORD.pack(
+            time.time_ns() if timestamp_ns is None else timestamp_ns,
+            len(encoded),
+            len(payload),
+        )
+        with self._lock:
+            self.f.write(header + encoded + payload)
+            self.messages += 1
+
+
+def read_capture(path: str | Path) -> Iterator[tuple[int, str, bytes]]:
+    """Yield (arrival time in ns, topic, payload) for every captured message.
+
+    A record cut short, e.g. because the capture was killed, ends the capture.
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if data[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not an MQTT capture")
+        offset = len(MAGIC)
+        while offset + RECORD.size <= len(data):
+            timestamp_ns, topic_length, payload_length = RECORD.unpack_from(data, offset)
+            start = offset + RECORD.size
+            end = start + topic_length + payload_length
+            if end > len(data):
+                return
+            topic = data[start : start + topic_length].decode()
+            yield timestamp_ns, topic, data[start + topic_length : end]
+            offset = end
+
+
+def capture(path: Path, *, duration: float, topic: str) -> None:
+    from app.core.mqtt import get_standalone_client
+
+    with path.open("wb") as f:
+        writer = CaptureWriter(f)
+
+        def on_connect(
+            client: mqtt_client.Client,
+            _userdata: Any,
+            _flags: mqtt_client.ConnectFlags,
+            reason_code: ReasonCode,
+            _properties: Properties | None,
+        ) -> None:
+            if reason_code.is_failure:
+                logger.error(f"Failed to connect, return code {reason_code}")
+                return
+            client.subscribe(topic)
+
+        def on_message(
+            _client: mqtt_client.Client, _userdata: Any, msg: mqtt_client.MQTTMessage
+        ) -> None:
+            writer.write(msg.topic, msg.payload)
+
+        client = get_standalone_client("capture")
+        client.on_connect = on_connect
+        client.on_message = on_message
+        client.connect(settings.MQTT_BROKER or "", settings.MQTT_PORT)
+        client.loop_start()
+        try:
+            time.sleep(duration)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            client.disconnect()
+            client.loop_stop()
+    logger.info(f"Captured {writer.messages} messages to {path}")
+
+
+def replay(path: Path, *, speed: float) -> None:
+    from app.core.ingest import pipeline
+    from app.core.mqtt import on_message
+
+    pipeline.start()
+    messages = 0
+    first: int | None = None
+    last = 0
+    start = time.perf_counter()
+    try:
+        for mid, (timestamp_ns, topic, payload) in enumerate(read_capture(path)):
+            if first is None:
+                first = timestamp_ns
+            last = timestamp_ns
+            if speed > 0:
+                due = start + (timestamp_ns - first) / 1e9 / speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            msg = mqtt_client.MQTTMessage(mid, topic.encode())
+            msg.payload = payload
+            on_message(None, None, msg)  # type: ignore[arg-type]
+            messages += 1
+        submitted = time.perf_counter() - start
+    finally:
+        # Stopping drains the queue and flushes the last batch
+        pipeline.stop()
+    elapsed = time.perf_counter() - start
+    span = (last - first) / 1e9 if first is not None else 0.0
+    logger.info(
+        f"Replayed {messages} messages spanning {span:.1f}s in {elapsed:.1f}s: "
+        f"submitted at {messages / submitted:,.0f} msg/s, "
+        f"ingested at {messages / elapsed:,.0f} msg/s"
+    )
+    logger.info(json.dumps(pipeline.snapshot(), default=str))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+    capture_parser = commands.add_parser("capture")
+    capture_parser.add_argument("path", type=Path)
+    capture_parser.add_argument("--duration", type=float, default=3600)
+    capture_parser.add_argument("--topic", default=settings.MQTT_TOPIC)
+    replay_parser = commands.add_parser("replay")
+    replay_parser.add_argument("path", type=Path)
+    replay_parser.add_argument("--speed", type=float, default=1, help="0 for max")
+    args = parser.parse_args()
+    if args.command == "capture":
+        capture(args.path, duration=args.duration, topic=args.topic)
+    else:
+        replay(args.path, speed=args.speed)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,16 @@ from sqlmodel import Session, delete
 from app.core.config import settings
 from app.core.db import engine, init_db
 from app.main import app
+from app.models.booth_usage import BoothUsageHourly
+from app.models.clients import Client
+from app.models.dead_letters import DeadLetter
 from app.models.item_model import Item
+from app.models.org_units import OrgUnit
+from app.models.phone_booths import PhoneBooth
+from app.models.sensor_commands import SensorCommandJob
+from app.models.sensor_events import SensorEvent
+from app.models.sensors import Sensor
+from app.models.usage_sessions import UsageSession
 from app.models.user_model import User
 from tests.utils.user import authentication_token_from_email
 from tests.utils.utils import get_superuser_token_headers
@@ -22,9 +31,23 @@ def db() -> Generator[Session, None, None]:
         session.execute(statement)
         statement = delete(User)
         session.execute(statement)
+        for model in (BoothUsageHourly, SensorCommandJob, DeadLetter, SensorEvent, UsageSession, Sensor, PhoneBooth, OrgUnit, Client):
+            session.execute(delete(model))
         session.commit()
 
 
+@pytest.fixture
+def ddl_session(db: Session) -> Generator[Session, None, None]:
+    """A session whose commits, DDL included, are rolled back afterwards."""
+    # Release the shared session's locks, which partition DDL waits on
+    db.commit()
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        with Session(bind=connection, join_transaction_mode="create_savepoint") as session:
+            yield session
+        transaction.rollback()
+
+
 @pytest.fixture(scope="module")
 def client() -> Generator[TestClient, None, None]:
     with TestClient(app) as c:
@@ -0,0 +1,147 @@
+import json
+import uuid
+from datetime import timedelta
+
+from sqlmodel import Session
+
+from app.core.availability import AvailabilityPublisher
+from app.core.sessionizer import SessionChanges, Sessionizer
+from app.models.phone_booths import PhoneBooth
+from tests.utils.sensor import create_random_sensor
+
+
+def _publisher(connected: bool = True) -> tuple[AvailabilityPublisher, dict[str, bytes]]:
+    published: dict[str, bytes] = {}
+
+    def publish(topic: str, payload: bytes, qos: int, retain: bool) -> None:
+        assert qos == 1 and retain
+        published[topic] = payload
+
+    publisher = AvailabilityPublisher(
+        publish=publish,
+        is_connected=lambda: connected,
+        topic_prefix="test-availability",
+        window=60,
+    )
+    # Only publish what tests mark as changed, not every booth in the DB
+    publisher._everything = False
+    return publisher, published
+
+
+def _booth(db: Session) -> PhoneBooth:
+    booth = db.get(PhoneBooth, create_random_sensor(db).phone_booth_id)
+    assert booth
+    return booth
+
+
+def test_publishes_booth_and_org_unit(db: Session) -> None:
+    booth = _booth(db)
+    sibling = PhoneBooth(
+        client_id=booth.client_id,
+        org_unit_id=booth.org_unit_id,
+        name="sibling",
+        serial_number=str(uuid.uuid4()),
+        state_id=1,
+    )
+    db.add(sibling)
+    db.commit()
+    publisher, published = _publisher()
+
+    publisher.add([booth.id])
+    assert publisher.flush() == 1
+
+    assert json.loads(published[f"test-availability/booths/{booth.id}"]) == {
+        "booth_id": str(booth.id),
+        "org_unit_id": str(booth.org_unit_id),
+        "state_id": 0,
+        "busy": False,
+    }
+    summary = json.loads(published[f"test-availability/org-units/{booth.org_unit_id}"])
+    assert summary["total"] == 2
+    assert summary["busy"] == 1
+    assert summary["booths"] == {str(booth.id): 0, str(sibling.id): 1}
+    assert f"test-availability/booths/{sibling.id}" not in published
+
+
+def test_coalesces_changes_per_booth(db: Session) -> None:
+    booth = _booth(db)
+    publisher, published = _publisher()
+
+    for _ in range(5):
+        publisher.add([booth.id])
+    assert publisher.flush() == 1
+    assert publisher.flush() == 0
+    assert publisher.stats.booth_publishes == 1
+
+
+def test_keeps_changes_while_disconnected(db: Session) -> None:
+    booth = _booth(db)
+    publisher, published = _publisher(connected=False)
+
+    publisher.add([booth.id])
+    assert publisher.flush() == 0
+    assert not published
+
+    publisher.is_connected = lambda: True
+    assert publisher.flush() == 1
+    assert f"test-availability/booths/{booth.id}" in published
+
+
+def test_first_flush_publishes_every_booth(db: Session) -> None:
+    booth = _booth(db)
+    publisher, published = _publisher()
+    publisher._everything = True
+
+    assert publisher.flush() >= 1
+    assert f"test-availability/booths/{booth.id}" in published
+
+
+def test_moved_booth_leaves_its_old_org_unit(db: Session) -> None:
+    booth = _booth(db)
+    old_org_unit_id = booth.org_unit_id
+    other = _booth(db)
+    publisher, published = _publisher()
+    publisher.add([booth.id])
+    publisher.flush()
+
+    booth.org_unit_id = other.org_unit_id
+    db.add(booth)
+    db.commit()
+    publisher.add([booth.id])
+    publisher.flush()
+
+    # The old org unit has no booths left, so its retained summary is cleared
+    assert published[f"test-availability/org-units/{old_org_unit_id}"] == b""
+    summary = json.loads(published[f"test-availability/org-units/{other.org_unit_id}"])
+    assert summary["total"] == 2
+
+
+def test_refresh_clears_deleted_booths(db: Session) -> None:
+    sensor = create_random_sensor(db)
+    booth = db.get(PhoneBooth, sensor.phone_booth_id)
+    assert booth
+    booth_id, org_unit_id = booth.id, booth.org_unit_id
+    publisher, published = _publisher()
+    publisher.add([booth_id])
+    publisher.flush()
+
+    db.delete(sensor)
+    db.delete(booth)
+    db.commit()
+    publisher.refresh()
+    publisher.flush()
+
+    assert published[f"test-availability/booths/{booth_id}"] == b""
+    assert published[f"test-availability/org-units/{org_unit_id}"] == b""
+
+
+def test_sessionizer_notifies_committed_booth_changes(db: Session) -> None:
+    booth = _booth(db)
+    notified: list[SessionChanges] = []
+    sessionizer = Sessionizer(lateness=timedelta(seconds=0))
+    sessionizer.add_listener(notified.append)
+
+    changes = SessionChanges(booths={booth.id: {"id": booth.id, "state_id": 1}})
+    sessionizer._write(changes)
+
+    assert notified == [changes]
@@ -0,0 +1,133 @@
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any
+
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.reasoncodes import ReasonCode
+from sqlmodel import Session
+
+from app.core.commands import CommandRunner, RateLimiter
+from app.models.sensor_commands import SensorCommandJob
+from app.models.sensors import Sensor
+from tests.utils.sensor import create_random_sensor
+
+
+class FakeClient:
+    """Acknowledges every publish at once, unless ``acks`` is False."""
+
+    def __init__(self, acks: bool = True) -> None:
+        self.acks = acks
+        self.published: list[tuple[str, bytes]] = []
+        self.on_connect: Any = None
+        self.on_publish: Any = None
+
+    def max_inflight_messages_set(self, inflight: int) -> None:
+        pass
+
+    def connect(self, host: str, port: int) -> None:
+        pass
+
+    def loop_start(self) -> None:
+        self.on_connect(self, None, None, ReasonCode(PacketTypes.CONNACK, "Success"), None)
+
+    def publish(self, topic: str, payload: bytes, qos: int) -> None:
+        assert qos == 1
+        self.published.append((topic, payload))
+        if self.acks:
+            success = ReasonCode(PacketTypes.PUBACK, "Success")
+            self.on_publish(self, None, len(self.published), success, None)
+
+    def disconnect(self) -> None:
+        pass
+
+    def loop_stop(self) -> None:
+        pass
+
+
+def _runner(client: FakeClient) -> CommandRunner:
+    return CommandRunner(
+        client_factory=lambda name: client,  # type: ignore[arg-type,return-value]
+        rate=0,
+        max_inflight=2,
+        fetch_size=1,
+        progress_interval=0,
+        drain_timeout=0.1,
+    )
+
+
+def _job(db: Session, sensor: Sensor) -> SensorCommandJob:
+    job = SensorCommandJob(
+        payload={"interval": 30},
+        topic_suffix="config",
+        sensor_type=f"type-{uuid.uuid4()}",
+    )
+    sensor.type = job.sensor_type
+    db.add(sensor)
+    db.add(job)
+    db.commit()
+    return job
+
+
+def test_publishes_to_every_matching_sensor(db: Session) -> None:
+    sensors = [create_random_sensor(db) for _ in range(3)]
+    job = _job(db, sensors[0])
+    for sensor in sensors[1:]:
+        sensor.type = job.sensor_type
+        db.add(sensor)
+    db.commit()
+    client = FakeClient()
+
+    _runner(client).run(job.id)
+
+    assert sorted(topic for topic, _ in client.published) == sorted(
+        f"{sensor.mqtt_topic}/config" for sensor in sensors
+    )
+    assert {payload for _, payload in client.published} == {b'{"interval": 30}'}
+    db.refresh(job)
+    assert job.status == "completed"
+    assert (job.total, job.published, job.failed) == (3, 3, 0)
+    assert job.started_at and job.finished_at
+
+
+def test_unacknowledged_publishes_fail_the_job(db: Session) -> None:
+    sensors = [create_random_sensor(db) for _ in range(3)]
+    job = _job(db, sensors[0])
+    for sensor in sensors[1:]:
+        sensor.type = job.sensor_type
+        db.add(sensor)
+    db.commit()
+
+    _runner(FakeClient(acks=False)).run(job.id)
+
+    db.refresh(job)
+    assert job.status == "failed"
+    assert job.error == "The MQTT broker stopped acknowledging"
+    assert (job.published, job.failed) == (0, 2)
+
+
+def test_fail_interrupted_marks_only_stale_jobs_failed(db: Session) -> None:
+    now = datetime.utcnow()
+    stale = SensorCommandJob(
+        payload={}, status="running", updated_at=now - timedelta(hours=1)
+    )
+    live = SensorCommandJob(payload={}, status="running", updated_at=now)
+    db.add(stale)
+    db.add(live)
+    db.commit()
+
+    assert _runner(FakeClient()).fail_interrupted(db) >= 1
+
+    db.refresh(stale)
+    db.refresh(live)
+    assert stale.status == "failed"
+    assert stale.error == "Interrupted by a restart"
+    assert live.status == "running"
+
+
+def test_rate_limiter_paces_calls() -> None:
+    limiter = RateLimiter(rate=100)
+    start = time.monotonic()
+    for _ in range(11):
+        limiter.acquire()
+    assert time.monotonic() - start >= 0.09
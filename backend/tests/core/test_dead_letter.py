@@ -0,0 +1,100 @@
+import json
+from pathlib import Path
+from unittest.mock import patch
+
+from sqlmodel import Session, col, select
+
+from app.core.dead_letter import DeadLetterWriter
+from app.core.ingest import (
+    IngestPipeline,
+    IngestQueue,
+    SensorEventBatcher,
+    replay_dead_letters,
+)
+from app.models.dead_letters import DeadLetter
+from app.models.sensor_events import SensorEvent
+from tests.utils.sensor import create_random_sensor
+
+
+def _writer(max_buffered: int = 100) -> DeadLetterWriter:
+    return DeadLetterWriter(flush_interval=60, log_interval=60, max_buffered=max_buffered)
+
+
+def test_pipeline_dead_letters_undecodable_messages(tmp_path: Path, db: Session) -> None:
+    queue = IngestQueue(maxsize=10, policy="block", spill_dir=str(tmp_path))
+    batcher = SensorEventBatcher(batch_size=100, flush_interval=60)
+    writer = _writer()
+    pipeline = IngestPipeline(queue=queue, batcher=batcher, workers=1, dead_letters=writer)
+    with patch("app.core.ingest.write_sensor_events", return_value=[]):
+        pipeline.start()
+        pipeline.submit("booths/dead-letter-test", b"\xffnot json")
+        pipeline.stop()
+    assert writer.stats.stored == 1
+    letter = db.exec(
+        select(DeadLetter).where(DeadLetter.topic == "booths/dead-letter-test")
+    ).one()
+    assert letter.payload == b"\xffnot json"
+    assert letter.error_class == "ValidationError"
+
+
+def test_writer_drops_beyond_buffer_and_logs_once() -> None:
+    writer = _writer(max_buffered=2)
+    with patch("app.core.dead_letter.logger") as logger:
+        for _ in range(5):
+            writer.add("t", b"x", ValueError("bad"))
+        writer._log_summary()
+        writer._log_summary()
+    assert writer.stats.received == 5
+    assert writer.stats.dropped == 3
+    logger.error.assert_called_once()
+    assert "ValueError: 5" in logger.error.call_args.args[0]
+
+
+def test_replay_writes_fixed_letters_and_keeps_failures(db: Session) -> None:
+    sensor = create_random_sensor(db)
+    good = {
+        "serial_number": sensor.serial_number,
+        "state_id": 1,
+        "event_time_utc": "2024-01-01T09:00:00Z",
+    }
+    unroutable = {**good, "serial_number": "no-such-sensor"}
+    letters = [
+        DeadLetter(
+            topic="t", payload=json.dumps(good).encode(), error_class="E", error_message=""
+        ),
+        DeadLetter(topic="t", payload=b"{", error_class="E", error_message=""),
+        DeadLetter(
+            topic="t",
+            payload=json.dumps(unroutable).encode(),
+            error_class="E",
+            error_message="",
+        ),
+    ]
+    db.add_all(letters)
+    db.commit()
+    ids = [letter.id for letter in letters]
+    assert ids[0] is not None and ids[2] is not None
+
+    with (
+        patch("app.core.ingest.batcher.notify") as notify,
+        patch("app.core.ingest.last_seen") as last_seen,
+    ):
+        result = replay_dead_letters(
+            session=db, start_id=ids[0], end_id=ids[2], limit=100
+        )
+
+    assert (result.replayed, result.written, result.failed) == (3, 1, 2)
+    remaining = db.exec(
+        select(DeadLetter).where(col(DeadLetter.id).in_(ids)).order_by(col(DeadLetter.id))
+    ).all()
+    assert [letter.id for letter in remaining] == ids[1:]
+    assert [letter.error_class for letter in remaining] == [
+        "ValidationError",
+        "UnroutableSensor",
+    ]
+    assert db.exec(select(SensorEvent).where(SensorEvent.sensor_id == sensor.id)).one()
+    # The pipeline is not running, so the sessionizer is not fed
+    notify.assert_not_called()
+    [events] = last_seen.add.call_args.args
+    assert [event.sensor_id for event in events] == [sensor.id]
+    last_seen.flush.assert_called_once()
@@ -0,0 +1,38 @@
+import uuid
+from datetime import datetime
+
+from app.core.dedup import RecentKeys
+from app.models.sensor_events import SensorEventCreate
+
+SENSOR_ID = uuid.uuid4()
+
+
+def _event(minute: int) -> SensorEventCreate:
+    return SensorEventCreate.model_construct(
+        sensor_id=SENSOR_ID,
+        state_id=1,
+        event_time_utc=datetime(2024, 1, 1, 9, minute),
+    )
+
+
+def test_filter_drops_committed_and_repeated_events() -> None:
+    keys = RecentKeys(capacity=10)
+    keys.add_committed([_event(0)], inserted=1)
+    fresh = keys.filter([_event(0), _event(1), _event(1)])
+    assert [e.event_time_utc.minute for e in fresh] == [1]
+    assert keys.stats.filtered == 2
+
+
+def test_filter_forgets_least_recently_used_keys() -> None:
+    keys = RecentKeys(capacity=2)
+    keys.add_committed([_event(0), _event(1)], inserted=2)
+    keys.filter([_event(0)])
+    keys.add_committed([_event(2)], inserted=1)
+    assert len(keys) == 2
+    assert keys.filter([_event(0), _event(1)]) == [_event(1)]
+
+
+def test_conflicts_are_counted() -> None:
+    keys = RecentKeys(capacity=10)
+    keys.add_committed([_event(0), _event(1)], inserted=1)
+    assert keys.stats.conflicts == 1
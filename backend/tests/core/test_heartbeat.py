@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta
+
+from sqlmodel import Session
+
+from app.core.heartbeat import LastSeenBuffer
+from app.models.phone_booths import PhoneBooth
+from tests.utils.sensor import create_random_sensor
+
+
+def test_flush_coalesces_to_latest(db: Session) -> None:
+    booths = [create_random_sensor(db).phone_booth_id for _ in range(3)]
+    buffer = LastSeenBuffer(flush_interval=60)
+    start = datetime(2024, 1, 1, 9, 0)
+    for second in range(100):
+        for booth_id in booths:
+            buffer.touch(booth_id, start + timedelta(seconds=second))
+    # An older heartbeat never moves last_seen backwards
+    buffer.touch(booths[0], start)
+
+    assert buffer.flush() == 3
+    assert buffer.flush() == 0
+    assert buffer.stats.touches == 301
+    assert buffer.stats.flushes == 1
+    for booth_id in booths:
+        booth = db.get(PhoneBooth, booth_id)
+        assert booth
+        db.refresh(booth)
+        assert booth.last_seen == start + timedelta(seconds=99)
+
+    buffer.touch(booths[0], start)
+    assert buffer.flush() == 0
@@ -0,0 +1,31 @@
+import time
+import uuid
+from unittest.mock import patch
+
+from app.core.ids import uuid7
+
+
+def test_uuid7_layout() -> None:
+    before = time.time_ns() // 1_000_000
+    value = uuid7()
+    after = time.time_ns() // 1_000_000
+
+    assert isinstance(value, uuid.UUID)
+    assert value.version == 7
+    assert value.variant == uuid.RFC_4122
+    assert before <= value.int >> 80 <= after
+
+
+def test_uuid7_increases_within_a_millisecond() -> None:
+    with patch("app.core.ids.time.time_ns", return_value=time.time_ns()):
+        values = [uuid7() for _ in range(1000)]
+    assert values == sorted(values)
+    assert len(set(values)) == len(values)
+
+
+def test_uuid7_increases_when_the_clock_steps_back() -> None:
+    first = uuid7()
+    with patch("app.core.ids.time.time_ns", return_value=0):
+        second = uuid7()
+    assert second > first
+    assert second.version == 7
@@ -0,0 +1,261 @@
+import threading
+import time
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from unittest.mock import patch
+
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, select
+
+from app.core.dead_letter import DeadLetterWriter
+from app.core.ingest import (
+    IngestPipeline,
+    IngestQueue,
+    RawMessage,
+    SensorEventBatcher,
+    decode_message,
+    write_sensor_events,
+)
+from app.core.payloads import SensorReading
+from app.models.sensor_events import SensorEvent
+from tests.utils.sensor import create_random_sensor
+
+
+def _message(serial_number: str | None, minute: int = 0) -> SensorReading:
+    return SensorReading(
+        serial_number=serial_number,
+        state_id=1,
+        event_time_utc=datetime(2024, 1, 1, 9, minute),
+    )
+
+
+def test_write_sensor_events_routes_and_drops_unknown(db: Session) -> None:
+    sensor = create_random_sensor(db)
+    written = write_sensor_events(
+        session=db, messages=[_message(sensor.serial_number), _message("unknown")]
+    )
+    assert len(written) == 1
+    event = db.exec(select(SensorEvent).where(SensorEvent.sensor_id == sensor.id)).one()
+    assert event.phone_booth_id == sensor.phone_booth_id
+
+
+def test_message_event_time_is_naive_utc() -> None:
+    message = decode_message(
+        "booths/1",
+        b'{"serial_number": "s", "state_id": 0, "event_time_utc": "2024-01-01T10:00:00+01:00"}',
+    )
+    assert message.event_time_utc == datetime(2024, 1, 1, 9, 0)
+
+
+def test_batcher_flushes_when_full() -> None:
+    batcher = SensorEventBatcher(batch_size=3, flush_interval=60)
+    with patch("app.core.ingest.write_sensor_events", return_value=[]) as write:
+        for minute in range(7):
+            batcher.add(_message("s", minute))
+        assert write.call_count == 2
+        batcher.flush()
+        assert write.call_count == 3
+    assert batcher.stats.batches == 3
+    assert batcher.stats.last_batch_size == 1
+
+
+def test_batcher_flushes_on_interval(db: Session) -> None:
+    sensor = create_random_sensor(db)
+    batcher = SensorEventBatcher(batch_size=100, flush_interval=0.05)
+    batcher.start()
+    try:
+        batcher.add(_message(sensor.serial_number))
+        for _ in range(100):
+            if batcher.stats.batches:
+                break
+            time.sleep(0.02)
+    finally:
+        batcher.stop()
+    assert batcher.stats.rows == 1
+
+
+def _raw(n: int) -> RawMessage:
+    return RawMessage(topic="booths/1", payload=str(n).encode())
+
+
+def test_queue_drop_oldest(tmp_path: Path) -> None:
+    queue = IngestQueue(maxsize=2, policy="drop_oldest", spill_dir=str(tmp_path))
+    for n in range(4):
+        queue.put(_raw(n))
+    assert queue.depth == 2
+    assert queue.stats.dropped == 2
+    item = queue.get(timeout=0)
+    assert item and item.payload == b"2"
+
+
+def test_queue_spill_and_drain(tmp_path: Path) -> None:
+    queue = IngestQueue(maxsize=1, policy="spill", spill_dir=str(tmp_path))
+    for n in range(3):
+        queue.put(_raw(n))
+    assert queue.depth == 1
+    assert queue.stats.spilled == 2
+    assert [m.payload for m in queue.drain_spill()] == [b"1", b"2"]
+    assert queue.drain_spill() == []
+    assert queue.stats.reclaimed == 2
+
+
+def test_queues_spill_to_their_own_files(tmp_path: Path) -> None:
+    first = IngestQueue(maxsize=0, policy="spill", spill_dir=str(tmp_path))
+    second = IngestQueue(maxsize=0, policy="spill", spill_dir=str(tmp_path))
+    first.put(_raw(1))
+    second.put(_raw(2))
+    assert [m.payload for m in first.drain_spill()] == [b"1"]
+    assert [m.payload for m in second.drain_spill()] == [b"2"]
+
+
+def test_queue_keeps_order_while_spilled(tmp_path: Path) -> None:
+    queue = IngestQueue(maxsize=2, policy="spill", spill_dir=str(tmp_path))
+    for n in range(3):
+        queue.put(_raw(n))
+    taken = [queue.get(timeout=0)]
+    # There is room again, but 3 has to wait behind the spilled 2
+    queue.put(_raw(3))
+    taken.append(queue.get(timeout=0))
+    assert queue.get(timeout=0) is None
+    assert [m.payload for m in taken if m] == [b"0", b"1"]
+    assert [m.payload for m in queue.drain_spill()] == [b"2", b"3"]
+    assert queue.drain_spill() == []
+    queue.put(_raw(4))
+    assert queue.depth == 1
+
+
+def test_queue_drains_spill_of_dead_process(tmp_path: Path) -> None:
+    dead = IngestQueue(maxsize=0, policy="spill", spill_dir=str(tmp_path))
+    dead.put(_raw(1))
+    dead.put(_raw(2))
+    live = IngestQueue(
+        maxsize=0, policy="spill", spill_dir=str(tmp_path), orphan_check_interval=0
+    )
+    assert live.drain_spill() == []
+    dead.close()
+    assert [m.payload for m in live.drain_spill()] == [b"1", b"2"]
+    assert live.drain_spill() == []
+    assert list(tmp_path.glob("*/overflow.*")) == []
+
+
+def test_queue_spill_respects_max_bytes(tmp_path: Path) -> None:
+    queue = IngestQueue(
+        maxsize=0, policy="spill", spill_dir=str(tmp_path), spill_max_bytes=50
+    )
+    acked: list[int] = []
+    for n in range(3):
+        queue.put(RawMessage("booths/1", b"x" * 10, partial(acked.append, n)))
+    assert queue.stats.dropped == 1
+    assert queue.stats.spilled == 2
+    assert acked == [0, 1]
+    assert len(queue.drain_spill()) == 2
+
+
+def test_queue_block_waits_for_room(tmp_path: Path) -> None:
+    queue = IngestQueue(maxsize=1, policy="block", spill_dir=str(tmp_path))
+    queue.put(_raw(0))
+    producer = threading.Thread(target=queue.put, args=(_raw(1),))
+    producer.start()
+    time.sleep(0.05)
+    assert producer.is_alive()
+    assert queue.get(timeout=0)
+    producer.join(timeout=1)
+    assert not producer.is_alive()
+    assert queue.stats.blocked == 1
+
+
+def test_pipeline_decodes_on_workers(tmp_path: Path) -> None:
+    queue = IngestQueue(maxsize=10, policy="block", spill_dir=str(tmp_path))
+    batcher = SensorEventBatcher(batch_size=100, flush_interval=60)
+    pipeline = IngestPipeline(queue=queue, batcher=batcher, workers=2)
+    payload = b'{"serial_number": "s", "state_id": 1, "event_time_utc": "2024-01-01T09:00:00Z"}'
+    with patch("app.core.ingest.write_sensor_events", return_value=[]) as write:
+        pipeline.start()
+        pipeline.submit("booths/1", payload)
+        pipeline.submit("booths/1", payload)
+        pipeline.submit("booths/1", b"not json")
+        pipeline.stop()
+    assert write.call_count == 1
+    assert len(write.call_args.kwargs["messages"]) == 2
+    assert pipeline.snapshot()["decode_errors"] == 1
+
+
+def test_write_sensor_events_routes_by_topic(db: Session) -> None:
+    sensor = create_random_sensor(db)
+    message = _message(None)
+    message.mqtt_topic = sensor.mqtt_topic
+    assert len(write_sensor_events(session=db, messages=[message])) == 1
+
+
+def test_batcher_acks_only_after_commit() -> None:
+    batcher = SensorEventBatcher(batch_size=3, flush_interval=60)
+    acked: list[int] = []
+    acked_during_write: list[list[int]] = []
+
+    def write(**_: object) -> list[object]:
+        # Asserting here would be swallowed by the batcher's error handling
+        acked_during_write.append(list(acked))
+        return []
+
+    with patch("app.core.ingest.write_sensor_events", side_effect=write):
+        for n in range(3):
+            batcher.add(_message("s", n), partial(acked.append, n))
+    assert acked_during_write == [[]]
+    assert acked == [0, 1, 2]
+
+
+def test_batcher_leaves_unwritten_messages_unacked() -> None:
+    batcher = SensorEventBatcher(batch_size=10, flush_interval=60)
+    acked: list[int] = []
+    error = OperationalError("INSERT", {}, Exception("connection refused"))
+    unacked: list[bool] = []
+    batcher.on_unacked = lambda: unacked.append(True)
+    with patch("app.core.ingest.write_sensor_events", side_effect=error):
+        batcher.add(_message("s"), partial(acked.append, 0))
+        batcher.flush()
+    assert acked == []
+    assert unacked == [True]
+
+
+def test_batcher_dead_letters_messages_that_fail_alone() -> None:
+    dead_letters = DeadLetterWriter(flush_interval=60, log_interval=60, max_buffered=10)
+    batcher = SensorEventBatcher(
+        batch_size=3, flush_interval=60, dead_letters=dead_letters
+    )
+    acked: list[int] = []
+
+    def write(*, messages: list[SensorReading], **_: object) -> list[object]:
+        if any(m.event_time_utc.minute == 1 for m in messages):
+            raise ValueError("bad row")
+        return []
+
+    with patch("app.core.ingest.write_sensor_events", side_effect=write):
+        for n in range(3):
+            batcher.add(_message("s", n), partial(acked.append, n))
+    assert acked == [0, 2]
+    assert dead_letters.stats.received == 1
+
+
+def test_queue_leaves_dropped_messages_unacked(tmp_path: Path) -> None:
+    queue = IngestQueue(maxsize=1, policy="drop_oldest", spill_dir=str(tmp_path))
+    acked: list[int] = []
+    unacked: list[bool] = []
+    queue.on_unacked = lambda: unacked.append(True)
+    for n in range(3):
+        queue.put(RawMessage("booths/1", b"{}", partial(acked.append, n)))
+    assert acked == []
+    assert unacked == [True, True]
+
+
+def test_queue_drains_spill_in_chunks(tmp_path: Path) -> None:
+    queue = IngestQueue(maxsize=0, policy="spill", spill_dir=str(tmp_path))
+    for n in range(5):
+        queue.put(_raw(n))
+    assert [m.payload for m in queue.drain_spill(limit=2)] == [b"0", b"1"]
+    # Spilling goes on while the older file is drained
+    queue.put(_raw(5))
+    assert [m.payload for m in queue.drain_spill(limit=10)] == [b"2", b"3", b"4"]
+    assert [m.payload for m in queue.drain_spill(limit=10)] == [b"5"]
+    assert queue.drain_spill() == []
+    assert list(tmp_path.glob("*/overflow.*")) == []
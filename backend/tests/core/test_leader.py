@@ -0,0 +1,38 @@
+import time
+from collections.abc import Callable
+
+from app.core.db import engine
+from app.core.leader import LeaderElection
+
+
+def _wait_for(condition: Callable[[], bool], timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_single_leader_and_handover() -> None:
+    events: list[str] = []
+    elections = [
+        LeaderElection(
+            engine=engine,
+            lock_key=424242,
+            retry_interval=0.05,
+            on_elected=lambda name=name: events.append(f"{name}+"),
+            on_demoted=lambda name=name: events.append(f"{name}-"),
+        )
+        for name in ("a", "b")
+    ]
+    first, second = elections
+    first.start()
+    _wait_for(lambda: first.is_leader)
+    second.start()
+    time.sleep(0.2)
+    assert first.is_leader
+    assert not second.is_leader
+
+    first.stop()
+    _wait_for(lambda: second.is_leader)
+    assert second.is_leader
+    second.stop()
+    assert events == ["a+", "a-", "b+", "b-"]
@@ -0,0 +1,41 @@
+import uuid
+
+from app.core.metrics import Histogram, IngestMetrics
+
+
+def test_histogram_buckets_and_quantiles() -> None:
+    histogram = Histogram(bounds=(0.001, 0.01, 0.1))
+    for value in (0.0005, 0.005, 0.005, 0.05, 5.0):
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 5
+    assert snapshot["buckets"] == {"0.001": 1, "0.01": 2, "0.1": 1, "+Inf": 1}
+    assert snapshot["p50"] == 0.01
+    assert snapshot["p99"] is None
+    assert Histogram().quantile(0.5) is None
+
+
+def test_counts_by_topic_prefix() -> None:
+    metrics = IngestMetrics(topic_levels=2, sample_every=1000)
+    for topic in ("booths/1/occupancy", "booths/1/battery", "booths/2/occupancy"):
+        assert metrics.message_received(topic) == 0.0
+    metrics.counters("booths/2/occupancy").rejected += 1
+
+    snapshot = metrics.snapshot()
+    assert snapshot["received"] == {"booths/1": 2, "booths/2": 1}
+    assert snapshot["rejected"] == {"booths/1": 0, "booths/2": 1}
+
+
+def test_samples_every_nth_message_for_timing() -> None:
+    metrics = IngestMetrics(topic_levels=1, sample_every=2)
+    sampled = [metrics.message_received("booths/1") for _ in range(4)]
+    assert [bool(t) for t in sampled] == [False, True, False, True]
+
+
+def test_counts_persisted_events_by_client() -> None:
+    metrics = IngestMetrics(topic_levels=1, sample_every=1)
+    client_id = uuid.uuid4()
+    metrics.events_persisted({client_id: 2})
+
+    assert metrics.snapshot()["persisted"] == {str(client_id): 2}
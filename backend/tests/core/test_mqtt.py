@@ -0,0 +1,29 @@
+from unittest.mock import MagicMock, patch
+
+from paho.mqtt.client import MQTTMessage
+
+from app.core.mqtt import on_message
+
+
+def _message(qos: int) -> MQTTMessage:
+    message = MQTTMessage(mid=7, topic=b"booths/1/occupancy")
+    message.payload = b"{}"
+    message.qos = qos
+    return message
+
+
+def test_on_message_acks_qos1_through_the_pipeline() -> None:
+    client = MagicMock()
+    with patch("app.core.mqtt.pipeline") as pipeline:
+        on_message(client, None, _message(qos=1))
+    topic, payload, ack = pipeline.submit.call_args.args
+    assert (topic, payload) == ("booths/1/occupancy", b"{}")
+    client.ack.assert_not_called()
+    ack()
+    client.ack.assert_called_once_with(7, 1)
+
+
+def test_on_message_qos0_has_nothing_to_ack() -> None:
+    with patch("app.core.mqtt.pipeline") as pipeline:
+        on_message(MagicMock(), None, _message(qos=0))
+    assert pipeline.submit.call_args.args[2] is None
@@ -0,0 +1,98 @@
+import time
+from unittest.mock import MagicMock
+
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.reasoncodes import ReasonCode
+
+from app.core.mqtt import Backoff, MqttConnection
+
+
+def test_backoff_grows_to_maximum_with_jitter() -> None:
+    backoff = Backoff(initial=1, maximum=8)
+    delays = [backoff.next() for _ in range(10)]
+    assert all(0 <= delay <= 8 for delay in delays)
+    assert backoff.attempt == 10
+    backoff.reset()
+    assert backoff.next() <= 1
+
+
+def _connection(limit: int = 2) -> MqttConnection:
+    return MqttConnection(
+        client_factory=MagicMock,
+        backoff=Backoff(initial=1, maximum=8),
+        outbound_limit=limit,
+    )
+
+
+def test_publishes_are_buffered_while_disconnected_and_sent_on_connect() -> None:
+    connection = _connection()
+    for n in range(3):
+        connection.publish(f"booths/{n}", b"x", qos=1, retain=True)
+    assert connection.health.outbound_buffered == 2
+    assert connection.health.outbound_dropped == 1
+
+    client = MagicMock()
+    connection.backoff.attempt = 5
+    success = ReasonCode(PacketTypes.CONNACK, "Success")
+    connection._handle_connect(client, None, MagicMock(), success, None)
+
+    assert [c.args[0] for c in client.publish.call_args_list] == ["booths/1", "booths/2"]
+    assert connection.health.state == "connected"
+    assert connection.health.outbound_buffered == 0
+    assert connection.backoff.attempt == 0
+
+
+def test_failed_connack_is_reported() -> None:
+    connection = _connection()
+    refused = ReasonCode(PacketTypes.CONNACK, "Not authorized")
+    connection._handle_connect(MagicMock(), None, MagicMock(), refused, None)
+    assert connection.health.failed_attempts == 1
+    assert connection.health.state == "stopped"
+
+
+def test_start_does_not_block_on_an_unreachable_broker() -> None:
+    client = MagicMock()
+    client.connect.side_effect = ConnectionRefusedError("refused")
+    connection = MqttConnection(
+        client_factory=lambda: client,
+        backoff=Backoff(initial=0.01, maximum=0.01),
+        outbound_limit=10,
+    )
+    connection.start()
+    try:
+        for _ in range(100):
+            if client.connect.call_count >= 2:
+                break
+            connection._stopped.wait(0.01)
+        assert client.connect.call_count >= 2
+        assert connection.health.state in ("connecting", "disconnected")
+        assert connection.health.last_error == "refused"
+    finally:
+        connection.stop()
+    assert connection.health.state == "stopped"
+
+
+def test_redelivery_reconnects_at_most_once_per_interval() -> None:
+    connection = MqttConnection(
+        client_factory=MagicMock,
+        backoff=Backoff(initial=1, maximum=8),
+        outbound_limit=10,
+        redelivery_interval=60,
+    )
+    connection.client = MagicMock()
+    connection.client.is_connected.return_value = True
+    connection.request_redelivery()
+    for _ in range(100):
+        if connection.client.disconnect.called:
+            break
+        time.sleep(0.01)
+    assert connection.client.disconnect.call_count == 1
+    assert connection.health.redelivery_reconnects == 1
+
+    # The next one waits out the interval
+    connection.request_redelivery()
+    connection.request_redelivery()
+    assert connection._redelivery is not None
+    assert connection._redelivery.is_alive()
+    connection.stop()
+    assert connection.client is None
@@ -0,0 +1,82 @@
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.core.partitions import (
+    PartitionMaintainer,
+    interval_end,
+    interval_start,
+    list_partitions,
+    partition_name,
+    partition_range,
+)
+from app.models.phone_booths import PhoneBooth
+from tests.utils.sensor import create_random_sensor
+
+
+def _maintainer(**kwargs: object) -> PartitionMaintainer:
+    options: dict[str, object] = {
+        "interval": "month",
+        "ahead": 1,
+        "run_interval": 3600,
+        "lock_key": 1234,
+    }
+    options.update(kwargs)
+    return PartitionMaintainer(**options)  # type: ignore[arg-type]
+
+
+def test_partition_names_and_ranges() -> None:
+    at = datetime(2090, 12, 31, 23, 59)
+    month = interval_start(at, "month")
+    assert partition_name(month, "month") == "sensor_events_p2090_12"
+    assert partition_range("sensor_events_p2090_12") == (month, datetime(2091, 1, 1))
+    day = interval_start(at, "day")
+    assert interval_end(day, "day") == datetime(2091, 1, 1)
+    assert partition_range(partition_name(day, "day")) == (day, datetime(2091, 1, 1))
+    assert partition_range("sensor_events_default") is None
+
+
+def test_creates_partitions_ahead(ddl_session: Session) -> None:
+    maintainer = _maintainer(ahead=2)
+    assert maintainer.run(session=ddl_session, now=datetime(2090, 11, 15))
+
+    partitions = list_partitions(ddl_session)
+    for name in ("sensor_events_p2090_11", "sensor_events_p2090_12", "sensor_events_p2091_01"):
+        assert name in partitions
+    # A second run finds nothing to do
+    assert maintainer.run(session=ddl_session, now=datetime(2090, 11, 15))
+    assert maintainer.stats.created == 3
+
+
+def test_skips_ranges_covered_by_another_interval(ddl_session: Session) -> None:
+    _maintainer(ahead=0).run(session=ddl_session, now=datetime(2090, 11, 15))
+    daily = _maintainer(interval="day", ahead=0)
+    daily.run(session=ddl_session, now=datetime(2090, 11, 15))
+    assert daily.stats.created == 0
+
+
+def test_moves_rows_out_of_the_default_partition(ddl_session: Session) -> None:
+    sensor = create_random_sensor(ddl_session)
+    booth = ddl_session.get(PhoneBooth, sensor.phone_booth_id)
+    assert booth
+    ddl_session.execute(
+        text(
+            "INSERT INTO sensor_events (id, state_id, event_time_utc, sensor_id, "
+            "phone_booth_id, client_id, org_unit_id, received_at) VALUES "
+            "(gen_random_uuid(), 1, '2090-11-20', :sensor, :booth, :client, :org_unit, now())"
+        ),
+        {
+            "sensor": sensor.id,
+            "booth": booth.id,
+            "client": booth.client_id,
+            "org_unit": booth.org_unit_id,
+        },
+    )
+    maintainer = _maintainer(ahead=0)
+    maintainer.run(session=ddl_session, now=datetime(2090, 11, 15))
+
+    assert maintainer.stats.moved_rows == 1
+    assert ddl_session.execute(text("SELECT count(*) FROM sensor_events_p2090_11")).scalar() == 1
+    assert "sensor_events_default" in list_partitions(ddl_session)
+
@@ -0,0 +1,78 @@
+from datetime import datetime
+
+import cbor2
+import msgpack
+import pytest
+from pydantic import ValidationError
+
+from app.core.payloads import PAYLOAD_SCHEMAS, PayloadDecoder
+
+
+def _decoder() -> PayloadDecoder:
+    return PayloadDecoder(schemas={"booths/+/v2": "v2"}, default="v1")
+
+
+def test_decode_v1_keeps_unknown_keys_in_raw_payload() -> None:
+    reading = _decoder().decode(
+        "booths/1/occupancy",
+        b'{"serial_number": "s", "state_id": 1, "event_time_utc": "2024-01-01T10:00:00+01:00", "rssi": -61}',
+    )
+    assert reading.serial_number == "s"
+    assert reading.mqtt_topic == "booths/1/occupancy"
+    assert reading.event_time_utc == datetime(2024, 1, 1, 9, 0)
+    assert reading.raw_payload is not None
+    assert reading.raw_payload["rssi"] == -61
+
+
+def test_decode_selects_schema_by_topic() -> None:
+    decoder = _decoder()
+    reading = decoder.decode("booths/1/v2", b'{"sn": "s", "s": 0, "t": 1704099600}')
+    assert (reading.serial_number, reading.state_id) == ("s", 0)
+    assert reading.event_time_utc == datetime(2024, 1, 1, 9, 0)
+    with pytest.raises(ValidationError):
+        decoder.decode("booths/1/occupancy", b'{"sn": "s", "s": 0, "t": 1704099600}')
+
+
+def test_decode_rejects_invalid_json() -> None:
+    with pytest.raises(ValidationError):
+        _decoder().decode("booths/1/occupancy", b"\xffnot json")
+
+
+def test_unknown_schema_version_is_rejected() -> None:
+    with pytest.raises(ValueError):
+        PayloadDecoder(schemas={"booths/#": "v9"}, default="v1")
+
+
+@pytest.mark.parametrize("encoding", ["msgpack", "cbor"])
+def test_decode_binary_encodings(encoding: str) -> None:
+    document = {"sn": "s", "s": 1, "t": 1704099600, "fw": b"\x01\x02"}
+    payload = msgpack.packb(document) if encoding == "msgpack" else cbor2.dumps(document)
+    decoder = PayloadDecoder(schemas={}, default="v2", encodings={"booths/#": encoding})  # type: ignore[dict-item]
+    reading = decoder.decode("booths/1/occupancy", payload)
+    assert (reading.serial_number, reading.state_id) == ("s", 1)
+    assert reading.event_time_utc == datetime(2024, 1, 1, 9, 0)
+    assert reading.raw_payload is not None
+    assert reading.raw_payload["fw"] == "AQI="
+
+
+def test_encoding_negotiated_by_sensor_type() -> None:
+    types = {"booths/1/occupancy": "lite", "booths/2/occupancy": "classic"}
+    decoder = PayloadDecoder(
+        schemas={},
+        default="v1",
+        sensor_types={"lite": "msgpack"},
+        sensor_type=types.get,
+    )
+    assert decoder.encoding_for("booths/1/occupancy") == "msgpack"
+    assert decoder.encoding_for("booths/2/occupancy") == "json"
+    assert decoder.encoding_for("booths/3/occupancy") == "json"
+    types["booths/2/occupancy"] = "lite"
+    assert decoder.encoding_for("booths/2/occupancy") == "msgpack"
+
+
+def test_topic_cache_is_bounded() -> None:
+    decoder = PayloadDecoder(schemas={}, default="v1", cache_size=2)
+    for n in range(5):
+        decoder.schema_for(f"booths/{n}")
+    assert len(decoder._by_topic) <= 2
+    assert decoder.schema_for("booths/0") is PAYLOAD_SCHEMAS["v1"]
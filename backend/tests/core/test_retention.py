@@ -0,0 +1,179 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlmodel import Session, select
+
+from app.core.db import engine
+from app.core.partitions import PartitionMaintainer, list_partitions
+from app.core.retention import RetentionPurger
+from app.models.clients import Client
+from app.models.phone_booths import PhoneBooth
+from app.models.sensor_events import SensorEvent
+from app.models.sensors import Sensor
+from app.models.usage_sessions import UsageSession
+from tests.utils.sensor import create_random_sensor
+
+NOW = datetime(2090, 6, 1)
+
+
+def _purger(**kwargs: object) -> RetentionPurger:
+    options: dict[str, object] = {
+        "event_retention_days": None,
+        "session_retention_days": None,
+        "expired": "detach",
+        "chunk_size": 2,
+        "chunk_sleep": 0,
+        "max_rows_per_second": 0,
+        "run_interval": 3600,
+        "lock_key": 4321,
+    }
+    options.update(kwargs)
+    return RetentionPurger(**options)  # type: ignore[arg-type]
+
+
+def _booth(session: Session) -> tuple[Sensor, PhoneBooth]:
+    sensor = create_random_sensor(session)
+    booth = session.get(PhoneBooth, sensor.phone_booth_id)
+    assert booth
+    return sensor, booth
+
+
+def _add_event(session: Session, sensor: Sensor, booth: PhoneBooth, at: datetime) -> None:
+    session.add(
+        SensorEvent(
+            sensor_id=sensor.id,
+            phone_booth_id=booth.id,
+            client_id=booth.client_id,
+            org_unit_id=booth.org_unit_id,
+            state_id=1,
+            event_time_utc=at,
+        )
+    )
+    session.commit()
+
+
+def test_deletes_expired_events_in_chunks(ddl_session: Session) -> None:
+    sensor, booth = _booth(ddl_session)
+    client = ddl_session.get(Client, booth.client_id)
+    assert client
+    client.sensor_event_retention_days = 30
+    ddl_session.add(client)
+    for days in (90, 60, 45, 1):
+        _add_event(ddl_session, sensor, booth, NOW - timedelta(days=days))
+
+    purger = _purger()
+    assert purger.run(session=ddl_session, now=NOW)
+
+    remaining = ddl_session.exec(
+        select(SensorEvent.event_time_utc).where(SensorEvent.client_id == client.id)
+    ).all()
+    assert remaining == [NOW - timedelta(days=1)]
+    assert purger.stats.deleted_rows["sensor_events"] == 3
+    assert purger.progress.reclaimed_rows == 3
+    assert not purger.progress.running
+
+
+def test_deletes_closed_sessions_only(ddl_session: Session) -> None:
+    _, booth = _booth(ddl_session)
+    old = NOW - timedelta(days=60)
+    for end_time in (old, None):
+        ddl_session.add(
+            UsageSession(
+                phone_booth_id=booth.id,
+                client_id=booth.client_id,
+                org_unit_id=booth.org_unit_id,
+                start_time=old - timedelta(hours=1),
+                end_time=end_time,
+            )
+        )
+    ddl_session.commit()
+
+    _purger(session_retention_days=30).run(session=ddl_session, now=NOW)
+
+    sessions = ddl_session.exec(
+        select(UsageSession).where(UsageSession.phone_booth_id == booth.id)
+    ).all()
+    assert [s.end_time for s in sessions] == [None]
+
+
+def test_expires_partitions_past_every_retention(ddl_session: Session) -> None:
+    PartitionMaintainer(interval="month", ahead=2, run_interval=3600, lock_key=1234).run(
+        session=ddl_session, now=datetime(2090, 11, 15)
+    )
+    sensor, booth = _booth(ddl_session)
+    _add_event(ddl_session, sensor, booth, datetime(2090, 11, 20))
+    ddl_session.execute(text("ANALYZE sensor_events_p2090_11"))
+
+    purger = _purger(event_retention_days=10, expired="drop")
+    purger.run(session=ddl_session, now=datetime(2091, 1, 5))
+
+    partitions = list_partitions(ddl_session)
+    assert "sensor_events_p2090_11" not in partitions
+    assert "sensor_events_p2090_12" in partitions
+    assert ddl_session.execute(
+        text("SELECT to_regclass('sensor_events_p2090_11')")
+    ).scalar() is None
+    assert purger.stats.expired_partition_rows >= 1
+    assert "sensor_events" not in purger.stats.deleted_rows
+
+
+def test_deletes_expired_events_from_default_partition(ddl_session: Session) -> None:
+    sensor, booth = _booth(ddl_session)
+    # No partition covers this range, so the event lands in the default one
+    _add_event(ddl_session, sensor, booth, datetime(2089, 3, 1))
+
+    purger = _purger(event_retention_days=10)
+    purger.run(session=ddl_session, now=NOW)
+
+    assert not ddl_session.exec(
+        select(SensorEvent).where(SensorEvent.sensor_id == sensor.id)
+    ).all()
+    assert purger.stats.deleted_rows["sensor_events_default"] >= 1
+
+
+def test_mixed_retention_deletes_default_clients_events_from_kept_partitions(
+    ddl_session: Session,
+) -> None:
+    PartitionMaintainer(interval="month", ahead=2, run_interval=3600, lock_key=1234).run(
+        session=ddl_session, now=datetime(2090, 11, 15)
+    )
+    long_sensor, long_booth = _booth(ddl_session)
+    default_sensor, default_booth = _booth(ddl_session)
+    client = ddl_session.get(Client, long_booth.client_id)
+    assert client and client.id != default_booth.client_id
+    client.sensor_event_retention_days = 365
+    ddl_session.add(client)
+    _add_event(ddl_session, long_sensor, long_booth, datetime(2090, 11, 20))
+    _add_event(ddl_session, default_sensor, default_booth, datetime(2090, 11, 20))
+
+    purger = _purger(event_retention_days=10)
+    purger.run(session=ddl_session, now=datetime(2091, 1, 5))
+
+    assert "sensor_events_p2090_11" in list_partitions(ddl_session)
+    assert ddl_session.exec(
+        select(SensorEvent).where(SensorEvent.sensor_id == long_sensor.id)
+    ).one()
+    assert not ddl_session.exec(
+        select(SensorEvent).where(SensorEvent.sensor_id == default_sensor.id)
+    ).all()
+    assert purger.stats.deleted_rows["sensor_events"] >= 1
+
+
+def test_keeps_partitions_of_clients_without_retention(ddl_session: Session) -> None:
+    PartitionMaintainer(interval="month", ahead=0, run_interval=3600, lock_key=1234).run(
+        session=ddl_session, now=datetime(2090, 11, 15)
+    )
+    _booth(ddl_session)
+
+    _purger().run(session=ddl_session, now=datetime(2091, 6, 1))
+
+    assert "sensor_events_p2090_11" in list_partitions(ddl_session)
+
+
+def test_skips_run_while_another_process_purges(ddl_session: Session) -> None:
+    with engine.connect() as connection:
+        connection.execute(text("SELECT pg_advisory_lock(4321)"))
+        try:
+            assert not _purger().run(session=ddl_session, now=NOW)
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(4321)"))
@@ -0,0 +1,178 @@
+import uuid
+from datetime import datetime, timedelta
+
+from sqlmodel import Session, col, delete, select
+
+from app.core.rollups import (
+    HourlyUsage,
+    UsageKey,
+    add_session_usage,
+    backfill_usage,
+    rebuild_booth_usage,
+    upsert_usage,
+)
+from app.models.booth_usage import BoothUsageHourly
+from app.models.phone_booths import PhoneBooth
+from app.models.sensors import Sensor
+from app.models.usage_sessions import UsageSession
+from tests.utils.sensor import create_random_sensor
+
+NINE = datetime(2091, 3, 1, 9)
+
+
+def _booth(db: Session) -> PhoneBooth:
+    sensor = create_random_sensor(db)
+    booth = db.get(PhoneBooth, sensor.phone_booth_id)
+    assert booth
+    return booth
+
+
+def _usage(booth: PhoneBooth, *sessions: tuple[datetime, datetime]) -> dict[UsageKey, HourlyUsage]:
+    usage: dict[UsageKey, HourlyUsage] = {}
+    for start_time, end_time in sessions:
+        add_session_usage(
+            usage,
+            phone_booth_id=booth.id,
+            org_unit_id=booth.org_unit_id,
+            client_id=booth.client_id,
+            start_time=start_time,
+            end_time=end_time,
+        )
+    return usage
+
+
+def _stored(db: Session, booth: PhoneBooth) -> dict[datetime, tuple[float, int, float]]:
+    rows = db.exec(
+        select(BoothUsageHourly).where(BoothUsageHourly.phone_booth_id == booth.id)
+    ).all()
+    return {
+        row.hour: (row.busy_seconds, row.session_count, row.max_session_seconds)
+        for row in rows
+    }
+
+
+def test_session_is_split_over_the_hours_it_spans() -> None:
+    booth_id, org_unit_id, client_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    usage: dict[UsageKey, HourlyUsage] = {}
+    add_session_usage(
+        usage,
+        phone_booth_id=booth_id,
+        org_unit_id=org_unit_id,
+        client_id=client_id,
+        start_time=NINE + timedelta(minutes=50),
+        end_time=NINE + timedelta(hours=2, minutes=5),
+    )
+    hours = {key[3]: row for key, row in usage.items()}
+    assert hours == {
+        NINE: HourlyUsage(600, 1, 4500),
+        NINE + timedelta(hours=1): HourlyUsage(3600, 0, 0),
+        NINE + timedelta(hours=2): HourlyUsage(300, 0, 0),
+    }
+
+
+def test_session_ending_on_the_hour_stays_in_its_hour() -> None:
+    usage: dict[UsageKey, HourlyUsage] = {}
+    booth_id = uuid.uuid4()
+    add_session_usage(
+        usage,
+        phone_booth_id=booth_id,
+        org_unit_id=booth_id,
+        client_id=booth_id,
+        start_time=NINE + timedelta(minutes=30),
+        end_time=NINE + timedelta(hours=1),
+    )
+    assert [key[3] for key in usage] == [NINE]
+
+
+def test_upsert_adds_to_stored_rows(db: Session) -> None:
+    booth = _booth(db)
+    upsert_usage(db, _usage(booth, (NINE, NINE + timedelta(minutes=10))))
+    upsert_usage(db, _usage(booth, (NINE + timedelta(minutes=30), NINE + timedelta(minutes=50))))
+    db.commit()
+
+    assert _stored(db, booth) == {NINE: (1800, 2, 1200)}
+
+
+def test_backfill_matches_incremental_rollup(db: Session) -> None:
+    booth = _booth(db)
+    sessions = [
+        (NINE + timedelta(minutes=45), NINE + timedelta(hours=1, minutes=15)),
+        (NINE + timedelta(hours=1, minutes=20), NINE + timedelta(hours=1, minutes=21)),
+        (NINE + timedelta(hours=3), NINE + timedelta(hours=3)),
+    ]
+    for start_time, end_time in sessions:
+        db.add(
+            UsageSession(
+                phone_booth_id=booth.id,
+                client_id=booth.client_id,
+                org_unit_id=booth.org_unit_id,
+                start_time=start_time,
+                end_time=end_time,
+            )
+        )
+    # Open sessions are not rolled up yet
+    db.add(
+        UsageSession(
+            phone_booth_id=booth.id,
+            client_id=booth.client_id,
+            org_unit_id=booth.org_unit_id,
+            start_time=NINE,
+        )
+    )
+    db.commit()
+    expected = _usage(booth, *sessions)
+
+    written = backfill_usage(
+        db, start=NINE, end=NINE + timedelta(hours=4), chunk=timedelta(hours=1)
+    )
+
+    assert written >= len(expected)
+    assert _stored(db, booth) == {
+        key[3]: (row.busy_seconds, row.session_count, row.max_session_seconds)
+        for key, row in expected.items()
+    }
+    # Rebuilding replaces rows instead of adding to them
+    backfill_usage(db, start=NINE, end=NINE + timedelta(hours=4))
+    assert _stored(db, booth)[NINE] == (900, 1, 1800)
+
+
+def test_rebuild_booth_usage_drops_deleted_session(db: Session) -> None:
+    booth = _booth(db)
+    sessions = [
+        (NINE, NINE + timedelta(minutes=10)),
+        (NINE + timedelta(minutes=30), NINE + timedelta(hours=1, minutes=30)),
+    ]
+    stored = []
+    for start_time, end_time in sessions:
+        usage_session = UsageSession(
+            phone_booth_id=booth.id,
+            client_id=booth.client_id,
+            org_unit_id=booth.org_unit_id,
+            start_time=start_time,
+            end_time=end_time,
+        )
+        db.add(usage_session)
+        stored.append(usage_session)
+    upsert_usage(db, _usage(booth, *sessions))
+    db.commit()
+
+    db.delete(stored[1])
+    db.flush()
+    rebuild_booth_usage(
+        db, phone_booth_id=booth.id, start=sessions[1][0], end=sessions[1][1]
+    )
+    db.commit()
+
+    assert _stored(db, booth) == {NINE: (600, 1, 600)}
+
+
+def test_rollup_rows_are_deleted_with_their_booth(db: Session) -> None:
+    booth = _booth(db)
+    upsert_usage(db, _usage(booth, (NINE, NINE + timedelta(minutes=10))))
+    db.commit()
+
+    db.execute(delete(Sensor).where(col(Sensor.phone_booth_id) == booth.id))
+    db.execute(delete(PhoneBooth).where(col(PhoneBooth.id) == booth.id))
+    db.commit()
+
+    assert _stored(db, booth) == {}
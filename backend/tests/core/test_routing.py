@@ -0,0 +1,92 @@
+import time
+from unittest.mock import MagicMock, patch
+
+from sqlmodel import Session
+
+from app.core.routing import (
+    RoutingTable,
+    UnknownKeys,
+    notify_routes_changed,
+    routing_table,
+)
+from tests.utils.sensor import create_random_sensor
+
+
+def test_load_routes_by_serial_and_topic(db: Session) -> None:
+    sensor = create_random_sensor(db)
+    table = RoutingTable()
+    table.load(db)
+    by_serial = table.lookup(serial_number=sensor.serial_number, topic=None)
+    by_topic = table.lookup(serial_number=None, topic=sensor.mqtt_topic)
+    assert by_serial is not None
+    assert by_serial == by_topic
+    assert by_serial.sensor_id == sensor.id
+    assert by_serial.phone_booth_id == sensor.phone_booth_id
+
+
+def test_resolve_fetches_misses_once(db: Session) -> None:
+    table = RoutingTable()
+    table.load(db)
+    sensor = create_random_sensor(db)
+    keys = [(sensor.serial_number, None), ("unknown", None)]
+    routes = table.resolve(session=db, keys=keys)
+    assert routes[0] and routes[0].sensor_id == sensor.id
+    assert routes[1] is None
+    with patch.object(table, "_fetch") as fetch:
+        assert table.resolve(session=db, keys=keys) == routes
+        fetch.assert_not_called()
+
+
+def test_notify_invalidates_listening_tables(db: Session) -> None:
+    table = RoutingTable()
+    table.start()
+    try:
+        time.sleep(0.2)
+        table.load(db)
+        notify_routes_changed(db)
+        db.commit()
+        deadline = time.monotonic() + 3
+        while not table._stale and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert table._stale
+    finally:
+        table.stop()
+
+
+def test_invalidation_during_load_keeps_table_stale() -> None:
+    table = RoutingTable()
+    session = MagicMock()
+
+    def execute_racing_a_notification(_statement: object) -> list[object]:
+        table.invalidate()
+        return []
+
+    session.execute.side_effect = execute_racing_a_notification
+    table.load(session)
+    assert table._stale
+
+
+def test_invalidate_calls_listeners() -> None:
+    table = RoutingTable()
+    calls: list[bool] = []
+    table.add_listener(lambda: calls.append(True))
+    table.invalidate()
+    assert calls == [True]
+
+
+def test_notify_invalidates_own_table_on_commit(db: Session) -> None:
+    routing_table.load(db)
+    notify_routes_changed(db)
+    assert not routing_table._stale
+    db.commit()
+    assert routing_table._stale
+
+
+def test_unknown_keys_are_bounded() -> None:
+    unknown = UnknownKeys(capacity=2)
+    unknown.add(["a", "b"])
+    assert "a" in unknown
+    unknown.add(["c"])
+    assert len(unknown) == 2
+    assert "b" not in unknown
+    assert "a" in unknown
@@ -0,0 +1,127 @@
+import time
+import uuid
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, select
+
+from app.core.sessionizer import Sessionizer, apply_session_changes
+from app.models.booth_usage import BoothUsageHourly
+from app.models.phone_booths import PhoneBooth
+from app.models.sensor_events import SensorEventCreate
+from app.models.usage_sessions import UsageSession
+from tests.utils.sensor import create_random_sensor
+
+START = datetime(2024, 1, 1, 9, 0)
+
+
+def _event(booth_id: uuid.UUID, state_id: int, seconds: int) -> SensorEventCreate:
+    return SensorEventCreate.model_construct(
+        sensor_id=uuid.uuid4(),
+        phone_booth_id=booth_id,
+        client_id=uuid.uuid4(),
+        org_unit_id=uuid.uuid4(),
+        state_id=state_id,
+        event_time_utc=START + timedelta(seconds=seconds),
+    )
+
+
+def test_opens_and_closes_session() -> None:
+    booth_id = uuid.uuid4()
+    sessionizer = Sessionizer(lateness=timedelta(seconds=5))
+    sessionizer.add([_event(booth_id, 0, 0), _event(booth_id, 1, 10), _event(booth_id, 0, 70)])
+    changes = sessionizer.drain()
+    [opened] = changes.opened.values()
+    assert opened["start_time"] == START + timedelta(seconds=10)
+    assert opened["end_time"] == START + timedelta(seconds=70)
+    assert opened["duration_seconds"] == 60
+    assert changes.booths[booth_id]["state_id"] == 0
+
+
+def test_reorders_events_within_lateness() -> None:
+    booth_id = uuid.uuid4()
+    sessionizer = Sessionizer(lateness=timedelta(seconds=30))
+    now = time.monotonic()
+    sessionizer.add([_event(booth_id, 0, 20), _event(booth_id, 1, 0)])
+    # Nothing is old enough to be applied yet
+    assert not sessionizer.advance(now)
+    sessionizer.add([_event(booth_id, 1, 100)])
+    changes = sessionizer.advance(now)
+    [closed_session] = changes.opened.values()
+    assert closed_session["duration_seconds"] == 20
+    assert sessionizer.stats.late_events == 0
+
+
+def test_drops_events_behind_applied_ones() -> None:
+    booth_id = uuid.uuid4()
+    sessionizer = Sessionizer(lateness=timedelta(0))
+    sessionizer.add([_event(booth_id, 1, 10)])
+    sessionizer.advance()
+    sessionizer.add([_event(booth_id, 0, 5)])
+    changes = sessionizer.advance()
+    assert not changes
+    assert sessionizer.stats.late_events == 1
+
+
+def test_day_of_fleet_events_is_fast() -> None:
+    booths = [uuid.uuid4() for _ in range(200)]
+    events = [
+        _event(booth_id, (minute // 7) % 2, minute * 60)
+        for minute in range(0, 24 * 60, 5)
+        for booth_id in booths
+    ]
+    sessionizer = Sessionizer(lateness=timedelta(seconds=30))
+    start = time.perf_counter()
+    sessionizer.add(events)
+    sessionizer.drain()
+    assert time.perf_counter() - start < 10
+    assert sessionizer.stats.events == len(events)
+    assert sessionizer.stats.sessions_opened >= sessionizer.stats.sessions_closed > 0
+
+
+def test_apply_session_changes(db: Session) -> None:
+    sensor = create_random_sensor(db)
+    booth = db.get(PhoneBooth, sensor.phone_booth_id)
+    assert booth
+    sessionizer = Sessionizer(lateness=timedelta(0))
+    sessionizer.load(db)
+    event = _event(booth.id, 1, 0)
+    event.client_id, event.org_unit_id = booth.client_id, booth.org_unit_id  # type: ignore[assignment]
+    sessionizer.add([event])
+    apply_session_changes(session=db, changes=sessionizer.advance())
+    sessionizer.add([_event(booth.id, 0, 45)])
+    apply_session_changes(session=db, changes=sessionizer.advance())
+
+    db.refresh(booth)
+    assert booth.state_id == 0
+    [usage] = db.exec(
+        select(UsageSession).where(UsageSession.phone_booth_id == booth.id)
+    ).all()
+    assert usage.duration_seconds == 45
+    [rollup] = db.exec(
+        select(BoothUsageHourly).where(BoothUsageHourly.phone_booth_id == booth.id)
+    ).all()
+    assert (rollup.hour, rollup.busy_seconds, rollup.session_count) == (START, 45, 1)
+
+
+def test_failed_write_is_retried_on_next_tick(db: Session) -> None:
+    sensor = create_random_sensor(db)
+    booth = db.get(PhoneBooth, sensor.phone_booth_id)
+    assert booth
+    sessionizer = Sessionizer(lateness=timedelta(0))
+    sessionizer.load(db)
+    event = _event(booth.id, 1, 0)
+    event.client_id, event.org_unit_id = booth.client_id, booth.org_unit_id  # type: ignore[assignment]
+    sessionizer.add([event])
+    error = OperationalError("INSERT", {}, Exception("connection refused"))
+    with patch("app.core.sessionizer.apply_session_changes", side_effect=error):
+        sessionizer._write(sessionizer.advance())
+    sessionizer.add([_event(booth.id, 0, 30)])
+    sessionizer._write(sessionizer.advance())
+
+    [usage] = db.exec(
+        select(UsageSession).where(UsageSession.phone_booth_id == booth.id)
+    ).all()
+    assert usage.start_time == START
+    assert usage.duration_seconds == 30
@@ -0,0 +1,136 @@
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.core.ingest import SensorEventBatcher
+from app.core.payloads import SENSOR_READING, SensorReading
+from app.core.spool import Spool
+
+
+def _spool(path: Path, **kwargs: int) -> Spool:
+    options = {"segment_bytes": 64, "max_bytes": 10_000, **kwargs}
+    return Spool(directory=str(path), **options)
+
+
+def test_replay_in_order_across_segments(tmp_path: Path) -> None:
+    spool = _spool(tmp_path)
+    for n in range(10):
+        spool.append([f"record-{n}-a".encode(), f"record-{n}-b".encode()])
+    assert spool.segment_count > 1
+
+    seen: list[bytes] = []
+    assert spool.replay(seen.extend, batch_size=3) == 20
+    assert seen == [f"record-{n}-{s}".encode() for n in range(10) for s in "ab"]
+    assert spool.size == 0
+    assert spool.segment_count == 0
+    assert spool.stats.replayed == 20
+
+
+def test_append_respects_max_bytes(tmp_path: Path) -> None:
+    spool = _spool(tmp_path, max_bytes=50)
+    assert spool.append([b"x" * 20, b"y" * 20, b"z" * 20]) == 1
+    assert spool.stats.dropped == 2
+
+
+def test_failed_replay_resumes_from_checkpoint(tmp_path: Path) -> None:
+    spool = _spool(tmp_path, segment_bytes=10_000)
+    spool.append([str(n).encode() for n in range(6)])
+    seen: list[bytes] = []
+
+    def flaky(batch: list[bytes]) -> None:
+        if b"4" in batch:
+            raise RuntimeError("database down")
+        seen.extend(batch)
+
+    with pytest.raises(RuntimeError):
+        spool.replay(flaky, batch_size=2)
+    assert seen == [b"0", b"1", b"2", b"3"]
+
+    # A new process picks up after the last handled batch
+    spool.close()
+    reopened = _spool(tmp_path, segment_bytes=10_000)
+    assert reopened.replay(seen.extend, batch_size=2) == 2
+    assert seen == [str(n).encode() for n in range(6)]
+
+
+def test_torn_write_is_ignored(tmp_path: Path) -> None:
+    spool = _spool(tmp_path, segment_bytes=10_000)
+    spool.append([b"complete"])
+    [segment] = tmp_path.glob("*/*.seg")
+    with segment.open("ab") as f:
+        f.write(b"\x10\x00\x00\x00garbage")
+    seen: list[bytes] = []
+    spool.replay(seen.extend, batch_size=10)
+    assert seen == [b"complete"]
+    assert spool.stats.corrupt_segments == 1
+
+
+def test_batcher_spools_when_database_is_down(tmp_path: Path) -> None:
+    spool = _spool(tmp_path)
+    batcher = SensorEventBatcher(batch_size=10, flush_interval=60, spool=spool)
+    message = SensorReading(
+        serial_number="s", state_id=1, event_time_utc=datetime(2024, 1, 1, 9, 0)
+    )
+    error = OperationalError("INSERT", {}, Exception("connection refused"))
+    with patch("app.core.ingest.write_sensor_events", side_effect=error):
+        batcher.add(message)
+        batcher.flush()
+    assert spool.stats.appended == 1
+
+    with patch("app.core.ingest.write_sensor_events", return_value=[]) as write:
+        spool.replay(batcher.replay, batch_size=10)
+    assert write.call_args.kwargs["messages"] == [message]
+
+
+def test_batcher_acks_spooled_messages(tmp_path: Path) -> None:
+    batcher = SensorEventBatcher(batch_size=10, flush_interval=60, spool=_spool(tmp_path))
+    acked: list[bool] = []
+    message = SensorReading(
+        serial_number="s", state_id=1, event_time_utc=datetime(2024, 1, 1, 9, 0)
+    )
+    error = OperationalError("INSERT", {}, Exception("connection refused"))
+    with patch("app.core.ingest.write_sensor_events", side_effect=error):
+        batcher.add(message, lambda: acked.append(True))
+        batcher.flush()
+    assert acked == [True]
+
+
+def test_processes_spool_to_their_own_directories(tmp_path: Path) -> None:
+    first = _spool(tmp_path)
+    second = _spool(tmp_path)
+    first.append([b"first"])
+    second.append([b"second"])
+    seen: list[bytes] = []
+    second.replay(seen.extend, batch_size=10)
+    assert seen == [b"second"]
+    assert first.size > 0
+
+
+def test_replay_adopts_spool_of_dead_process(tmp_path: Path) -> None:
+    dead = _spool(tmp_path)
+    dead.append([b"orphan"])
+    live = _spool(tmp_path)
+    live.append([b"own"])
+    assert live.pending()
+    dead.close()
+
+    seen: list[bytes] = []
+    assert live.replay(seen.extend, batch_size=10) == 2
+    assert seen == [b"own", b"orphan"]
+    assert not live.pending()
+
+
+def test_batcher_skips_poison_records(tmp_path: Path) -> None:
+    spool = _spool(tmp_path)
+    batcher = SensorEventBatcher(batch_size=10, flush_interval=60, spool=spool)
+    message = SensorReading(
+        serial_number="s", state_id=1, event_time_utc=datetime(2024, 1, 1, 9, 0)
+    )
+    spool.append([b"not a reading", SENSOR_READING.dump_json(message)])
+    with patch("app.core.ingest.write_sensor_events", return_value=[]) as write:
+        assert spool.replay(batcher.replay, batch_size=10) == 2
+    assert write.call_args.kwargs["messages"] == [message]
+    assert spool.size == 0
@@ -0,0 +1,58 @@
+import uuid
+from datetime import datetime, timedelta
+
+from app.core.state_changes import StateChangeFilter
+from app.models.sensor_events import SensorEventCreate
+
+SENSOR_ID = uuid.uuid4()
+
+
+def _event(second: int, state_id: int) -> SensorEventCreate:
+    return SensorEventCreate.model_construct(
+        sensor_id=SENSOR_ID,
+        state_id=state_id,
+        event_time_utc=datetime(2024, 1, 1, 9, 0) + timedelta(seconds=second),
+    )
+
+
+def _states(events: list[SensorEventCreate]) -> list[tuple[int, int]]:
+    return [(e.event_time_utc.second, e.state_id) for e in events]
+
+
+def test_only_transitions_and_keepalives_are_stored() -> None:
+    suppressed_seen: list[SensorEventCreate] = []
+    changes = StateChangeFilter(
+        keepalive=timedelta(seconds=30), on_suppressed=suppressed_seen.extend
+    )
+    events = [_event(0, 0), _event(5, 0), _event(10, 1), _event(15, 1), _event(40, 1)]
+    kept, suppressed = changes.filter(events)
+    assert _states(kept) == [(0, 0), (10, 1), (40, 1)]
+    changes.commit(kept, suppressed, inserted=len(kept))
+    assert suppressed_seen == suppressed
+    assert changes.stats.suppression_ratio == 2 / 5
+
+    kept, _ = changes.filter([_event(45, 1), _event(50, 0)])
+    assert _states(kept) == [(50, 0)]
+
+
+def test_uncommitted_batches_are_not_remembered() -> None:
+    changes = StateChangeFilter(keepalive=timedelta(seconds=30))
+    changes.filter([_event(0, 1)])
+    kept, _ = changes.filter([_event(5, 1)])
+    assert _states(kept) == [(5, 1)]
+
+
+def test_late_events_are_kept() -> None:
+    changes = StateChangeFilter(keepalive=timedelta(seconds=30))
+    kept, suppressed = changes.filter([_event(10, 1)])
+    changes.commit(kept, suppressed, inserted=len(kept))
+    kept, _ = changes.filter([_event(5, 1)])
+    assert _states(kept) == [(5, 1)]
+
+
+def test_rows_already_stored_are_not_counted() -> None:
+    changes = StateChangeFilter(keepalive=timedelta(seconds=30))
+    kept, suppressed = changes.filter([_event(0, 1), _event(40, 1)])
+    changes.commit(kept, suppressed, inserted=1)
+    assert changes.stats.received == 2
+    assert changes.stats.stored == 1
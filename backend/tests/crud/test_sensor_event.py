@@ -0,0 +1,56 @@
+from datetime import datetime
+
+from sqlmodel import Session, select
+
+from app import crud
+from app.models.phone_booths import PhoneBooth
+from app.models.sensor_events import SensorEvent, SensorEventCreate
+from tests.utils.sensor import create_random_sensor
+
+
+def test_insert_sensor_events(db: Session) -> None:
+    sensor = create_random_sensor(db)
+    booth = db.get(PhoneBooth, sensor.phone_booth_id)
+    assert booth and booth.client_id and booth.org_unit_id
+    events_in = [
+        SensorEventCreate(
+            sensor_id=sensor.id,
+            phone_booth_id=booth.id,
+            client_id=booth.client_id,
+            org_unit_id=booth.org_unit_id,
+            state_id=i % 2,
+            event_time_utc=datetime(2024, 1, 1, 9, i),
+        )
+        for i in range(5)
+    ]
+    inserted = crud.insert_sensor_events(session=db, events_in=events_in)
+    assert inserted == {booth.client_id: 5}
+    events = db.exec(select(SensorEvent).where(SensorEvent.sensor_id == sensor.id)).all()
+    assert len(events) == 5
+    assert {e.state_id for e in events} == {0, 1}
+
+
+def test_insert_sensor_events_empty(db: Session) -> None:
+    assert not crud.insert_sensor_events(session=db, events_in=[])
+
+
+def test_insert_sensor_events_skips_duplicates(db: Session) -> None:
+    sensor = create_random_sensor(db)
+    booth = db.get(PhoneBooth, sensor.phone_booth_id)
+    assert booth and booth.client_id and booth.org_unit_id
+    event_in = SensorEventCreate(
+        sensor_id=sensor.id,
+        phone_booth_id=booth.id,
+        client_id=booth.client_id,
+        org_unit_id=booth.org_unit_id,
+        state_id=1,
+        event_time_utc=datetime(2024, 1, 1, 9, 0),
+    )
+    inserted = crud.insert_sensor_events(session=db, events_in=[event_in, event_in])
+    assert inserted.total() == 1
+    assert not crud.insert_sensor_events(session=db, events_in=[event_in])
+    first = crud.create_sensor_event(session=db, event_in=event_in)
+    again = crud.create_sensor_event(session=db, event_in=event_in)
+    assert first.id == again.id
+    events = db.exec(select(SensorEvent).where(SensorEvent.sensor_id == sensor.id)).all()
+    assert len(events) == 1
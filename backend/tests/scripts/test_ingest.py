@@ -0,0 +1,45 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.core.mqtt import mqtt_connection
+from app.ingest import run, start_health_server
+
+
+def test_run_starts_and_drains_consumer() -> None:
+    consumer_mock = MagicMock()
+    stop_event = threading.Event()
+    stop_event.set()
+
+    with (
+        patch("app.ingest.get_consumer", return_value=consumer_mock),
+        patch("app.ingest.settings.INGEST_HEALTH_PORT", 0),
+    ):
+        run(stop_event)
+
+    consumer_mock.start.assert_called_once_with()
+    consumer_mock.stop.assert_called_once_with()
+
+
+def test_health_server_reports_connection_state() -> None:
+    server = start_health_server(0)
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    try:
+        with patch.object(mqtt_connection.health, "state", "connected"):
+            with urllib.request.urlopen(url) as response:
+                content = json.load(response)
+        assert content["state"] == "connected"
+        assert content["enabled"] is True
+        assert content["redelivery_reconnects"] == 0
+
+        with patch.object(mqtt_connection.health, "state", "disconnected"):
+            with pytest.raises(urllib.error.HTTPError) as exc_info:
+                urllib.request.urlopen(url)
+        assert exc_info.value.code == 503
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,60 @@
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from tests.benchmarks.traffic import CaptureWriter, read_capture, replay
+
+
+def _capture(path: Path) -> None:
+    with path.open("wb") as f:
+        writer = CaptureWriter(f)
+        writer.write("booths/1/occupancy", b'{"state_id": 1}', timestamp_ns=1_000)
+        writer.write("booths/2/occupancy", b"\x00\xff", timestamp_ns=2_000)
+
+
+def test_capture_round_trip(tmp_path: Path) -> None:
+    path = tmp_path / "traffic.cap"
+    _capture(path)
+
+    assert list(read_capture(path)) == [
+        (1_000, "booths/1/occupancy", b'{"state_id": 1}'),
+        (2_000, "booths/2/occupancy", b"\x00\xff"),
+    ]
+
+
+def test_truncated_record_ends_capture(tmp_path: Path) -> None:
+    path = tmp_path / "traffic.cap"
+    _capture(path)
+    path.write_bytes(path.read_bytes()[:-1])
+
+    assert [topic for _, topic, _ in read_capture(path)] == ["booths/1/occupancy"]
+
+
+def test_rejects_other_files(tmp_path: Path) -> None:
+    path = tmp_path / "traffic.cap"
+    path.write_bytes(b"not a capture")
+
+    with pytest.raises(ValueError):
+        list(read_capture(path))
+
+
+def test_replay_feeds_on_message(tmp_path: Path) -> None:
+    path = tmp_path / "traffic.cap"
+    _capture(path)
+    on_message = MagicMock()
+
+    with (
+        patch("app.core.ingest.pipeline") as pipeline,
+        patch("app.core.mqtt.on_message", on_message),
+    ):
+        pipeline.snapshot.return_value = {}
+        replay(path, speed=0)
+
+    messages = [c.args[2] for c in on_message.call_args_list]
+    assert [(m.topic, m.payload) for m in messages] == [
+        ("booths/1/occupancy", b'{"state_id": 1}'),
+        ("booths/2/occupancy", b"\x00\xff"),
+    ]
+    pipeline.start.assert_called_once_with()
+    pipeline.stop.assert_called_once_with()
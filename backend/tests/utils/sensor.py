@@ -0,0 +1,45 @@
+from sqlmodel import Session
+
+from app import crud
+from app.models.booth_states import BoothState
+from app.models.clients import Client
+from app.models.org_unit_types import OrgUnitType
+from app.models.org_units import OrgUnit
+from app.models.phone_booths import PhoneBooth
+from app.models.sensors import Sensor
+from tests.utils.utils import random_lower_string
+
+
+def ensure_lookup_rows(db: Session) -> None:
+    db.merge(OrgUnitType(id=0, name="default"))
+    db.merge(BoothState(id=0, name="free"))
+    db.merge(BoothState(id=1, name="busy"))
+    db.commit()
+
+
+def create_random_sensor(db: Session) -> Sensor:
+    ensure_lookup_rows(db)
+    client = Client(name=random_lower_string())
+    db.add(client)
+    db.flush()
+    org_unit = OrgUnit(client_id=client.id, name=random_lower_string())
+    db.add(org_unit)
+    db.flush()
+    crud.add_org_unit_closure(session=db, unit=org_unit)
+    booth = PhoneBooth(
+        client_id=client.id,
+        org_unit_id=org_unit.id,
+        name=random_lower_string(),
+        serial_number=random_lower_string(),
+    )
+    db.add(booth)
+    db.flush()
+    sensor = Sensor(
+        phone_booth_id=booth.id,
+        serial_number=random_lower_string(),
+        mqtt_topic=f"booths/{booth.id}/occupancy",
+    )
+    db.add(sensor)
+    db.commit()
+    db.refresh(sensor)
+    return sensor